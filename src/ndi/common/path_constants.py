@@ -16,3 +16,53 @@ class PathConstants:
         Returns the path to the package ndi_common resources.
         """
         return os.path.join(PathConstants.root_folder(), 'resources', 'ndi_common')
+
+    @staticmethod
+    def document_folders():
+        """
+        Returns the folders that hold document definitions: the ndi_common
+        database_documents folder followed by those of any calculator toolboxes.
+        """
+        from ndi.fun.find_calc_directories import find_calc_directories
+        folders = [os.path.join(PathConstants.common_folder(), 'database_documents')]
+        for d in find_calc_directories():
+            folders.append(os.path.join(d, 'ndi_common', 'database_documents'))
+        return folders
+
+    @staticmethod
+    def schema_folders():
+        """
+        Returns the folders that hold document schemas: the ndi_common
+        schema_documents folder followed by those of any calculator toolboxes.
+        """
+        from ndi.fun.find_calc_directories import find_calc_directories
+        folders = [os.path.join(PathConstants.common_folder(), 'schema_documents')]
+        for d in find_calc_directories():
+            folders.append(os.path.join(d, 'ndi_common', 'schema_documents'))
+        return folders
+
+    @staticmethod
+    def expand_path(path):
+        """
+        Resolves a path that starts with $NDIDOCUMENTPATH or $NDISCHEMAPATH.
+
+        The remainder of the path is looked up in each folder returned by
+        document_folders() or schema_folders(); the first existing file wins.
+        Other paths are returned unchanged.
+
+        Args:
+            path (str): e.g. '$NDIDOCUMENTPATH/element.json'.
+
+        Returns:
+            str: The file path, or None if a $-prefixed path matches no file.
+        """
+        for prefix, folders in (('$NDIDOCUMENTPATH', PathConstants.document_folders),
+                                ('$NDISCHEMAPATH', PathConstants.schema_folders)):
+            if path.startswith(prefix):
+                relative = path[len(prefix):].replace('\\', '/').lstrip('/')
+                for folder in folders():
+                    candidate = os.path.join(folder, *relative.split('/'))
+                    if os.path.isfile(candidate):
+                        return candidate
+                return None
+        return path
@@ -0,0 +1,252 @@
+import json
+import marshal
+import sys
+import threading
+
+from .document_definition import class_registry, copy_properties
+from .document_hash import DEFAULT_IGNORE_FIELDS, content_hash
+
+# One shared, read-only 'document_class' block per distinct class description.
+# The table is bounded; class descriptions beyond it are simply not shared.
+MAX_CLASS_BLOCKS = 4096
+_class_blocks = {}
+_class_lock = threading.Lock()
+
+_BASE_SLOTS = ('id', 'session_id', 'datestamp')
+
+
+def _shared_class_block(document_class):
+    key = marshal.dumps(document_class)
+    block = _class_blocks.get(key)
+    if block is None:
+        block = _intern_keys(document_class)
+        with _class_lock:
+            if len(_class_blocks) < MAX_CLASS_BLOCKS:
+                block = _class_blocks.setdefault(key, block)
+    return block
+
+
+def _intern_keys(value):
+    """
+    Returns a copy of JSON-like data with every dict key interned.
+
+    Interned strings are marked as such by marshal, so the keys of decoded
+    copies are shared too.
+    """
+    if isinstance(value, dict):
+        return {sys.intern(k) if isinstance(k, str) else k: _intern_keys(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_intern_keys(v) for v in value]
+    return value
+
+
+class CompactDocument:
+    """
+    A memory-efficient, read-mostly form of an NDI document.
+
+    The ID, session ID, datestamp and class name are kept in typed slots; the
+    'document_class' block is shared by all documents with the same class
+    description; everything else is kept as one marshalled bytes object with
+    interned keys. This uses a fraction of the memory of a nested dict and
+    suits large search results.
+
+    document_properties decodes the full dict (equal to the original, in the
+    same key order) the first time it is used and keeps it, so existing code
+    that reads or changes the properties works unchanged. compact() packs a
+    decoded document again.
+
+    A CompactDocument is not an ndi.document.Document (isinstance is False).
+    It provides the read methods of one (id, session_id, doc_class, doc_isa,
+    doc_superclass, dependency, dependency_value, content_hash, to_table) and
+    the setters set_session_id and set_dependency_value; the read methods
+    work on the compact form without keeping a decoded copy. Use
+    to_document() for anything else.
+    """
+
+    __slots__ = ('_id', '_session_id', '_datestamp', '_class_name', '_document_class', '_payload', '_properties',
+                 '_hashes')
+
+    def __init__(self, document_properties):
+        """
+        Creates a compact document from document properties (a dict) or any
+        object with a document_properties attribute.
+        """
+        if not isinstance(document_properties, dict):
+            document_properties = document_properties.document_properties
+        self._properties = None
+        self._pack(document_properties)
+
+    @classmethod
+    def from_json(cls, raw):
+        """
+        Creates a compact document from JSON text (str or bytes).
+        """
+        return cls(json.loads(raw))
+
+    def _pack(self, document_properties):
+        # Slotted values are replaced by None placeholders, so the decoded
+        # dicts keep the original key order
+        rest = dict(document_properties)
+        slots = {}
+        base = rest.get('base')
+        if isinstance(base, dict):
+            base = dict(base)
+            for name in _BASE_SLOTS:
+                if isinstance(base.get(name), str):
+                    slots[name] = base[name]
+                    base[name] = None
+            rest['base'] = base
+
+        document_class = rest.get('document_class')
+        if document_class is not None:
+            rest['document_class'] = None
+        self._document_class = None if document_class is None else _shared_class_block(document_class)
+        class_name = document_class.get('class_name') if isinstance(document_class, dict) else None
+        self._class_name = sys.intern(class_name) if isinstance(class_name, str) else None
+
+        self._id = slots.get('id')
+        session_id = slots.get('session_id')
+        self._session_id = None if session_id is None else sys.intern(session_id)
+        self._datestamp = slots.get('datestamp')
+        self._payload = marshal.dumps(_intern_keys(rest))
+        self._properties = None
+        # Content hashes by ignored fields, and the decoded properties they were computed from
+        self._hashes = (None, {})
+
+    def compact(self):
+        """
+        Packs the document again after document_properties was decoded.
+        """
+        if self._properties is not None:
+            self._pack(self._properties)
+
+    def _decode(self):
+        # A new dict of the properties, without keeping it
+        properties = marshal.loads(self._payload)
+        base = properties.get('base')
+        for name, value in (('id', self._id), ('session_id', self._session_id), ('datestamp', self._datestamp)):
+            if value is not None:
+                base[name] = value
+        if self._document_class is not None:
+            properties['document_class'] = copy_properties(self._document_class)
+        return properties
+
+    def _read_properties(self):
+        # The properties for reading: the decoded dict, or a temporary copy
+        return self._properties if self._properties is not None else self._decode()
+
+    @property
+    def document_properties(self):
+        properties = self._properties
+        if properties is None:
+            properties = self._properties = self._decode()
+            self._payload = None
+            # The hashes computed from the compact form describe the same properties
+            self._hashes = (properties, self._hashes[1])
+        return properties
+
+    def _base_field(self, name, slot_value):
+        if self._properties is not None:
+            base = self._properties.get('base')
+            return base.get(name) if isinstance(base, dict) else None
+        if slot_value is not None:
+            return slot_value
+        base = marshal.loads(self._payload).get('base')
+        return base.get(name) if isinstance(base, dict) else None
+
+    def id(self):
+        return self._base_field('id', self._id)
+
+    def session_id(self):
+        return self._base_field('session_id', self._session_id)
+
+    def datestamp(self):
+        return self._base_field('datestamp', self._datestamp)
+
+    def set_session_id(self, session_id):
+        if self._properties is None and self._session_id is not None:
+            self._session_id = sys.intern(session_id)
+            self._hashes = (None, {})
+        else:
+            self.document_properties['base']['session_id'] = session_id
+
+    def dependency(self):
+        deps = self._read_properties().get('depends_on', [])
+        return [d['name'] for d in deps], deps
+
+    def dependency_value(self, dependency_name, error_if_not_found=True):
+        for d in self._read_properties().get('depends_on', []):
+            if d['name'] == dependency_name:
+                return d['value']
+        if error_if_not_found:
+            raise ValueError(f"Dependency '{dependency_name}' not found.")
+        return None
+
+    def set_dependency_value(self, dependency_name, value, error_if_not_found=True):
+        deps = self.document_properties.setdefault('depends_on', [])
+        for d in deps:
+            if d['name'] == dependency_name:
+                d['value'] = value
+                return
+        if error_if_not_found:
+            raise ValueError(f"Dependency '{dependency_name}' not found.")
+        deps.append({'name': dependency_name, 'value': value})
+
+    def content_hash(self, ignore_fields=DEFAULT_IGNORE_FIELDS, refresh=False):
+        """
+        Returns the canonical content hash of the document (see ndi.document_hash),
+        as ndi.document.Document.content_hash does.
+
+        The hash is remembered. While the document is compact it cannot change;
+        once document_properties is decoded, use refresh=True after changing it
+        in place.
+        """
+        ignore_fields = tuple(ignore_fields)
+        owner, hashes = self._hashes
+        if refresh or owner is not self._properties:
+            owner, hashes = self._hashes = (self._properties, {})
+        h = hashes.get(ignore_fields)
+        if h is None:
+            h = hashes[ignore_fields] = content_hash(self._read_properties(), ignore_fields)
+        return h
+
+    def to_table(self):
+        from .util.cow import without_fields
+        from .util.vlt import data as vlt_data
+        return vlt_data.flattenstruct2table(without_fields(self._read_properties(), ['depends_on', 'files']))
+
+    def _class_block(self):
+        if self._properties is not None:
+            return self._properties.get('document_class', {})
+        return self._document_class or {}
+
+    def doc_class(self):
+        if self._properties is not None:
+            return self._class_block().get('class_name')
+        return self._class_name
+
+    def doc_superclass(self):
+        return list(class_registry.superclasses(self._class_block()))
+
+    def doc_isa(self, document_class):
+        return document_class == self.doc_class() or \
+            document_class in class_registry.superclasses(self._class_block())
+
+    def to_document(self):
+        """
+        Returns an ndi.document.Document with a separate copy of the properties.
+        """
+        from .document import Document
+        if self._properties is None:
+            return Document(self._decode())
+        return Document(copy_properties(self._properties))
+
+    def __repr__(self):
+        return f"CompactDocument(id={self.id()!r}, class={self.doc_class()!r})"
+
+
+def compact_documents(documents):
+    """
+    Converts documents (or document_properties dicts) to CompactDocument objects.
+    """
+    return [d if isinstance(d, CompactDocument) else CompactDocument(d) for d in documents]
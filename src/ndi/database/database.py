@@ -1,12 +1,74 @@
 import abc
+import json
+from .fieldsearch import project_fields
+from .fileuid import FileUIDIndex
+from .fun import search_structure
+from .trigram import TrigramIndex, plan_search
 
 class Database(abc.ABC):
-    def __init__(self, path, session_unique_reference):
+    def __init__(self, path, session_unique_reference, index_fields=None):
+        """
+        Initializes a new Database object.
+
+        Args:
+            path: The location of the database.
+            session_unique_reference: The unique reference of the session.
+            index_fields (list of str, optional): Dotted string fields (e.g. 'base.name')
+                to keep in a trigram index that accelerates 'regexp' and
+                'contains_string' searches.
+        """
         self.path = path
         self.session_unique_reference = session_unique_reference
+        self.trigram_index = TrigramIndex(index_fields) if index_fields else None
+        self.fuid_index = FileUIDIndex()
 
     def open(self):
-        return self.do_open_database()
+        result = self.do_open_database()
+        if self.trigram_index is not None:
+            self.rebuild_index()
+        self.rebuild_fuid_index()
+        return result
+
+    def rebuild_index(self):
+        """
+        Rebuilds the trigram index from the documents in the database.
+        """
+        self.trigram_index.clear()
+        for doc_id in self.alldocids():
+            doc = self.do_read(doc_id)
+            if doc is not None:
+                self.trigram_index.add(doc_id, doc.document_properties)
+
+    def rebuild_fuid_index(self):
+        """
+        Rebuilds the file UID index from the documents in the database.
+        """
+        self.fuid_index.clear()
+        for doc_id in self.alldocids():
+            doc = self.do_read(doc_id)
+            if doc is not None:
+                self.fuid_index.add(doc_id, doc.document_properties)
+
+    def find_fuid(self, fuid):
+        """
+        Looks up a file UID in the file UID index.
+
+        Returns:
+            tuple: (doc_id, filename) of the first (by document ID) document that
+                has the file, or (None, '') if no document has it.
+        """
+        holders = self.find_fuids([fuid]).get(fuid)
+        return holders[0] if holders else (None, '')
+
+    def find_fuids(self, fuids):
+        """
+        Looks up many file UIDs in the file UID index.
+
+        Returns:
+            dict: file UID -> list of (doc_id, filename), sorted, for each UID
+                that was found.
+        """
+        return self.fuid_index.find_many(fuids)
 
     def new_document(self, document_type='base'):
         # This will depend on the ndi.document class
@@ -14,11 +76,49 @@ class Database(abc.ABC):
 
     def add(self, ndi_document_obj, update=True):
         add_parameters = {'update': update}
-        return self.do_add(ndi_document_obj, add_parameters)
+        result = self.do_add(ndi_document_obj, add_parameters)
+        props = ndi_document_obj.document_properties
+        if self.trigram_index is not None:
+            self.trigram_index.add(props['base']['id'], props)
+        self.fuid_index.add(props['base']['id'], props)
+        return result
+
+    def add_many(self, ndi_document_objs, update=True):
+        """
+        Adds several documents. Implementations may override this with a bulk insert.
+        """
+        for ndi_document_obj in ndi_document_objs:
+            self.add(ndi_document_obj, update=update)
 
     def read(self, ndi_document_id):
         return self.do_read(ndi_document_id)
 
+    def export(self, path, shards=1, compression='gzip', compresslevel=6, workers=None):
+        """
+        Exports all documents to compressed newline-delimited JSON shards.
+
+        See ndi.database.ndjson.export_documents.
+
+        Returns:
+            dict: The manifest (shard files, document counts and checksums).
+        """
+        from .ndjson import export_documents
+        return export_documents(self, path, shards=shards, compression=compression,
+                                compresslevel=compresslevel, workers=workers)
+
+    def import_(self, path, workers=1, update=True):
+        """
+        Imports documents written by export(), parsing shards in worker processes.
+
+        (The trailing underscore avoids the 'import' keyword.) See
+        ndi.database.ndjson.import_documents.
+
+        Returns:
+            int: The number of documents imported.
+        """
+        from .ndjson import import_documents
+        return import_documents(self, path, workers=workers, update=update)
+
     def openbinarydoc(self, ndi_document_or_id, filename):
         # implementation will go here
         pass
@@ -32,8 +132,16 @@ class Database(abc.ABC):
         pass
 
     def remove(self, ndi_document_id):
-        # implementation will go here
-        pass
+        if not isinstance(ndi_document_id, list):
+            ndi_document_id = [ndi_document_id]
+
+        for item in ndi_document_id:
+            if hasattr(item, 'document_properties'):
+                item = item.document_properties['base']['id']
+            self.do_remove(item)
+            if self.trigram_index is not None:
+                self.trigram_index.remove(item)
+            self.fuid_index.remove(item)
 
     def alldocids(self):
         # needs to be overridden
@@ -44,8 +152,46 @@ class Database(abc.ABC):
         pass
 
     def search(self, searchparams):
-        # implementation will go here
-        pass
+        """
+        Searches the database.
+
+        The query is first planned: regular expressions that match every string
+        are reduced to field-presence tests, and the trigram index (if any)
+        narrows the candidates of 'regexp' and 'contains_string' terms. The plan
+        is passed to do_search in searchoptions as 'search_structure' (the
+        rewritten terms) and 'candidate_ids' (a set that contains every match,
+        or None to scan all documents). Implementations that evaluate the
+        rewritten terms must restrict their scan to the candidates.
+        """
+        structure, candidate_ids = plan_search(search_structure(searchparams), self.trigram_index)
+        searchoptions = {'search_structure': structure, 'candidate_ids': candidate_ids}
+        return self.do_search(searchoptions, searchparams)
+
+    def search_fields(self, searchparams, fields):
+        """
+        Searches the database and returns only selected fields of the matches, as columns.
+
+        Implementations may override this to avoid building document objects;
+        the documents are still read, and only the requested fields are kept.
+
+        Args:
+            searchparams: An ndi.query.Query or search structure.
+            fields (list of str): Dotted field names (e.g. 'element.name', or
+                'element' for the whole sub-struct).
+
+        Returns:
+            dict: 'base.id' and each field, mapped to a list with one value per
+                matching document (None where the field is absent).
+        """
+        return project_fields((doc.document_properties for doc in self.search(searchparams)), fields)
+
+    def _bulk_add_raw(self, raw_documents, update=True):
+        """
+        Adds documents given as (document_id, json_bytes, content_hash) tuples;
+        content_hash may be None.
+        """
+        from ..document import Document
+        self.add_many((Document(json.loads(raw)) for _, raw, _ in raw_documents), update=update)
 
     # Protected methods
     @abc.abstractmethod
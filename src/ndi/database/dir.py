@@ -0,0 +1,746 @@
+import json
+import os
+import re
+import shutil
+import threading
+from contextlib import contextmanager
+
+from .database import Database
+from .fieldsearch import field_search, project_fields
+from .fileuid import FileUIDIndex
+from .fun import search_structure
+from .trigram import plan_search
+from ..compact_document import CompactDocument
+from ..document_hash import content_hash
+from ..util.filelock import FileLock
+
+# Names stored as they are; lower case only, so that no two differ only by
+# case on a case-insensitive file system
+_SAFE_ID = re.compile(r'^[a-z0-9_.\-]+$')
+
+
+def _file_info(document_properties):
+    files = document_properties.get('files')
+    file_info = (files.get('file_info') if isinstance(files, dict) else None) or []
+    return [file_info] if isinstance(file_info, dict) else file_info
+
+
+def _locations(info):
+    locations = info.get('locations') or []
+    return [locations] if isinstance(locations, dict) else locations
+
+
+def _document(document_properties):
+    from ..document import Document
+    return Document(document_properties)
+
+
+class Snapshot:
+    """
+    A consistent, read-only view of an ndi.database.dir.Dir database at one generation.
+
+    Taking a snapshot never blocks the writer, and a snapshot never sees a
+    partially committed write: every generation refers to immutable document
+    files that are written before the generation is published.
+    """
+
+    def __init__(self, database, generation, entries):
+        self.database = database
+        self.generation = generation
+        self._entries = entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, ndi_document_id):
+        return ndi_document_id in self._entries
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def alldocids(self):
+        return list(self._entries)
+
+    def read_properties(self, ndi_document_id):
+        """
+        Returns the document_properties of a document, or None if it is not in the snapshot.
+        """
+        relpath = self._entries.get(ndi_document_id)
+        if relpath is None:
+            return None
+        return self.database._read_object(relpath)
+
+    def read_raw(self, ndi_document_id):
+        """
+        Returns the stored JSON text (bytes) of a document, or None if it is not in the snapshot.
+        """
+        relpath = self._entries.get(ndi_document_id)
+        if relpath is None:
+            return None
+        return self.database._read_raw_object(relpath)
+
+    def read(self, ndi_document_id):
+        document_properties = self.read_properties(ndi_document_id)
+        if document_properties is None:
+            return None
+        return _document(document_properties)
+
+    def content_hash(self, ndi_document_id):
+        """
+        Returns the canonical content hash of a document (see ndi.document_hash),
+        or None if it is not in the snapshot.
+        """
+        relpath = self._entries.get(ndi_document_id)
+        if relpath is None:
+            return None
+        return self.database._content_hash(relpath)
+
+    def content_hashes(self):
+        """
+        Returns the content hashes of all documents in the snapshot, keyed by document ID.
+        """
+        return {doc_id: self.database._content_hash(relpath) for doc_id, relpath in self._entries.items()}
+
+    def search(self, searchparams, compact=False):
+        """
+        Returns the documents in the snapshot that match a query.
+
+        Args:
+            searchparams: An ndi.query.Query or search structure.
+            compact (bool): Return ndi.compact_document.CompactDocument objects,
+                which use much less memory for large result sets.
+        """
+        make = CompactDocument if compact else _document
+        return [make(document_properties) for document_properties in self._matching(searchparams)]
+
+    def search_fields(self, searchparams, fields):
+        """
+        Returns selected fields of the documents that match a query, as columns
+        (see ndi.database.Database.search_fields).
+
+        Each candidate document is still read and parsed in full to be matched;
+        the fields are then copied from the parsed properties, so only the cost
+        of building document objects is saved.
+        """
+        return project_fields(self._matching(searchparams), fields)
+
+    def find_fuid(self, fuid):
+        """
+        Returns (doc_id, filename) for the first (by document ID) document in
+        the snapshot that holds a file UID, or (None, '') if there is none.
+        """
+        holders = self.find_fuids([fuid]).get(fuid)
+        return holders[0] if holders else (None, '')
+
+    def find_fuids(self, fuids):
+        """
+        Looks up many file UIDs at once.
+
+        The database's file UID index is brought up to date with the documents
+        changed since it was last used, so a lookup reads only those documents.
+
+        Returns:
+            dict: file UID -> list of (doc_id, filename), sorted, for each UID
+                that was found.
+        """
+        index = self.database._fuid_index_at(self.generation)
+        if index is not None:
+            return index.find_many(fuids)
+        # The index has moved past this snapshot; index the snapshot on its own
+        index = FileUIDIndex()
+        for doc_id in self._entries:
+            index.add(doc_id, self.read_properties(doc_id))
+        return index.find_many(fuids)
+
+    def _matching(self, searchparams):
+        """
+        Yields the properties of each document in the snapshot that matches a query.
+        """
+        index = self.database._index_at(self.generation)
+        structure, candidate_ids = plan_search(search_structure(searchparams), index)
+        if candidate_ids is None:
+            doc_ids = self._entries.keys()
+        else:
+            doc_ids = [i for i in candidate_ids if i in self._entries]
+
+        regex_cache = {}
+        for doc_id in doc_ids:
+            document_properties = self.read_properties(doc_id)
+            if field_search(document_properties, structure, regex_cache):
+                yield document_properties
+
+
+class Dir(Database):
+    """
+    A multi-version database of JSON documents stored in a directory.
+
+    Every commit publishes a new generation. Documents are written to immutable
+    object files, the change is recorded in a log entry, and only then is the
+    CURRENT file atomically replaced to point at the new generation. Readers take
+    a Snapshot of the current generation without any locking and see a
+    consistent, point-in-time view for as long as they hold it. Writers are
+    serialized across processes with a lock file, so several processes may open
+    the same directory.
+
+    Binary files are described by a document's files.file_info. A location
+    marked for ingestion is copied into the database when the document is
+    committed, and is then read from there; other locations are read in place.
+
+    Layout of the database directory:
+        CURRENT                      the latest committed generation
+        LOCK                         the writer lock file
+        objects/xx/<id>-<gen>.json   document properties, never modified
+        files/xx/<uid>               ingested binary files, never modified
+        log/<gen>.delta.json         documents added and removed by each generation
+        log/<gen>.checkpoint.json    the full document map at some generations
+    """
+
+    def __init__(self, path, session_unique_reference, index_fields=None, checkpoint_interval=256, durable=True,
+                 content_hashes=False):
+        """
+        Initializes a new Dir database. The directory is created on the first write.
+
+        Args:
+            path (str): The database directory.
+            session_unique_reference: The unique reference of the session.
+            index_fields (list of str, optional): Dotted string fields to keep in a
+                trigram index (see ndi.database.Database).
+            checkpoint_interval (int): Write a full checkpoint every this many generations.
+            durable (bool): fsync each file before publishing a generation.
+            content_hashes (bool): Compute each document's content hash when it is
+                written and record it in the log, so that other handles and later
+                sessions do not need to recompute it.
+        """
+        super().__init__(path, session_unique_reference, index_fields=index_fields)
+        self.checkpoint_interval = checkpoint_interval
+        self.durable = durable
+        self._mutex = threading.RLock()
+        self._writer_mutex = threading.RLock()
+        self._cache = (0, {})
+        self._pending = None
+        self._no_update_ids = set()
+        self._index_generations = {}
+        self.store_content_hashes = content_hashes
+        # Object files never change, so a hash computed for one stays valid
+        self._hash_cache = {}
+
+    # Snapshots and transactions
+
+    def generation(self):
+        """
+        Returns the latest committed generation (0 for an empty database).
+        """
+        try:
+            with open(os.path.join(self.path, 'CURRENT'), 'r') as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def snapshot(self):
+        """
+        Returns a Snapshot of the latest committed generation.
+        """
+        with self._mutex:
+            generation = self.generation()
+            return Snapshot(self, generation, self._state(generation))
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups adds and removes into a single commit.
+
+        Changes made inside the block are invisible to readers (including
+        snapshots taken in this process) until the block exits without error.
+
+        Example:
+            with db.transaction():
+                for doc in docs:
+                    db.add(doc)
+        """
+        with self._writer_mutex:
+            if self._pending is not None:
+                # Nested transactions join the outer one
+                yield self
+                return
+            self._pending = {}
+            self._no_update_ids = set()
+            try:
+                yield self
+                pending, no_update_ids = self._pending, self._no_update_ids
+            finally:
+                self._pending = None
+                self._no_update_ids = set()
+            self._commit(pending, no_update_ids)
+
+    # Database interface
+
+    def add(self, ndi_document_obj, update=True):
+        return self.do_add(ndi_document_obj, {'update': update})
+
+    def add_many(self, ndi_document_objs, update=True):
+        with self.transaction():
+            for ndi_document_obj in ndi_document_objs:
+                self.do_add(ndi_document_obj, {'update': update})
+
+    def remove(self, ndi_document_id):
+        if not isinstance(ndi_document_id, list):
+            ndi_document_id = [ndi_document_id]
+        with self.transaction():
+            for item in ndi_document_id:
+                if hasattr(item, 'document_properties'):
+                    item = item.document_properties['base']['id']
+                self.do_remove(item)
+
+    def search(self, searchparams, compact=False):
+        return self.snapshot().search(searchparams, compact=compact)
+
+    def search_fields(self, searchparams, fields):
+        return self.snapshot().search_fields(searchparams, fields)
+
+    def alldocids(self):
+        return self.snapshot().alldocids()
+
+    def rebuild_index(self):
+        if self.trigram_index is None:
+            return
+        with self._mutex:
+            self._index_generations.pop('trigram', None)
+            self._index_at(self.generation())
+
+    def rebuild_fuid_index(self):
+        # The index is rebuilt by the next lookup
+        with self._mutex:
+            self._index_generations.pop('fuid', None)
+
+    def find_fuids(self, fuids):
+        return self.snapshot().find_fuids(fuids)
+
+    def do_add(self, ndi_document_obj, add_parameters):
+        document_properties = ndi_document_obj.document_properties
+        doc_id = document_properties['base']['id']
+        # Serialized now, so changes made to the document before the commit are not stored
+        raw = json.dumps(document_properties).encode('utf-8')
+        h = content_hash(document_properties) if self.store_content_hashes else None
+        with self.transaction():
+            self._pending[doc_id] = (raw, h)
+            if not add_parameters.get('update', True):
+                self._no_update_ids.add(doc_id)
+
+    def _bulk_add_raw(self, raw_documents, update=True):
+        # The JSON text is stored as-is; it is parsed only to compute content
+        # hashes that are not given
+        with self.transaction():
+            for doc_id, raw, h in raw_documents:
+                self._pending[doc_id] = (raw, h)
+                if not update:
+                    self._no_update_ids.add(doc_id)
+
+    def do_read(self, ndi_document_id):
+        return self.snapshot().read(ndi_document_id)
+
+    def do_remove(self, ndi_document_id):
+        with self.transaction():
+            self._pending[ndi_document_id] = None
+            self._no_update_ids.discard(ndi_document_id)
+
+    def do_search(self, searchoptions, searchparams):
+        return self.search(searchparams)
+
+    def openbinarydoc(self, ndi_document_or_id, filename):
+        """
+        Opens a binary file of a document for reading.
+
+        Returns:
+            A binary file object; close it with closebinarydoc.
+
+        Raises:
+            FileNotFoundError: If the document has no such file, or none of
+                its locations can be read.
+        """
+        return self.do_openbinarydoc(ndi_document_or_id, filename)
+
+    def existbinarydoc(self, ndi_document_or_id, filename):
+        """
+        Checks whether a binary file of a document can be read.
+
+        Returns:
+            tuple: (exists, file_path) file_path is '' if the file does not exist.
+        """
+        return self.check_exist_binarydoc(ndi_document_or_id, filename)
+
+    def closebinarydoc(self, ndi_binarydoc_obj):
+        return self.do_closebinarydoc(ndi_binarydoc_obj)
+
+    def do_openbinarydoc(self, ndi_document_id, filename):
+        return open(self._binary_path(ndi_document_id, filename), 'rb')
+
+    def check_exist_binarydoc(self, ndi_document_id, filename):
+        try:
+            return True, self._binary_path(ndi_document_id, filename)
+        except FileNotFoundError:
+            return False, ''
+
+    def do_closebinarydoc(self, ndi_binarydoc_obj):
+        if ndi_binarydoc_obj is not None:
+            ndi_binarydoc_obj.close()
+
+    def do_open_database(self):
+        return self
+
+    # Maintenance
+
+    def vacuum(self, keep_generations=0):
+        """
+        Deletes document files and log entries that no retained generation needs.
+
+        Args:
+            keep_generations (int): How many generations before the current one must
+                remain readable. Snapshots of older generations may fail after vacuum.
+        """
+        with self._writer_mutex, self._writer_lock():
+            generation = self.generation()
+            oldest = max(generation - keep_generations, 0)
+            entries = self._state(oldest)
+            referenced = set(entries.values())
+            for g in range(oldest + 1, generation + 1):
+                delta = self._read_log(g, 'delta')
+                if delta is None:
+                    raise RuntimeError(f"Missing log entry for generation {g} in {self.path}.")
+                referenced.update(delta['add'].values())
+
+            if oldest > 0:
+                self._write_log(oldest, 'checkpoint', {'generation': oldest, 'documents': entries})
+
+            log_dir = os.path.join(self.path, 'log')
+            if os.path.isdir(log_dir):
+                for name in os.listdir(log_dir):
+                    g = self._log_generation(name)
+                    if g is not None and g < oldest:
+                        os.remove(os.path.join(log_dir, name))
+
+            objects_dir = os.path.join(self.path, 'objects')
+            if os.path.isdir(objects_dir):
+                for prefix in os.listdir(objects_dir):
+                    for name in os.listdir(os.path.join(objects_dir, prefix)):
+                        if f'objects/{prefix}/{name}' not in referenced:
+                            os.remove(os.path.join(objects_dir, prefix, name))
+
+    # Internal
+
+    def _writer_lock(self):
+        os.makedirs(self.path, exist_ok=True)
+        return FileLock(os.path.join(self.path, 'LOCK'))
+
+    def _commit(self, pending, no_update_ids):
+        if not pending:
+            return self.generation()
+        with self._writer_mutex, self._writer_lock():
+            generation = self.generation()
+            entries = self._state(generation)
+
+            existing = [i for i in no_update_ids if i in entries and pending.get(i) is not None]
+            if existing:
+                raise ValueError(f"Document(s) already exist in the database and update is false: {existing}")
+
+            new_generation = generation + 1
+            ingested = []
+            added = {}
+            hashes = {}
+            removed = []
+            for doc_id, item in pending.items():
+                if item is None:
+                    if doc_id in entries:
+                        removed.append(doc_id)
+                    continue
+                raw, h = item
+                if self.store_content_hashes:
+                    hashes[doc_id] = h if h is not None else content_hash(json.loads(raw))
+                ingested.extend(self._ingest_files(raw))
+                relpath = self._object_path(doc_id, new_generation)
+                self._write_object(relpath, raw)
+                added[doc_id] = relpath
+            if self.durable:
+                self._sync_objects(list(added.values()) + [relpath for relpath, _ in ingested])
+
+            new_entries = dict(entries)
+            new_entries.update(added)
+            for doc_id in removed:
+                del new_entries[doc_id]
+
+            delta = {'generation': new_generation, 'add': added, 'remove': removed}
+            if hashes:
+                delta['hashes'] = hashes
+                for doc_id, h in hashes.items():
+                    self._hash_cache[added[doc_id]] = h
+            self._write_log(new_generation, 'delta', delta)
+            if new_generation % self.checkpoint_interval == 0:
+                self._write_log(new_generation, 'checkpoint', {'generation': new_generation, 'documents': new_entries})
+            self._atomic_write('CURRENT', f'{new_generation}\n'.encode('utf-8'))
+
+            with self._mutex:
+                self._cache = (new_generation, new_entries)
+            # Originals are deleted only once the copies are published
+            for _, original in ingested:
+                if original is not None and os.path.isfile(original):
+                    os.remove(original)
+            return new_generation
+
+    def _state(self, generation):
+        """
+        Returns the map of document id -> object file for a generation. The
+        returned dict is shared with snapshots and must never be modified.
+        """
+        with self._mutex:
+            cached_generation, cached_entries = self._cache
+            if cached_generation == generation:
+                return cached_entries
+
+            entries = None
+            if cached_generation < generation:
+                entries = self._replay(cached_entries, cached_generation, generation)
+            if entries is None:
+                checkpoint_generation, checkpoint_entries = self._latest_checkpoint(generation)
+                entries = self._replay(checkpoint_entries, checkpoint_generation, generation)
+                if entries is None:
+                    raise RuntimeError(f"Cannot reconstruct generation {generation} of {self.path}.")
+
+            if generation > cached_generation:
+                self._cache = (generation, entries)
+            return entries
+
+    def _replay(self, entries, from_generation, to_generation):
+        if from_generation == to_generation:
+            return entries
+        entries = dict(entries)
+        for g in range(from_generation + 1, to_generation + 1):
+            delta = self._read_log(g, 'delta')
+            if delta is None:
+                return None
+            entries.update(delta['add'])
+            for doc_id in delta['remove']:
+                entries.pop(doc_id, None)
+            for doc_id, h in delta.get('hashes', {}).items():
+                self._hash_cache[delta['add'][doc_id]] = h
+        return entries
+
+    def _latest_checkpoint(self, generation):
+        log_dir = os.path.join(self.path, 'log')
+        best = 0
+        if os.path.isdir(log_dir):
+            for name in os.listdir(log_dir):
+                if name.endswith('.checkpoint.json'):
+                    g = self._log_generation(name)
+                    if g is not None and best < g <= generation:
+                        best = g
+        if best == 0:
+            return 0, {}
+        return best, self._read_log(best, 'checkpoint')['documents']
+
+    def _index_at(self, generation):
+        """
+        Returns the trigram index synchronized to a generation, or None if there is
+        no index or the generation is older than the index.
+        """
+        if self.trigram_index is None:
+            return None
+        return self._synchronize_index('trigram', self.trigram_index, generation)
+
+    def _fuid_index_at(self, generation):
+        """
+        Returns the file UID index synchronized to a generation, or None if the
+        generation is older than the index.
+        """
+        return self._synchronize_index('fuid', self.fuid_index, generation)
+
+    def _synchronize_index(self, name, index, generation):
+        # Brings an in-memory index up to a generation by re-indexing only the
+        # documents changed since the generation it was last synchronized to
+        with self._mutex:
+            indexed = self._index_generations.get(name, -1)
+            if indexed == generation:
+                return index
+            if indexed > generation:
+                return None
+
+            changed = self._changed_ids(indexed, generation)
+            entries = self._state(generation)
+            if changed is None:
+                index.clear()
+                changed = entries.keys()
+            for doc_id in changed:
+                relpath = entries.get(doc_id)
+                if relpath is None:
+                    index.remove(doc_id)
+                else:
+                    index.add(doc_id, self._read_object(relpath))
+            self._index_generations[name] = generation
+            return index
+
+    def _changed_ids(self, from_generation, to_generation):
+        if from_generation < 0:
+            return None
+        changed = set()
+        for g in range(from_generation + 1, to_generation + 1):
+            delta = self._read_log(g, 'delta')
+            if delta is None:
+                return None
+            changed.update(delta['add'])
+            changed.update(delta['remove'])
+        return changed
+
+    def _content_hash(self, relpath):
+        h = self._hash_cache.get(relpath)
+        if h is None:
+            h = self._hash_cache[relpath] = content_hash(self._read_object(relpath))
+        return h
+
+    @staticmethod
+    def _safe_name(key):
+        # A file name for a document ID or file UID. Other keys are hex-encoded
+        # behind '=', which no stored name contains
+        return key if _SAFE_ID.match(key) else '=' + key.encode('utf-8').hex()
+
+    def _object_path(self, doc_id, generation):
+        name = self._safe_name(doc_id)
+        return f'objects/{name[:2]}/{name}-{generation}.json'
+
+    def _file_path(self, uid):
+        name = self._safe_name(uid)
+        return f'files/{name[:2]}/{name}'
+
+    def _ingest_files(self, raw):
+        """
+        Copies the file locations of a document (its stored JSON text) that
+        are marked for ingestion into the database.
+
+        Returns:
+            list of tuple: (relpath, original) for each copied file; original is
+                the path to delete after the commit, or None to keep it.
+        """
+        if b'"ingest"' not in raw:
+            return []
+        document_properties = json.loads(raw)
+        ingested = []
+        for info in _file_info(document_properties):
+            for location in _locations(info):
+                if not location.get('ingest') or not location.get('uid'):
+                    continue
+                source = location.get('location')
+                relpath = self._file_path(str(location['uid']))
+                path = os.path.join(self.path, relpath)
+                if not os.path.isfile(path):
+                    if not isinstance(source, str) or not os.path.isfile(source):
+                        raise FileNotFoundError(f"File '{source}' of document "
+                                                f"{document_properties['base']['id']} cannot be ingested.")
+                    # Copied under a temporary name so that a failed commit leaves no partial file
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                    shutil.copyfile(source, tmp)
+                    os.replace(tmp, path)
+                ingested.append((relpath, source if location.get('delete_original') else None))
+        return ingested
+
+    def _binary_path(self, ndi_document_or_id, filename):
+        """
+        Returns the path of a readable copy of a document's binary file.
+        """
+        if hasattr(ndi_document_or_id, 'document_properties'):
+            document_properties = ndi_document_or_id.document_properties
+            doc_id = document_properties['base']['id']
+        else:
+            doc_id = ndi_document_or_id
+            document_properties = self.snapshot().read_properties(doc_id)
+            if document_properties is None:
+                raise FileNotFoundError(f"Document {doc_id} is not in the database.")
+        for info in _file_info(document_properties):
+            if info.get('name') != filename:
+                continue
+            for location in _locations(info):
+                if location.get('uid'):
+                    path = os.path.join(self.path, self._file_path(str(location['uid'])))
+                    if os.path.isfile(path):
+                        return path
+                source = location.get('location')
+                if location.get('location_type', 'file') == 'file' and isinstance(source, str) and os.path.isfile(source):
+                    return source
+            raise FileNotFoundError(f"File '{filename}' of document {doc_id} is not available.")
+        raise FileNotFoundError(f"Document {doc_id} has no file named '{filename}'.")
+
+    def _write_object(self, relpath, data):
+        # Object files get unique names and are unreachable until the generation
+        # is published, so they need no temporary file
+        path = os.path.join(self.path, relpath)
+        try:
+            f = open(path, 'wb')
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            f = open(path, 'wb')
+        with f:
+            f.write(data)
+
+    def _sync_objects(self, relpaths):
+        # Flushes the written files, then the directories that hold them (so
+        # that new names survive a crash) up to the database directory
+        directories = set()
+        for relpath in relpaths:
+            fd = os.open(os.path.join(self.path, relpath), os.O_RDWR)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            directory = os.path.dirname(relpath)
+            while directory and directory not in directories:
+                directories.add(directory)
+                directory = os.path.dirname(directory)
+        for directory in sorted(directories, key=len, reverse=True):
+            self._sync_directory(os.path.join(self.path, directory))
+
+    @staticmethod
+    def _sync_directory(path):
+        if os.name == 'nt':
+            # Directories cannot be opened for fsync on Windows
+            return
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _read_raw_object(self, relpath):
+        with open(os.path.join(self.path, relpath), 'rb') as f:
+            return f.read()
+
+    def _read_object(self, relpath):
+        with open(os.path.join(self.path, relpath), 'rb') as f:
+            return json.loads(f.read())
+
+    def _read_log(self, generation, kind):
+        try:
+            with open(os.path.join(self.path, 'log', f'{generation:012d}.{kind}.json'), 'rb') as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            return None
+
+    def _write_log(self, generation, kind, content):
+        self._atomic_write(f'log/{generation:012d}.{kind}.json', json.dumps(content).encode('utf-8'))
+
+    @staticmethod
+    def _log_generation(name):
+        head = name.split('.', 1)[0]
+        return int(head) if head.isdigit() else None
+
+    def _atomic_write(self, relpath, data):
+        path = os.path.join(self.path, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            if self.durable:
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+        if self.durable:
+            self._sync_directory(os.path.dirname(path))
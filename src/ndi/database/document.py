@@ -3,6 +3,7 @@ import uuid
 from did.document import Document as DIDDocument
 from ..fun.timestamp import timestamp
 from ..util.vlt import data as vlt_data
+from ..util.cow import with_fields, without_fields
 
 class Document(DIDDocument):
     def __init__(self, document_type, **kwargs):
@@ -58,19 +59,21 @@ class Document(DIDDocument):
             raise ValueError(f"Dependency '{dependency_name}' not found.")
 
     def __add__(self, other):
-        # Port of the 'plus' method
-        new_doc = Document(self.document_properties.copy())
-
-        # Merge superclasses
-        sc_a = new_doc.document_properties.setdefault('document_class', {}).setdefault('superclasses', [])
+        # Port of the 'plus' method. The result shares the subtrees that the
+        # merge does not change with self and other (see ndi.util.cow), except
+        # 'base' and 'depends_on', which the setters change in place.
+        sc_a = self.document_properties.get('document_class', {}).get('superclasses', [])
         sc_b = other.document_properties.get('document_class', {}).get('superclasses', [])
-        sc_a.extend(sc_b)
+        props = with_fields(self.document_properties, {'document_class.superclasses': sc_a + sc_b})
 
-        other_props = other.document_properties.copy()
-        other_props.pop('document_class', None)
+        other_props = without_fields(other.document_properties, ['document_class'])
 
         # Merge other properties
-        new_doc.document_properties = vlt_data.struct_merge(new_doc.document_properties, other_props)
-        return new_doc
+        merged = dict(vlt_data.structmerge(props, other_props))
+        if isinstance(merged.get('base'), dict):
+            merged['base'] = dict(merged['base'])
+        if isinstance(merged.get('depends_on'), list):
+            merged['depends_on'] = [dict(d) for d in merged['depends_on']]
+        return Document(merged)
 
     # We will rely on the DIDDocument's implementation of readblankdefinition for now
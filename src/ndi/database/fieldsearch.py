@@ -0,0 +1,192 @@
+import re
+from .fun import search_structure
+from ..document_definition import class_registry
+
+_MISSING = object()
+
+
+def field_value(document_properties, field):
+    """
+    Returns the value of a dotted field (e.g. 'base.name'), or None if it is absent.
+    """
+    value = _get(document_properties, field)
+    return None if value is _MISSING else value
+
+
+def _get(document_properties, field):
+    value = document_properties
+    for part in field.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _as_list(x):
+    if isinstance(x, (list, tuple)):
+        return list(x)
+    return [x]
+
+
+def _is_number(x):
+    return isinstance(x, (int, float)) and not isinstance(x, bool)
+
+
+def _compare(value, param, op):
+    values = _as_list(value)
+    if not values or not all(_is_number(v) for v in values) or not _is_number(param):
+        return False
+    return all(op(v, param) for v in values)
+
+
+def _subfield_match(value, fields, strings, exact):
+    items = value if isinstance(value, list) else [value]
+    fields = _as_list(fields)
+    strings = _as_list(strings)
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        ok = True
+        for f, s in zip(fields, strings):
+            v = item.get(f)
+            if not isinstance(v, str) or (v != s if exact else s not in v):
+                ok = False
+                break
+        if ok:
+            return True
+    return False
+
+
+def _partial_struct(value, param):
+    if isinstance(param, dict):
+        if not isinstance(value, dict):
+            return False
+        return all(k in value and _partial_struct(value[k], v) for k, v in param.items())
+    return value == param
+
+
+def _isa(document_properties, class_name):
+    document_class = document_properties.get('document_class', {})
+    if document_class.get('class_name') == class_name:
+        return True
+    return class_name in class_registry.superclasses(document_class)
+
+
+def _depends_on(document_properties, name, value):
+    for d in document_properties.get('depends_on', []) or []:
+        if (name == '*' or d.get('name') == name) and d.get('value') == value:
+            return True
+    return False
+
+
+def _term(document_properties, term, regex_cache):
+    operation = term.get('operation') or ''
+    negated = operation.startswith('~')
+    if negated:
+        operation = operation[1:]
+    param1 = term.get('param1')
+    param2 = term.get('param2')
+
+    if operation == 'or':
+        result = (_all_terms(document_properties, param1, regex_cache)
+                  or _all_terms(document_properties, param2, regex_cache))
+    elif operation == 'isa':
+        result = _isa(document_properties, param1)
+    elif operation == 'depends_on':
+        result = _depends_on(document_properties, param1, param2)
+    else:
+        value = _get(document_properties, term.get('field') or '')
+        if operation == 'hasfield':
+            result = value is not _MISSING
+        elif value is _MISSING:
+            result = False
+        elif operation == 'regexp':
+            regex = regex_cache.get(param1)
+            if regex is None:
+                regex = regex_cache[param1] = re.compile(param1)
+            result = isinstance(value, str) and regex.search(value) is not None
+        elif operation == 'exact_string':
+            result = isinstance(value, str) and value == param1
+        elif operation == 'exact_string_anycase':
+            result = isinstance(value, str) and isinstance(param1, str) and value.lower() == param1.lower()
+        elif operation == 'contains_string':
+            result = isinstance(value, str) and param1 in value
+        elif operation == 'exact_number':
+            result = _as_list(value) == _as_list(param1)
+        elif operation == 'lessthan':
+            result = _compare(value, param1, lambda a, b: a < b)
+        elif operation == 'lessthaneq':
+            result = _compare(value, param1, lambda a, b: a <= b)
+        elif operation == 'greaterthan':
+            result = _compare(value, param1, lambda a, b: a > b)
+        elif operation == 'greaterthaneq':
+            result = _compare(value, param1, lambda a, b: a >= b)
+        elif operation == 'hasmember':
+            result = param1 in _as_list(value)
+        elif operation == 'hasanysubfield_contains_string':
+            result = _subfield_match(value, param1, param2, exact=False)
+        elif operation == 'hasanysubfield_exact_string':
+            result = _subfield_match(value, param1, param2, exact=True)
+        elif operation == 'partial_struct':
+            result = _partial_struct(value, param1)
+        else:
+            raise ValueError(f"Unknown search operation '{operation}'.")
+
+    return not result if negated else result
+
+
+def _all_terms(document_properties, terms, regex_cache):
+    return all(_term(document_properties, t, regex_cache) for t in terms)
+
+
+def field_search(document_properties, searchparams, regex_cache=None):
+    """
+    Determines whether a document's properties satisfy a search.
+
+    This is a Python evaluation of the did/NDI search operations ('regexp',
+    'exact_string', 'contains_string', 'exact_number', 'lessthan', 'hasfield',
+    'isa', 'depends_on', 'or', ..., each optionally negated with '~').
+
+    Args:
+        document_properties (dict): The properties of the document.
+        searchparams: A query or normalized search structure (see
+            ndi.database.fun.search_structure).
+        regex_cache (dict, optional): Compiled regular expressions keyed by pattern,
+            shared between calls to avoid recompiling.
+
+    Returns:
+        bool: True if every search term matches.
+    """
+    if regex_cache is None:
+        regex_cache = {}
+    if not isinstance(searchparams, list):
+        searchparams = search_structure(searchparams)
+    return _all_terms(document_properties, searchparams, regex_cache)
+
+
+def project_fields(documents_properties, fields):
+    """
+    Collects selected fields of many documents into columns.
+
+    Args:
+        documents_properties (iterable of dict): The properties of the documents.
+        fields (list of str): Dotted field names. A field may name a whole
+            sub-struct (e.g. 'element').
+
+    Returns:
+        dict: 'base.id' and each field, mapped to a list with one value per
+            document (None where the field is absent).
+    """
+    names = ['base.id'] + [f for f in fields if f != 'base.id']
+    paths = [(name, name.split('.')) for name in names]
+    columns = {name: [] for name in names}
+    for document_properties in documents_properties:
+        for name, parts in paths:
+            value = document_properties
+            for part in parts:
+                if not isinstance(value, dict):
+                    value = None
+                    break
+                value = value.get(part)
+            columns[name].append(value)
+    return columns
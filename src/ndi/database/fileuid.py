@@ -0,0 +1,83 @@
+def file_uids(document_properties):
+    """
+    Yields the (file UID, filename) pairs of a document.
+
+    The UID of a file is the UID of its first location, as returned by
+    ndi.document.get_fuid.
+
+    Args:
+        document_properties (dict): The properties of a document.
+    """
+    files = document_properties.get('files') if isinstance(document_properties, dict) else None
+    if not isinstance(files, dict):
+        return
+    file_info = files.get('file_info') or []
+    if isinstance(file_info, dict):
+        file_info = [file_info]
+    for info in file_info:
+        locations = info.get('locations') or []
+        if isinstance(locations, dict):
+            locations = [locations]
+        if locations and locations[0].get('uid'):
+            yield locations[0]['uid'], info.get('name', '')
+
+
+class FileUIDIndex:
+    """
+    A reverse index from file UIDs to the documents and filenames that hold them.
+
+    A UID can be held by several documents (for example, copies of a document
+    in different sessions), so each UID maps to a set of (doc_id, filename).
+    """
+
+    def __init__(self):
+        self._files = {}
+        self._doc_uids = {}
+
+    def __len__(self):
+        return len(self._files)
+
+    def add(self, doc_id, document_properties):
+        """
+        Indexes (or re-indexes) the files of a document.
+        """
+        self.remove(doc_id)
+        holders = []
+        for uid, filename in file_uids(document_properties):
+            self._files.setdefault(uid, set()).add((doc_id, filename))
+            holders.append((uid, filename))
+        if holders:
+            self._doc_uids[doc_id] = holders
+
+    def remove(self, doc_id):
+        """
+        Removes the files of a document from the index, if present.
+        """
+        for uid, filename in self._doc_uids.pop(doc_id, ()):
+            holders = self._files.get(uid)
+            if holders is not None:
+                holders.discard((doc_id, filename))
+                if not holders:
+                    del self._files[uid]
+
+    def clear(self):
+        """
+        Removes all documents from the index.
+        """
+        self._files.clear()
+        self._doc_uids.clear()
+
+    def find(self, fuid):
+        """
+        Returns the sorted list of (doc_id, filename) that hold a file UID
+        (empty if it is not indexed).
+        """
+        return sorted(self._files.get(fuid, ()))
+
+    def find_many(self, fuids):
+        """
+        Returns a dict of file UID -> sorted list of (doc_id, filename) for the
+        indexed UIDs among fuids.
+        """
+        files = self._files
+        return {fuid: sorted(files[fuid]) for fuid in fuids if fuid in files}
@@ -33,3 +33,39 @@ def ndi_document2ndi_object(ndi_document_obj, ndi_session_obj):
     TheClass = getattr(importlib.import_module(module_name), class_name)
 
     return TheClass(ndi_session_obj, ndi_document_obj)
+
+def search_structure(searchparams):
+    """
+    Converts search parameters into a flat list of search terms.
+
+    Args:
+        searchparams: An ndi.query.Query (or did.query.Query) object, a single
+            search term dict, or a list of search term dicts.
+
+    Returns:
+        list of dict: The search terms, all of which must match. Each term has
+            the keys 'field', 'operation', 'param1' and 'param2'; the 'param1'
+            and 'param2' entries of an 'or' term are themselves lists of terms.
+    """
+    if hasattr(searchparams, 'to_search_structure'):
+        searchparams = searchparams.to_search_structure()
+    elif hasattr(searchparams, 'search_structure'):
+        searchparams = searchparams.search_structure
+
+    if searchparams is None:
+        return []
+    if isinstance(searchparams, dict):
+        searchparams = [searchparams]
+
+    terms = []
+    for term in searchparams:
+        if isinstance(term, (list, tuple)) or hasattr(term, 'search_structure'):
+            terms.extend(search_structure(term))
+            continue
+        term = dict(term)
+        operation = term.get('operation') or ''
+        if operation.lstrip('~') == 'or':
+            term['param1'] = search_structure(term.get('param1'))
+            term['param2'] = search_structure(term.get('param2'))
+        terms.append(term)
+    return terms
@@ -0,0 +1,262 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from ..document_hash import content_hash
+from ..fun.timestamp import timestamp
+
+MANIFEST_NAME = 'manifest.json'
+FORMAT_NAME = 'ndi-ndjson'
+FORMAT_VERSION = 1
+
+_EXTENSIONS = {'gzip': '.ndjson.gz', 'zlib': '.ndjson.zz', None: '.ndjson'}
+_BUFFER_SIZE = 1 << 20
+
+
+class _HashingWriter:
+    """
+    A write-only file wrapper that tracks the SHA-256 and size of what is written.
+    """
+
+    def __init__(self, f):
+        self._f = f
+        self.sha256 = hashlib.sha256()
+        self.nbytes = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.nbytes += len(data)
+        return self._f.write(data)
+
+    def flush(self):
+        self._f.flush()
+
+
+def _raw_reader(source):
+    """
+    Returns a function that gives the JSON text (bytes) of a document by ID.
+    """
+    if hasattr(source, 'read_raw'):
+        return source.read_raw
+    if hasattr(source, 'read_properties'):
+        return lambda doc_id: json.dumps(source.read_properties(doc_id)).encode('utf-8')
+    return lambda doc_id: json.dumps(source.read(doc_id).document_properties).encode('utf-8')
+
+
+def _write_shard(filename, doc_ids, read_raw, compression, compresslevel):
+    with open(filename, 'wb', buffering=_BUFFER_SIZE) as f:
+        hashing = _HashingWriter(f)
+        if compression == 'gzip':
+            # mtime=0 keeps the output reproducible
+            out = gzip.GzipFile(fileobj=hashing, mode='wb', compresslevel=compresslevel, mtime=0)
+            write, finish = out.write, out.close
+        elif compression == 'zlib':
+            compressor = zlib.compressobj(compresslevel)
+            write = lambda data: hashing.write(compressor.compress(data))
+            finish = lambda: hashing.write(compressor.flush())
+        else:
+            write, finish = hashing.write, lambda: None
+
+        batch = []
+        batch_bytes = 0
+        for doc_id in doc_ids:
+            raw = read_raw(doc_id).strip()
+            batch.append(raw)
+            batch_bytes += len(raw) + 1
+            if batch_bytes >= _BUFFER_SIZE:
+                batch.append(b'')
+                write(b'\n'.join(batch))
+                batch = []
+                batch_bytes = 0
+        if batch:
+            batch.append(b'')
+            write(b'\n'.join(batch))
+        finish()
+
+    return {
+        'file': os.path.basename(filename),
+        'count': len(doc_ids),
+        'bytes': hashing.nbytes,
+        'sha256': hashing.sha256.hexdigest(),
+    }
+
+
+def export_documents(database, path, shards=1, compression='gzip', compresslevel=6, workers=None):
+    """
+    Exports every document of a database to compressed newline-delimited JSON shards.
+
+    The documents are read from a single snapshot when the database supports
+    snapshots, so the export is consistent even while the database is written.
+    Shards are compressed in parallel threads (zlib releases the GIL).
+
+    Args:
+        database (ndi.database.Database): The database to export.
+        path (str): The output directory; it is created if needed.
+        shards (int): The number of shard files.
+        compression (str or None): 'gzip', 'zlib' or None.
+        compresslevel (int): The compression level (1-9).
+        workers (int, optional): The number of threads; defaults to the number of shards.
+
+    Returns:
+        dict: The manifest that was written to path/manifest.json.
+    """
+    if compression not in _EXTENSIONS:
+        raise ValueError(f"Unknown compression '{compression}'; use 'gzip', 'zlib' or None.")
+    shards = max(int(shards), 1)
+    os.makedirs(path, exist_ok=True)
+
+    source = database.snapshot() if hasattr(database, 'snapshot') else database
+    doc_ids = sorted(source.alldocids())
+    read_raw = _raw_reader(source)
+
+    # Contiguous ranges of the sorted IDs keep each shard's content deterministic
+    bounds = [len(doc_ids) * k // shards for k in range(shards + 1)]
+    extension = _EXTENSIONS[compression]
+    jobs = [
+        (os.path.join(path, f'documents-{k:05d}-of-{shards:05d}{extension}'), doc_ids[bounds[k]:bounds[k + 1]])
+        for k in range(shards)
+    ]
+
+    with ThreadPoolExecutor(max_workers=workers or shards) as pool:
+        shard_info = list(pool.map(
+            lambda job: _write_shard(job[0], job[1], read_raw, compression, compresslevel), jobs))
+
+    manifest = {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'created': timestamp(),
+        'session_unique_reference': database.session_unique_reference,
+        'compression': compression,
+        'document_count': len(doc_ids),
+        'shards': shard_info,
+    }
+    tmp = os.path.join(path, MANIFEST_NAME + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(tmp, os.path.join(path, MANIFEST_NAME))
+    return manifest
+
+
+def read_manifest(path):
+    """
+    Reads and checks the manifest of an exported database.
+    """
+    with open(os.path.join(path, MANIFEST_NAME), 'r') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != FORMAT_NAME:
+        raise ValueError(f"{path} does not contain an NDI document export.")
+    if manifest.get('version', 0) > FORMAT_VERSION:
+        raise ValueError(f"Export format version {manifest['version']} is newer than this reader ({FORMAT_VERSION}).")
+    return manifest
+
+
+def read_shard(filename, compression, sha256=None, count=None, staging=None, hashes=False):
+    """
+    Verifies and indexes one shard file. This runs in worker processes during import.
+
+    Each document is parsed once, here, for its ID (and content hash). The
+    documents themselves are not returned: a compressed shard is decompressed
+    into the staging directory, and the index gives where each document's JSON
+    text lies in that file.
+
+    Args:
+        filename (str): The shard file.
+        compression (str or None): The compression named in the manifest.
+        sha256 (str, optional): The expected checksum of the file.
+        count (int, optional): The expected number of documents.
+        staging (str, optional): The directory for the decompressed shard
+            (required if the shard is compressed).
+        hashes (bool): Compute the content hash of each document.
+
+    Returns:
+        tuple: (data_file, index), where index lists (document_id, offset,
+            length, content_hash) for each document in data_file; content_hash
+            is None unless hashes is True.
+    """
+    with open(filename, 'rb') as f:
+        data = f.read()
+    if sha256 is not None and hashlib.sha256(data).hexdigest() != sha256:
+        raise ValueError(f"Checksum mismatch in {filename}.")
+
+    data_file = filename
+    if compression is not None:
+        if compression == 'gzip':
+            data = gzip.decompress(data)
+        elif compression == 'zlib':
+            data = zlib.decompress(data)
+        data_file = os.path.join(staging, os.path.basename(filename) + '.ndjson')
+        with open(data_file, 'wb') as f:
+            f.write(data)
+
+    index = []
+    offset = 0
+    for line in data.split(b'\n'):
+        if line:
+            properties = json.loads(line)
+            h = content_hash(properties) if hashes else None
+            index.append((properties['base']['id'], offset, len(line), h))
+        offset += len(line) + 1
+
+    if count is not None and len(index) != count:
+        raise ValueError(f"{filename} holds {len(index)} documents; the manifest lists {count}.")
+    return data_file, index
+
+
+def _shard_documents(shards):
+    """
+    Yields (document_id, json_bytes, content_hash) for each indexed document.
+    """
+    for data_file, index in shards:
+        with open(data_file, 'rb', buffering=_BUFFER_SIZE) as f:
+            for doc_id, offset, length, h in index:
+                f.seek(offset)
+                yield doc_id, f.read(length), h
+
+
+def import_documents(database, path, workers=1, update=True):
+    """
+    Imports documents exported by export_documents into a database.
+
+    Shards are decompressed, verified and parsed in a pool of worker processes;
+    the workers send back only the ID (and content hash, for databases that
+    store them) and location of each document, and the JSON text is then read
+    from the decompressed shards without being parsed again. Nothing is
+    written until every shard and the document count have been verified; the
+    documents are then handed to the database's bulk insert path in one call
+    (a single commit for ndi.database.dir.Dir), so a damaged export leaves the
+    database unchanged.
+
+    Args:
+        database (ndi.database.Database): The database to import into.
+        path (str): The directory written by export_documents.
+        workers (int): The number of worker processes (1 parses in this process).
+        update (bool): Replace documents that already exist in the database.
+
+    Returns:
+        int: The number of documents imported.
+    """
+    manifest = read_manifest(path)
+    compression = manifest.get('compression')
+    hashes = getattr(database, 'store_content_hashes', False)
+
+    with tempfile.TemporaryDirectory() as staging:
+        jobs = [
+            (os.path.join(path, shard['file']), compression, shard.get('sha256'), shard.get('count'), staging, hashes)
+            for shard in manifest['shards']
+        ]
+
+        if workers <= 1 or len(jobs) <= 1:
+            shards = [read_shard(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                shards = list(pool.map(read_shard, *zip(*jobs)))
+
+        total = sum(len(index) for _, index in shards)
+        if total != manifest['document_count']:
+            raise ValueError(f"The export holds {total} documents; the manifest lists {manifest['document_count']}.")
+        database._bulk_add_raw(_shard_documents(shards), update=update)
+    return total
@@ -0,0 +1,299 @@
+import re
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+# Operations whose candidates can be narrowed with the trigram index.
+TRIGRAM_OPERATIONS = ('regexp', 'contains_string')
+
+
+def trigrams(s):
+    """
+    Returns the set of case-folded trigrams contained in a string.
+
+    Args:
+        s (str): The string to split.
+
+    Returns:
+        set: The 3-character substrings of s.casefold().
+    """
+    s = s.casefold()
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+def _literal_runs(parsed, runs, current):
+    """
+    Collects the runs of literal characters that every match of a parsed
+    regular expression must contain, in order.
+    """
+    for op, av in parsed:
+        if op is sre_constants.LITERAL:
+            current.append(chr(av))
+        elif op is sre_constants.SUBPATTERN:
+            # A plain group is part of the same concatenation
+            _literal_runs(av[-1], runs, current)
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            runs.append(''.join(current))
+            current.clear()
+            if av[0] >= 1:
+                # The repeated item appears at least once; its own literals are required
+                _literal_runs(av[2], runs, current)
+                runs.append(''.join(current))
+                current.clear()
+        else:
+            # Anchors, character classes, branches, backreferences, etc.
+            runs.append(''.join(current))
+            current.clear()
+
+
+def regex_trigrams(pattern):
+    """
+    Returns the trigrams that any string matching a regular expression must contain.
+
+    Only literal runs that are mandatory in every match are considered, so the
+    result can be used to rule out documents but never to accept them.
+
+    Args:
+        pattern (str): A regular expression (Python `re` syntax).
+
+    Returns:
+        set: The required trigrams (case-folded). Empty if none could be derived.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except (re.error, TypeError):
+        return set()
+
+    runs = []
+    current = []
+    _literal_runs(parsed, runs, current)
+    runs.append(''.join(current))
+
+    required = set()
+    for run in runs:
+        if len(run) >= 3:
+            required |= trigrams(run)
+    return required
+
+
+def _matches_empty(parsed):
+    """
+    True if a parsed expression matches the empty string at the start of any input.
+    """
+    for op, av in parsed:
+        if op is sre_constants.AT and av in (sre_constants.AT_BEGINNING, sre_constants.AT_BEGINNING_STRING):
+            continue
+        if op is sre_constants.SUBPATTERN:
+            if not _matches_empty(av[-1]):
+                return False
+            continue
+        if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] == 0:
+            continue
+        return False
+    return True
+
+
+def is_match_all(pattern):
+    """
+    Determines whether a regular expression matches every string.
+
+    Patterns such as '(.*)', '.*', '^.*?' or '' always find a (possibly empty)
+    match at the start of any string, so evaluating them is pure overhead.
+
+    Args:
+        pattern (str): A regular expression.
+
+    Returns:
+        bool: True if re.search(pattern, s) succeeds for every string s.
+    """
+    if not isinstance(pattern, str):
+        return False
+    try:
+        return _matches_empty(sre_parse.parse(pattern))
+    except (re.error, TypeError):
+        return False
+
+
+_MISSING = object()
+
+
+def _field_value(document_properties, field):
+    value = document_properties
+    for part in field.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+class TrigramIndex:
+    """
+    An inverted index from trigrams to document IDs for selected string fields.
+
+    The index narrows the candidates for 'regexp' and 'contains_string' queries;
+    the backend still evaluates the exact operation on the candidates it returns.
+    """
+
+    def __init__(self, fields):
+        """
+        Initializes a new TrigramIndex object.
+
+        Args:
+            fields (list of str): Dotted field names to index (e.g. 'base.name').
+        """
+        self.fields = list(fields)
+        self._postings = {field: {} for field in self.fields}
+        self._doc_trigrams = {field: {} for field in self.fields}
+        self._present = {field: set() for field in self.fields}
+
+    def add(self, doc_id, document_properties):
+        """
+        Indexes (or re-indexes) the string fields of a document.
+        """
+        self.remove(doc_id)
+        for field in self.fields:
+            value = _field_value(document_properties, field)
+            if value is not _MISSING:
+                self._present[field].add(doc_id)
+            if not isinstance(value, str):
+                continue
+            grams = trigrams(value)
+            self._doc_trigrams[field][doc_id] = grams
+            postings = self._postings[field]
+            for g in grams:
+                postings.setdefault(g, set()).add(doc_id)
+
+    def remove(self, doc_id):
+        """
+        Removes a document from the index, if present.
+        """
+        for field in self.fields:
+            self._present[field].discard(doc_id)
+            grams = self._doc_trigrams[field].pop(doc_id, None)
+            if grams is None:
+                continue
+            postings = self._postings[field]
+            for g in grams:
+                ids = postings.get(g)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del postings[g]
+
+    def clear(self):
+        """
+        Removes all documents from the index.
+        """
+        for field in self.fields:
+            self._postings[field].clear()
+            self._doc_trigrams[field].clear()
+            self._present[field].clear()
+
+    def documents_with_field(self, field):
+        """
+        Returns the IDs of documents that have an indexed field, with a value of
+        any type (as the 'hasfield' operation tests).
+        """
+        return set(self._present[field])
+
+    def documents_with_string(self, field):
+        """
+        Returns the IDs of documents whose indexed field holds a string (the
+        documents a regular expression that matches every string finds).
+        """
+        return set(self._doc_trigrams[field])
+
+    def candidates(self, field, operation, param):
+        """
+        Returns the documents that may satisfy a search term.
+
+        Args:
+            field (str): The dotted field name.
+            operation (str): 'regexp' or 'contains_string'.
+            param (str): The pattern or substring being searched for.
+
+        Returns:
+            set or None: A superset of the matching document IDs, or None if the
+                index cannot narrow this term.
+        """
+        if field not in self._postings or not isinstance(param, str):
+            return None
+        if operation == 'regexp':
+            required = regex_trigrams(param)
+        elif operation == 'contains_string':
+            required = trigrams(param)
+        else:
+            return None
+        if not required:
+            return None
+
+        postings = self._postings[field]
+        # Intersect the rarest posting lists first
+        lists = sorted((postings.get(g, set()) for g in required), key=len)
+        result = set(lists[0])
+        for ids in lists[1:]:
+            if not result:
+                break
+            result &= ids
+        return result
+
+
+def plan_search(search_structure, index=None):
+    """
+    Prepares a normalized search structure for execution.
+
+    Regular expressions that match every string are replaced by a test for a
+    string value (contains_string '') so that no regex is evaluated, and, if a TrigramIndex is given, the
+    candidate documents for 'regexp' and 'contains_string' terms are computed.
+
+    Args:
+        search_structure (list of dict): The normalized search terms (all must match).
+        index (TrigramIndex, optional): The index to consult.
+
+    Returns:
+        tuple: (search_structure, candidate_ids)
+            search_structure (list of dict): The rewritten terms.
+            candidate_ids (set or None): A superset of the matching document IDs,
+                or None if every document must be scanned.
+    """
+    planned = []
+    candidate_ids = None
+
+    for term in search_structure:
+        operation = term.get('operation') or ''
+        negated = operation.startswith('~')
+        base_operation = operation[1:] if negated else operation
+
+        term_candidates = None
+        if base_operation == 'or':
+            p1, c1 = plan_search(term['param1'], index)
+            p2, c2 = plan_search(term['param2'], index)
+            term = dict(term, param1=p1, param2=p2)
+            if not negated and c1 is not None and c2 is not None:
+                term_candidates = c1 | c2
+        elif base_operation == 'regexp' and is_match_all(term.get('param1')):
+            if not negated and index is not None and term['field'] in index.fields:
+                # The index knows exactly which documents hold a string in this
+                # field, which are the ones the regex matches
+                candidate_ids = _intersect(candidate_ids, index.documents_with_string(term['field']))
+                continue
+            # Regular expressions only match strings, and every string contains ''
+            term = dict(term, operation=('~' if negated else '') + 'contains_string', param1='')
+        elif not negated and base_operation in TRIGRAM_OPERATIONS and index is not None:
+            term_candidates = index.candidates(term['field'], base_operation, term.get('param1'))
+
+        if term_candidates is not None:
+            candidate_ids = _intersect(candidate_ids, term_candidates)
+        planned.append(term)
+
+    return planned, candidate_ids
+
+
+def _intersect(a, b):
+    if a is None:
+        return set(b)
+    return a & b
@@ -1,7 +1,11 @@
 from did.document import Document
+import did.document
 from .ido import Ido
 import ndi.fun
+from .document_definition import definition_cache, copy_properties, class_registry
+from .document_hash import DEFAULT_IGNORE_FIELDS, content_hash
 from .util.vlt import data as vlt_data
+from .util.cow import without_fields
 import json
 import os
 
@@ -17,38 +21,86 @@ class Document(Document):
             self.document_properties['base']['id'] = ido.id()
             self.document_properties['base']['datestamp'] = ndi.fun.timestamp()
 
-            for key, value in kwargs.items():
-                keys = key.split('.')
-                d = self.document_properties
-                for k in keys[:-1]:
-                    d = d.setdefault(k, {})
-                d[keys[-1]] = value
+            _set_fields(self.document_properties, kwargs)
+
+    @staticmethod
+    def read_blank_definition(document_type):
+        """
+        Returns a new blank definition of a document type, merged with its superclasses.
+
+        Definitions are read from the NDI document folders and cached for the
+        life of the process (a changed file is re-read). Types that are not
+        found there are read by did, and cached until the definition folders
+        change.
+        """
+        return definition_cache.blank_definition(document_type, fallback=did.document.Document.read_blank_definition)
+
+    @classmethod
+    def new_documents(cls, document_type, n, **kwargs):
+        """
+        Creates n new documents of the same type.
+
+        The blank definition is read and the field values in kwargs are set
+        once; each document then receives a copy with its own ID. All of the
+        documents share one datestamp.
+
+        Args:
+            document_type (str): The document type.
+            n (int): The number of documents to create.
+            **kwargs: Field values, e.g. **{'base.name': 'x'}.
+
+        Returns:
+            list: The new documents.
+        """
+        template = cls.read_blank_definition(document_type)
+        _set_fields(template, kwargs)
+        template['base']['datestamp'] = ndi.fun.timestamp()
+        documents = []
+        for doc_id in Ido.ids(n):
+            properties = copy_properties(template)
+            properties['base']['id'] = doc_id
+            documents.append(cls(properties))
+        return documents
 
     def set_session_id(self, session_id):
         self.document_properties['base']['session_id'] = session_id
 
+    def content_hash(self, ignore_fields=DEFAULT_IGNORE_FIELDS, refresh=False):
+        """
+        Returns the canonical content hash of the document (see ndi.document_hash).
+
+        The hash is computed once per set of ignored fields and remembered. It is
+        recomputed if document_properties was replaced; use refresh=True after
+        changing the properties in place.
+        """
+        ignore_fields = tuple(ignore_fields)
+        memo = getattr(self, '_content_hashes', None)
+        if memo is None or refresh or memo[0] is not self.document_properties:
+            memo = self._content_hashes = (self.document_properties, {})
+        h = memo[1].get(ignore_fields)
+        if h is None:
+            h = memo[1][ignore_fields] = content_hash(self.document_properties, ignore_fields)
+        return h
+
     def to_table(self):
-        s = self.document_properties.copy()
-        if 'depends_on' in s:
-            del s['depends_on']
-        if 'files' in s:
-            del s['files']
-
-        # This will require pandas, which is not yet a dependency
-        # For now, I'll just return the flattened dictionary
+        s = without_fields(self.document_properties, ['depends_on', 'files'])
         return vlt_data.flattenstruct2table(s)
 
     def doc_isa(self, document_class):
-        sc = self.doc_superclass()
-        c = self.doc_class()
-        return document_class in [c] + sc
+        return document_class == self.doc_class() or \
+            document_class in class_registry.superclasses(self.document_properties['document_class'])
 
     def doc_class(self):
         return self.document_properties['document_class']['class_name']
 
     def doc_superclass(self):
-        sc = []
-        for superclass in self.document_properties['document_class']['superclasses']:
-            s = Document(superclass['definition'])
-            sc.append(s.doc_class())
-        return list(set(sc))
+        return list(class_registry.superclasses(self.document_properties['document_class']))
+
+
+def _set_fields(properties, fields):
+    for key, value in fields.items():
+        keys = key.split('.')
+        d = properties
+        for k in keys[:-1]:
+            d = d.setdefault(k, {})
+        d[keys[-1]] = value
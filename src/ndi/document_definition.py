@@ -0,0 +1,330 @@
+import copy
+import marshal
+import os
+import threading
+
+from .common.path_constants import PathConstants
+from .util.jsoncache import json_file_cache
+
+
+def definition_path(document_type):
+    """
+    Finds the JSON definition file of a document type.
+
+    Args:
+        document_type (str): A type name ('element'), a path relative to the
+            definition folders ('daq/daqsystem'), or a definition path such as
+            '$NDIDOCUMENTPATH/element.json'.
+
+    Returns:
+        str: The file path, or None if no definition was found.
+    """
+    if document_type.startswith('$'):
+        path = PathConstants.expand_path(document_type)
+        return path if path is not None and os.path.isfile(path) else None
+    if os.path.isabs(document_type):
+        return document_type if os.path.isfile(document_type) else None
+
+    relative = document_type.replace('\\', '/')
+    if not relative.endswith('.json'):
+        relative += '.json'
+    parts = relative.split('/')
+    folders = PathConstants.document_folders()
+    for folder in folders:
+        candidate = os.path.join(folder, *parts)
+        if os.path.isfile(candidate):
+            return candidate
+    # A bare type name may live in a subfolder (e.g. 'daqsystem' in 'daq/')
+    if len(parts) == 1:
+        for folder in folders:
+            for dirpath, dirnames, filenames in os.walk(folder):
+                dirnames.sort()
+                if parts[0] in filenames:
+                    return os.path.join(dirpath, parts[0])
+    return None
+
+
+def _mtime(path):
+    # The modification time of a file or directory, or None if it does not exist
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _search_state(document_type):
+    """
+    Returns (path, mtime) for each directory whose contents decide where
+    definition_path finds a document type, so that a search that found nothing
+    can be known to still find nothing.
+    """
+    if document_type.startswith('$') or os.path.isabs(document_type):
+        path = PathConstants.expand_path(document_type) if document_type.startswith('$') else document_type
+        return [] if path is None else [(os.path.dirname(path), _mtime(os.path.dirname(path)))]
+    from .fun.find_calc_directories import calc_search_path
+    # Installing a calculator toolbox changes its parent directory
+    directories = [calc_search_path()]
+    for folder in PathConstants.document_folders():
+        directories.append(folder)
+        for dirpath, dirnames, filenames in os.walk(folder):
+            directories.extend(os.path.join(dirpath, d) for d in dirnames)
+    return [(d, _mtime(d)) for d in directories]
+
+
+def _fill_missing(target, source):
+    """
+    Adds the fields of source that target lacks, recursing into dicts.
+    """
+    for key, value in source.items():
+        if key not in target:
+            target[key] = copy.deepcopy(value)
+        elif isinstance(target[key], dict) and isinstance(value, dict):
+            _fill_missing(target[key], value)
+
+
+def _merge_superclass(definition, superclass):
+    """
+    Merges a superclass's blank definition into a class definition.
+    """
+    for key, value in superclass.items():
+        if key == 'document_class':
+            own = definition.setdefault('document_class', {}).setdefault('superclasses', [])
+            known = {s.get('definition') for s in own}
+            for s in value.get('superclasses', []) or []:
+                if s.get('definition') not in known:
+                    own.append(copy.deepcopy(s))
+                    known.add(s.get('definition'))
+        elif key == 'depends_on':
+            own = definition.setdefault('depends_on', [])
+            known = {d.get('name') for d in own}
+            own.extend(copy.deepcopy(d) for d in value if d.get('name') not in known)
+        elif key not in definition:
+            definition[key] = copy.deepcopy(value)
+        elif isinstance(definition[key], dict) and isinstance(value, dict):
+            _fill_missing(definition[key], value)
+
+
+class DefinitionCache:
+    """
+    A process-wide cache of blank document definitions.
+
+    A blank definition is a class's JSON definition merged with the definitions
+    of all of its superclasses. Each one is built once and kept in a compact
+    serialized form, so that a fresh copy costs a single C-level decode. An
+    entry is rebuilt if any of the files it was built from changes on disk.
+
+    Types without a definition file are cached too, until a directory that
+    the search looked in changes, so that creating such documents does not
+    repeat the search of the definition folders.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def blank_definition(self, document_type, fallback=None):
+        """
+        Returns a new copy of the blank definition of a document type.
+
+        Args:
+            document_type (str): The document type (see definition_path).
+            fallback (callable, optional): Called with document_type if no
+                definition file is found. Its result is cached in the same way.
+
+        Returns:
+            dict: The definition, or None if none was found.
+        """
+        blob = self._blob(document_type, fallback)
+        return None if blob is None else marshal.loads(blob)
+
+    def _blob(self, document_type, fallback):
+        key = (document_type, fallback)
+        entry = self._entries.get(key)
+        if entry is not None and self._is_current(entry[0]):
+            return entry[1]
+        # Taken before the search, so that a definition added during it is found next time
+        state = _search_state(document_type)
+        definition, files = self._build(document_type, set())
+        if definition is None:
+            files = state
+            definition = fallback(document_type) if fallback is not None else None
+        blob = None if definition is None else marshal.dumps(definition)
+        with self._lock:
+            self._entries[key] = (files, blob)
+        return blob
+
+    @staticmethod
+    def _is_current(files):
+        return all(_mtime(path) == mtime for path, mtime in files)
+
+    def _build(self, document_type, visiting):
+        path = definition_path(document_type)
+        if path is None or path in visiting:
+            return None, []
+        visiting = visiting | {path}
+        files = [(path, os.stat(path).st_mtime_ns)]
+        definition = copy.deepcopy(json_file_cache.load(path))
+        superclasses = definition.get('document_class', {}).get('superclasses', []) or []
+        for s in list(superclasses):
+            parent, parent_files = self._build(s.get('definition', ''), visiting)
+            if parent is not None:
+                _merge_superclass(definition, parent)
+                files.extend(parent_files)
+        return definition, files
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+definition_cache = DefinitionCache()
+
+
+def copy_properties(properties):
+    """
+    Returns a deep copy of JSON-like document properties.
+
+    This is much faster than copy.deepcopy for plain dicts, lists, strings and
+    numbers; other values fall back to copy.deepcopy.
+    """
+    try:
+        return marshal.loads(marshal.dumps(properties))
+    except ValueError:
+        return copy.deepcopy(properties)
+
+
+def _definition_name(definition):
+    name = str(definition).replace('\\', '/').split('/')[-1]
+    return name[:-5] if name.endswith('.json') else name
+
+
+class ClassRegistry:
+    """
+    A process-wide registry of the document class hierarchy.
+
+    Each class's ancestors are resolved once, so that class membership tests
+    are set lookups. The registry is filled from the NDI document folders
+    (including those of calculator toolboxes) the first time it is used.
+    """
+
+    def __init__(self):
+        self._parents = {}
+        self._definition_classes = {}
+        self._ancestors = {}
+        self._superclasses = {}
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def preload(self):
+        """
+        Registers every class defined in PathConstants.document_folders().
+        """
+        with self._lock:
+            for folder in PathConstants.document_folders():
+                for dirpath, dirnames, filenames in os.walk(folder):
+                    for filename in filenames:
+                        if not filename.endswith('.json') or filename.startswith('.'):
+                            continue
+                        path = os.path.join(dirpath, filename)
+                        try:
+                            document_class = json_file_cache.load(path).get('document_class')
+                        except (OSError, ValueError):
+                            continue
+                        if isinstance(document_class, dict) and document_class.get('class_name'):
+                            self._definition_classes[path] = document_class['class_name']
+                            self.register(document_class)
+            self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.preload()
+
+    def register(self, document_class):
+        """
+        Adds a class to the registry from its 'document_class' block.
+        """
+        with self._lock:
+            parents = tuple(self.definition_class(s.get('definition', ''))
+                            for s in document_class.get('superclasses', []) or [])
+            self._parents[document_class['class_name']] = parents
+            self._ancestors.clear()
+            self._superclasses.clear()
+
+    def definition_class(self, definition):
+        """
+        Returns the class name defined by a definition path such as '$NDIDOCUMENTPATH/element.json'.
+        """
+        name = self._definition_classes.get(definition)
+        if name is None:
+            path = PathConstants.expand_path(definition) if definition else None
+            name = self._definition_classes.get(path) if path else None
+            if name is None:
+                name = _definition_name(definition)
+                if path is not None and os.path.isfile(path):
+                    try:
+                        name = json_file_cache.load(path)['document_class']['class_name']
+                    except (OSError, ValueError, KeyError, TypeError):
+                        pass
+            self._definition_classes[definition] = name
+        return name
+
+    def ancestors(self, class_name):
+        """
+        Returns the set of all superclass names of a class (empty if the class is unknown).
+        """
+        result = self._ancestors.get(class_name)
+        if result is None:
+            self._ensure_loaded()
+            with self._lock:
+                result = self._resolve(class_name, set())
+        return result
+
+    def _resolve(self, class_name, visiting):
+        result = self._ancestors.get(class_name)
+        if result is not None:
+            return result
+        ancestors = set()
+        for parent in self._parents.get(class_name, ()):
+            ancestors.add(parent)
+            if parent not in visiting:
+                ancestors |= self._resolve(parent, visiting | {class_name})
+        result = frozenset(ancestors - {class_name})
+        self._ancestors[class_name] = result
+        return result
+
+    def superclasses(self, document_class):
+        """
+        Returns the set of superclass names of a document.
+
+        Args:
+            document_class (dict): The document's 'document_class' block. Its
+                listed superclasses are combined with their registered ancestors.
+
+        Returns:
+            frozenset: The names of all superclasses.
+        """
+        definitions = tuple(s.get('definition', '') for s in document_class.get('superclasses', []) or [])
+        key = (document_class.get('class_name'), definitions)
+        result = self._superclasses.get(key)
+        if result is None:
+            self._ensure_loaded()
+            names = set(self.ancestors(key[0]))
+            for definition in definitions:
+                name = self.definition_class(definition)
+                names.add(name)
+                names |= self.ancestors(name)
+            names.discard(key[0])
+            result = frozenset(names)
+            self._superclasses[key] = result
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._parents.clear()
+            self._definition_classes.clear()
+            self._ancestors.clear()
+            self._superclasses.clear()
+            self._loaded = False
+
+
+class_registry = ClassRegistry()
@@ -0,0 +1,88 @@
+import hashlib
+import json
+
+from .util.cow import with_fields, without_fields
+
+DEFAULT_IGNORE_FIELDS = ('base.session_id',)
+
+
+def _normalize(value):
+    # Integral floats hash like ints, since 1 == 1.0 when documents are compared
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else value
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if hasattr(value, 'tolist') and not isinstance(value, (str, bytes)):
+        # numpy arrays and scalars hash by their full contents, like the lists they hold
+        return _normalize(value.tolist())
+    return value
+
+
+def _json_default(value):
+    # Encodes the remaining non-JSON values without losing information
+    if isinstance(value, (bytes, bytearray)):
+        return {'__bytes__': bytes(value).hex()}
+    if hasattr(value, 'tolist'):
+        return _normalize(value.tolist())
+    return repr(value)
+
+
+def dependency_sort_key(dependency):
+    """
+    Returns the key that orders a 'depends_on' entry by name and then value.
+
+    content_hash and ndi.fun.doc.diff both sort dependencies with it, so
+    entries with the same name compare the same way in both.
+    """
+    return (str(dependency.get('name', '')),
+            json.dumps(_normalize(dependency.get('value')), sort_keys=True, default=_json_default))
+
+
+def canonical_properties(document_properties, ignore_fields=DEFAULT_IGNORE_FIELDS):
+    """
+    Returns the form of document properties that is hashed by content_hash.
+
+    The ignored fields are removed, 'depends_on' is sorted by name and value,
+    and 'files' is reduced to its sorted file_list, following the rules of
+    ndi.fun.doc.diff. Empty dependency and file lists are dropped.
+    """
+    props = without_fields(document_properties, ignore_fields)
+    updates = {}
+    depends_on = props.get('depends_on')
+    files = props.get('files')
+    removed = []
+    if depends_on:
+        updates['depends_on'] = sorted(depends_on, key=dependency_sort_key)
+    elif 'depends_on' in props:
+        removed.append('depends_on')
+    file_list = files.get('file_list') if isinstance(files, dict) else None
+    if file_list:
+        updates['files'] = {'file_list': sorted(file_list)}
+    elif 'files' in props:
+        removed.append('files')
+    return with_fields(without_fields(props, removed), updates)
+
+
+def content_hash(document, ignore_fields=DEFAULT_IGNORE_FIELDS):
+    """
+    Computes a canonical hash of a document's content.
+
+    Documents of JSON data with the same hash are equal under
+    ndi.fun.doc.diff (with the same ignore_fields and check_file_list=True),
+    so hashes can be compared for equality, deduplication and change
+    detection. The converse does not always hold: diff finds True equal to
+    1, for example, but they hash differently.
+
+    Args:
+        document: An ndi.document or its document_properties dict.
+        ignore_fields (tuple of str): Dotted fields left out of the hash.
+
+    Returns:
+        str: A 32-character hex BLAKE2b digest.
+    """
+    properties = document if isinstance(document, dict) else document.document_properties
+    canonical = _normalize(canonical_properties(properties, ignore_fields))
+    text = json.dumps(canonical, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=_json_default)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
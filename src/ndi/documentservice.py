@@ -5,6 +5,9 @@ class DocumentService(abc.ABC):
     def new_document(self, document_type='base', **kwargs):
         return Document(document_type, **kwargs)
 
+    def new_documents(self, document_type, n, **kwargs):
+        return Document.new_documents(document_type, n, **kwargs)
+
     @abc.abstractmethod
     def search_query(self):
         raise NotImplementedError
@@ -16,6 +16,12 @@ class EpochDir(Navigator):
             return os.path.basename(pathdir)
 
     def selectfilegroups_disk(self):
-        # This will require a Python implementation of findfilegroups
-        # For now, we'll return an empty list
-        return []
+        """
+        Returns the groups of epoch files on disk. Each epoch is a
+        subdirectory of the session directory; the session directory itself
+        and deeper subdirectories are not searched.
+
+        Returns:
+            list of list of str: The full paths of the files of each epoch.
+        """
+        return self._findfilegroups(SearchParent=False, SearchDepth=1)
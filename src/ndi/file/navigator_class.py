@@ -1,8 +1,16 @@
+import json
+import os
+import zlib
 from ..ido import Ido
 from ..epoch.epochset import Param as EpochSet
 from ..documentservice import DocumentService
+from ..time.clocktype import ClockType
+from ..util.vlt import file as vlt_file
 # from ..database.ingestion_help import IngestionHelp # This class needs to be ported
 
+# The version of the saved file group fingerprints (see selectfilegroups_disk)
+FINGERPRINT_VERSION = 2
+
 class Navigator(Ido, EpochSet, DocumentService): #, IngestionHelp):
     def __init__(self, session, fileparameters=None, epochprobemap_class='ndi.epoch.epochprobemap_daqsystem', epochprobemap_fileparameters=None):
         super().__init__()
@@ -26,8 +34,34 @@ class Navigator(Ido, EpochSet, DocumentService): #, IngestionHelp):
         return None, None
 
     def buildepochtable(self):
-        # implementation will go here
-        return []
+        """
+        Builds the epoch table: one entry per group of epoch files.
+
+        Returns:
+            list of dict: epoch_number, epoch_id, epoch_session_id,
+                epochprobemap, epoch_clock, t0_t1 and underlying_epochs (the
+                files of the epoch) of each epoch.
+        """
+        all_epochs, _ = self.selectfilegroups()
+        session_id = self.session.id()
+        et = []
+        for i, epochfiles in enumerate(all_epochs, start=1):
+            epoch_id = self.epochid(i, epochfiles)
+            et.append({
+                'epoch_number': i,
+                'epoch_id': epoch_id,
+                'epoch_session_id': session_id,
+                'epochprobemap': self.getepochprobemap(i, epochfiles),
+                'epoch_clock': [ClockType('no_time')],
+                't0_t1': [[float('nan'), float('nan')]],
+                'underlying_epochs': {
+                    'underlying': epochfiles,
+                    'epoch_id': epoch_id,
+                    'epoch_clock': [ClockType('no_time')],
+                    't0_t1': [[float('nan'), float('nan')]],
+                },
+            })
+        return et
 
     def getepochprobemap(self, n, epochfiles=None):
         # implementation will go here
@@ -54,15 +88,102 @@ class Navigator(Ido, EpochSet, DocumentService): #, IngestionHelp):
         pass
 
     def path(self):
-        return self.session.get_path()
+        return self.session.getpath()
+
+    def filematch(self):
+        """
+        Returns the regular expressions of the epoch files (the 'filematch'
+        of fileparameters) as a list.
+        """
+        fileparameters = self.fileparameters
+        if isinstance(fileparameters, dict):
+            fileparameters = fileparameters.get('filematch', [])
+        if isinstance(fileparameters, str):
+            return [fileparameters]
+        return list(fileparameters)
+
+    def fingerprint_filename(self):
+        """
+        Returns the file in the session's .ndi folder where the directory
+        fingerprints and file groups of this navigator are kept, or None if
+        the session has no .ndi folder.
+        """
+        ndi_dir = os.path.join(self.path(), '.ndi')
+        if not os.path.isdir(ndi_dir):
+            return None
+        return os.path.join(ndi_dir, 'filenavigator', f"{type(self).__name__}_{self.filematch_hashstring()}.json")
+
+    def _read_fingerprints(self, filename, filematch, options):
+        try:
+            with open(filename, 'r') as f:
+                saved = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if (saved.get('version') != FINGERPRINT_VERSION or saved.get('filematch') != filematch
+                or saved.get('options') != options):
+            return None
+        return saved.get('directories')
+
+    def _write_fingerprints(self, filename, filematch, options, directories):
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        tmp = filename + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({
+                'version': FINGERPRINT_VERSION,
+                'filematch': filematch,
+                'options': options,
+                'directories': directories,
+            }, f)
+        os.replace(tmp, filename)
+
+    def _findfilegroups(self, **options):
+        # Searches the session directory for groups of epoch files. The
+        # fingerprint (modification time) and file groups of each directory
+        # are saved under the session's .ndi folder, so the next search lists
+        # only the directories that have changed since.
+        filematch = self.filematch()
+        if not filematch:
+            return []
+        filename = self.fingerprint_filename()
+        previous = self._read_fingerprints(filename, filematch, options) if filename else None
+        groups, directories = vlt_file.findfilegroups_incremental(
+            self.path(), filematch, previous=previous, ExcludeDirs=['.ndi'], **options)
+        if filename and directories != previous:
+            self._write_fingerprints(filename, filematch, options, directories)
+        return groups
 
     def selectfilegroups_disk(self):
-        # implementation will go here
-        return []
+        """
+        Returns the groups of epoch files on disk, found by searching the
+        session directory and all of its subdirectories for fileparameters.
+
+        Returns:
+            list of list of str: The full paths of the files of each epoch.
+        """
+        return self._findfilegroups()
 
     def selectfilegroups(self):
-        # implementation will go here
-        return [], []
+        """
+        Returns the groups of epoch files.
+
+        Returns:
+            tuple: (epochfiles, epochfiles_disk) All epochs, and those found on disk.
+        """
+        # Ingested epochs are not yet ported (see IngestionHelp)
+        epochfiles_disk = self.selectfilegroups_disk()
+        return list(epochfiles_disk), epochfiles_disk
+
+    def is_ingested(self, epochfiles):
+        """
+        Returns True if epochfiles refer to an epoch ingested into the database.
+        """
+        return bool(epochfiles) and epochfiles[0].startswith('epochid://')
+
+    def ingestedfiles_epochid(self, epochfiles):
+        """
+        Returns the epoch id of ingested epochfiles.
+        """
+        return epochfiles[0][len('epochid://'):]
 
     def getepochfiles(self, epoch_number_or_id):
         # implementation will go here
@@ -73,8 +194,15 @@ class Navigator(Ido, EpochSet, DocumentService): #, IngestionHelp):
         pass
 
     def filematch_hashstring(self):
-        # implementation will go here
-        pass
+        """
+        Returns a string that is (very likely) unique to the filematch
+        expressions of fileparameters: the CRC-32 of their concatenated text,
+        in hexadecimal, or '' if there are none.
+        """
+        filematch = self.filematch()
+        if not filematch:
+            return ''
+        return format(zlib.crc32(''.join(filematch).encode('utf-8')), '08x')
 
     def newdocument(self):
         # implementation will go here
@@ -1,4 +1,6 @@
-from .read_ngrid import read_ngrid
-from .write_ngrid import write_ngrid
+from .read_ngrid import read_ngrid, read_ngrid_block
+from .write_ngrid import write_ngrid, write_ngrid_blocks
 from .read_image_stack import read_image_stack
+from .image_stack import ImageStack, RawImageStack, TiffImageStack
 from .mat_to_ngrid import mat_to_ngrid
+from .ngrid_chunked import write_ngrid_chunked, read_ngrid_chunked, read_ngrid_chunked_info, register_codec
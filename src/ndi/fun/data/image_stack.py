@@ -0,0 +1,324 @@
+import abc
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+import numpy as np
+
+# The number of decoded frames an ImageStack keeps by default
+CACHE_FRAMES = 64
+
+class ImageStack(abc.ABC):
+    """
+    A lazy, read-only stack of image frames.
+
+    Frames are indexed along the first dimension (stack[i] is frame i, of
+    shape frame_shape). Only the frames that are indexed are decoded, and
+    the most recently used ones are kept in a bounded LRU cache.
+    """
+
+    def __init__(self, cache_frames=CACHE_FRAMES):
+        self.cache_frames = cache_frames
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # A temporary file that belongs to the stack, removed when it is closed
+        self._temporary_file = None
+
+    @abc.abstractmethod
+    def __len__(self):
+        pass
+
+    @property
+    @abc.abstractmethod
+    def frame_shape(self):
+        pass
+
+    @property
+    @abc.abstractmethod
+    def dtype(self):
+        pass
+
+    @abc.abstractmethod
+    def _decode(self, i):
+        """
+        Returns frame i as an array of frame_shape.
+        """
+
+    @property
+    def shape(self):
+        return (len(self),) + tuple(self.frame_shape)
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    def frame(self, i):
+        """
+        Returns frame i (read-only), decoding it if it is not in the cache.
+        """
+        n = len(self)
+        i = int(i)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(f"Frame {i} is out of range for a stack of {n} frames.")
+        with self._lock:
+            frame = self._cache.get(i)
+            if frame is not None:
+                self._cache.move_to_end(i)
+                return frame
+        frame = self._decode(i)
+        if frame.flags.writeable:
+            frame.setflags(write=False)
+        if self.cache_frames:
+            with self._lock:
+                self._cache[i] = frame
+                while len(self._cache) > self.cache_frames:
+                    self._cache.popitem(last=False)
+        return frame
+
+    def __getitem__(self, key):
+        rest = ()
+        if isinstance(key, tuple):
+            key, rest = key[0], key[1:]
+        if isinstance(key, (int, np.integer)):
+            frame = self.frame(key)
+            return frame[rest] if rest else frame
+        if isinstance(key, slice):
+            indices = range(*key.indices(len(self)))
+        else:
+            indices = np.arange(len(self))[key]
+        out = np.empty((len(indices),) + tuple(self.frame_shape), dtype=self.dtype)
+        for j, i in enumerate(indices):
+            out[j] = self.frame(i)
+        return out[(slice(None),) + rest] if rest else out
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.frame(i)
+
+    def __array__(self, dtype=None, copy=None):
+        out = self[:]
+        return out if dtype is None else out.astype(dtype)
+
+    def close(self):
+        """
+        Releases the cache and any open files, and removes the stack's
+        temporary file if it has one.
+        """
+        with self._lock:
+            self._cache.clear()
+        if self._temporary_file is not None:
+            path, self._temporary_file = self._temporary_file, None
+            try:
+                os.remove(path)
+            except OSError:
+                # On Windows, frames still held by the caller keep the file mapped
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class RawImageStack(ImageStack):
+    """
+    An ImageStack of uncompressed frames stored back to back in a file, such
+    as an ngrid whose last dimension is the frame number. Frames are
+    memory-mapped views; nothing is read until a frame is used.
+    """
+
+    def __init__(self, filename, frame_shape, dtype, n_frames=None, offset=0, order='F',
+                 cache_frames=CACHE_FRAMES):
+        """
+        Args:
+            filename (str): The file.
+            frame_shape (tuple of int): The shape of one frame.
+            dtype: The numpy type of the data.
+            n_frames (int): The number of frames (default: as many as the file holds).
+            offset (int): The byte offset of the first frame.
+            order (str): 'F' (column-major, as Matlab writes) or 'C'.
+            cache_frames (int): The number of decoded frames to keep.
+        """
+        super().__init__(cache_frames=cache_frames)
+        self._frame_shape = tuple(int(n) for n in frame_shape)
+        self._dtype = np.dtype(dtype)
+        self.order = order
+        frame_size = int(np.prod(self._frame_shape))
+        if n_frames is None:
+            n_frames = (os.path.getsize(filename) - offset) // (frame_size * self._dtype.itemsize)
+        self._n = int(n_frames)
+        self._data = np.memmap(filename, dtype=self._dtype, mode='r', offset=offset,
+                               shape=(self._n, frame_size)) if self._n and frame_size else None
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def frame_shape(self):
+        return self._frame_shape
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    def _decode(self, i):
+        return self._data[i].reshape(self._frame_shape, order=self.order)
+
+    def close(self):
+        self._data = None
+        super().close()
+
+# TIFF field types: (struct format, size)
+_TIFF_TYPES = {1: ('B', 1), 2: ('c', 1), 3: ('H', 2), 4: ('I', 4), 5: ('II', 8), 6: ('b', 1), 7: ('B', 1),
+               8: ('h', 2), 9: ('i', 4), 10: ('ii', 8), 11: ('f', 4), 12: ('d', 8), 13: ('I', 4),
+               16: ('Q', 8), 17: ('q', 8), 18: ('Q', 8)}
+_IMAGE_WIDTH, _IMAGE_LENGTH, _BITS_PER_SAMPLE, _COMPRESSION = 256, 257, 258, 259
+_STRIP_OFFSETS, _SAMPLES_PER_PIXEL, _ROWS_PER_STRIP, _STRIP_BYTE_COUNTS = 273, 277, 278, 279
+_PLANAR_CONFIGURATION, _PREDICTOR, _TILE_WIDTH, _SAMPLE_FORMAT = 284, 317, 322, 339
+_TAGS = {_IMAGE_WIDTH, _IMAGE_LENGTH, _BITS_PER_SAMPLE, _COMPRESSION, _STRIP_OFFSETS, _SAMPLES_PER_PIXEL,
+         _ROWS_PER_STRIP, _STRIP_BYTE_COUNTS, _PLANAR_CONFIGURATION, _PREDICTOR, _TILE_WIDTH, _SAMPLE_FORMAT}
+
+class TiffImageStack(ImageStack):
+    """
+    An ImageStack of the pages of a (multi-page, classic or BigTIFF) TIFF file.
+
+    The page directories are indexed once when the stack is opened. Frames
+    stored uncompressed in contiguous strips are memory-mapped views;
+    deflate-compressed frames are decompressed when they are used.
+    """
+
+    def __init__(self, filename, cache_frames=CACHE_FRAMES):
+        """
+        Args:
+            filename (str): The TIFF file.
+            cache_frames (int): The number of decoded frames to keep.
+        """
+        super().__init__(cache_frames=cache_frames)
+        self.filename = filename
+        self._buffer = np.memmap(filename, dtype=np.uint8, mode='r')
+        self._pages = self._index_pages()
+        if not self._pages:
+            raise ValueError(f"{filename} contains no images.")
+        first = self._pages[0]
+        self._frame_shape = first['shape']
+        self._file_dtype = first['dtype']
+        self._dtype = first['dtype'].newbyteorder('=')
+
+    def _index_pages(self):
+        buf = self._buffer
+        byte_order = bytes(buf[:2])
+        if byte_order not in (b'II', b'MM'):
+            raise ValueError(f"{self.filename} is not a TIFF file.")
+        self._endian = '<' if byte_order == b'II' else '>'
+        magic, = struct.unpack(self._endian + 'H', bytes(buf[2:4]))
+        if magic == 42:
+            self._bigtiff = False
+            offset, = struct.unpack(self._endian + 'I', bytes(buf[4:8]))
+        elif magic == 43:
+            self._bigtiff = True
+            offset, = struct.unpack(self._endian + 'Q', bytes(buf[8:16]))
+        else:
+            raise ValueError(f"{self.filename} is not a TIFF file.")
+
+        pages = []
+        seen = set()
+        while offset and offset not in seen:
+            seen.add(offset)
+            tags, offset = self._read_ifd(offset)
+            pages.append(self._page(tags))
+        return pages
+
+    def _read_ifd(self, offset):
+        e = self._endian
+        buf = self._buffer
+        if self._bigtiff:
+            count_format, entry_format, entry_size, inline = 'Q', 'HHQ8s', 20, 8
+        else:
+            count_format, entry_format, entry_size, inline = 'H', 'HHI4s', 12, 4
+        count_size = struct.calcsize(count_format)
+        n, = struct.unpack(e + count_format, bytes(buf[offset:offset + count_size]))
+        entries = bytes(buf[offset + count_size:offset + count_size + n * entry_size])
+        tags = {}
+        for k in range(n):
+            tag, field_type, count, value = struct.unpack(e + entry_format, entries[k * entry_size:(k + 1) * entry_size])
+            if tag not in _TAGS or field_type not in _TIFF_TYPES:
+                continue
+            fmt, size = _TIFF_TYPES[field_type]
+            nbytes = size * count
+            if nbytes <= inline:
+                data = value[:nbytes]
+            else:
+                start, = struct.unpack(e + ('Q' if self._bigtiff else 'I'), value)
+                data = bytes(buf[start:start + nbytes])
+            tags[tag] = struct.unpack(e + fmt * count, data)
+        next_start = offset + count_size + n * entry_size
+        next_format = 'Q' if self._bigtiff else 'I'
+        next_offset, = struct.unpack(e + next_format, bytes(buf[next_start:next_start + struct.calcsize(next_format)]))
+        return tags, next_offset
+
+    def _page(self, tags):
+        if _TILE_WIDTH in tags:
+            raise NotImplementedError('Tiled TIFF images are not supported.')
+        height, width = tags[_IMAGE_LENGTH][0], tags[_IMAGE_WIDTH][0]
+        samples = tags.get(_SAMPLES_PER_PIXEL, (1,))[0]
+        bits = tags.get(_BITS_PER_SAMPLE, (1,))[0]
+        sample_format = tags.get(_SAMPLE_FORMAT, (1,))[0]
+        compression = tags.get(_COMPRESSION, (1,))[0]
+        if compression not in (1, 8, 32946):
+            raise NotImplementedError(f"TIFF compression {compression} is not supported.")
+        if samples > 1 and tags.get(_PLANAR_CONFIGURATION, (1,))[0] != 1:
+            raise NotImplementedError('Planar TIFF images are not supported.')
+        if bits not in (8, 16, 32, 64):
+            raise NotImplementedError(f"TIFF images with {bits} bits per sample are not supported.")
+        kind = {1: 'u', 2: 'i', 3: 'f'}.get(sample_format, 'u')
+        dtype = np.dtype(f"{self._endian}{kind}{bits // 8}")
+        shape = (height, width) if samples == 1 else (height, width, samples)
+        return {
+            'shape': shape,
+            'dtype': dtype,
+            'compression': compression,
+            'predictor': tags.get(_PREDICTOR, (1,))[0],
+            'offsets': tags[_STRIP_OFFSETS],
+            'counts': tags[_STRIP_BYTE_COUNTS],
+        }
+
+    def __len__(self):
+        return len(self._pages)
+
+    @property
+    def frame_shape(self):
+        return self._frame_shape
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    def _decode(self, i):
+        page = self._pages[i]
+        if page['shape'] != self._frame_shape or page['dtype'] != self._file_dtype:
+            raise ValueError(f"Page {i} of {self.filename} does not have the shape and type of the first page.")
+        offsets, counts = page['offsets'], page['counts']
+        nbytes = int(np.prod(page['shape'])) * page['dtype'].itemsize
+        if page['compression'] == 1:
+            contiguous = all(offsets[k] + counts[k] == offsets[k + 1] for k in range(len(offsets) - 1))
+            if contiguous:
+                raw = self._buffer[offsets[0]:offsets[0] + nbytes]
+            else:
+                raw = np.concatenate([self._buffer[o:o + c] for o, c in zip(offsets, counts)])[:nbytes]
+        else:
+            raw = np.frombuffer(b''.join(zlib.decompress(bytes(self._buffer[o:o + c]))
+                                        for o, c in zip(offsets, counts))[:nbytes], dtype=np.uint8)
+        frame = raw.view(page['dtype']).reshape(page['shape'])
+        if page['predictor'] == 2:
+            # Horizontal differencing
+            frame = np.cumsum(frame, axis=1, dtype=page['dtype'])
+        elif page['predictor'] != 1:
+            raise NotImplementedError(f"TIFF predictor {page['predictor']} is not supported.")
+        return frame.astype(self._dtype, copy=False)
+
+    def close(self):
+        self._buffer = None
+        super().close()
@@ -0,0 +1,229 @@
+import itertools
+import json
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .read_ngrid import ngrid_dtype, _ByteReader, _index_range
+
+# File layout:
+#   MAGIC, format version (uint32, little-endian)
+#   the compressed chunks, back to back, in column-major order of the chunk grid
+#   the footer index (JSON): data_size, data_type, chunk_shape, codec and the
+#       (offset, length) of each chunk; length 0 marks a chunk of zeros
+#   footer offset and length (two uint64, little-endian), MAGIC
+MAGIC = b'NDIGRIDC'
+VERSION = 1
+_HEADER = struct.Struct('<8sI')
+_TRAILER = struct.Struct('<QQ8s')
+
+# The raw size that default chunk shapes aim for
+CHUNK_BYTES = 1 << 20
+
+_CODECS = {
+    'zlib': (lambda data, level: zlib.compress(data, level), zlib.decompress),
+    'none': (lambda data, level: data, lambda data: data),
+}
+
+def register_codec(name, compress, decompress):
+    """
+    Makes a compression codec available to write_ngrid_chunked and read_ngrid_chunked.
+
+    Codecs from ndi-compress, for example, can be registered under their own names.
+
+    Args:
+        name (str): The name stored in the file's index.
+        compress (callable): compress(data, level) -> bytes.
+        decompress (callable): decompress(data) -> bytes.
+    """
+    _CODECS[name] = (compress, decompress)
+
+def _codec(name):
+    try:
+        return _CODECS[name]
+    except KeyError:
+        raise ValueError(f"Unknown codec '{name}'; registered codecs are {sorted(_CODECS)}.") from None
+
+def default_chunk_shape(data_size, itemsize, chunk_bytes=CHUNK_BYTES):
+    """
+    Returns a chunk shape of about chunk_bytes bytes, found by halving the
+    largest dimension until the chunk is small enough.
+    """
+    shape = [max(1, int(n)) for n in data_size]
+    while int(np.prod(shape)) * itemsize > chunk_bytes and max(shape) > 1:
+        i = shape.index(max(shape))
+        shape[i] = (shape[i] + 1) // 2
+    return shape
+
+def _chunk_grid(data_size, chunk_shape):
+    return [-(-int(n) // int(c)) if n else 0 for n, c in zip(data_size, chunk_shape)]
+
+def _chunk_indices(grid):
+    # Chunk indices in column-major order (first dimension fastest)
+    for index in itertools.product(*(range(g) for g in reversed(grid))):
+        yield tuple(reversed(index))
+
+def _chunk_slices(index, chunk_shape, data_size):
+    return tuple(slice(i * c, min((i + 1) * c, n)) for i, c, n in zip(index, chunk_shape, data_size))
+
+def write_ngrid_chunked(x, file_path, data_type='double', chunk_shape=None, codec='zlib', level=6, workers=None):
+    """
+    Write an n-dimensional matrix to a chunked, compressed file.
+
+    The array is tiled into chunks of chunk_shape; each chunk is stored in
+    column-major order and compressed on its own, so that a reader can
+    decompress only the chunks a slice touches. Chunks are compressed in a
+    pool of threads.
+
+    Args:
+        x (np.ndarray): Data to write (a numpy.memmap is read chunk by chunk).
+        file_path (str): Path to output file.
+        data_type (str): Data type to write as (see read_ngrid).
+        chunk_shape (list of int): The shape of a chunk (default: about 1 MiB).
+        codec (str): 'zlib', 'none', or a codec added with register_codec.
+        level (int): The compression level passed to the codec.
+        workers (int): The number of compression threads.
+    """
+    np_dtype = np.dtype(ngrid_dtype(data_type))
+    if not isinstance(x, np.ndarray):
+        x = np.array(x)
+    data_size = [int(n) for n in x.shape]
+    if chunk_shape is None:
+        chunk_shape = default_chunk_shape(data_size, np_dtype.itemsize)
+    chunk_shape = [int(c) for c in chunk_shape]
+    if len(chunk_shape) != len(data_size) or min(chunk_shape, default=1) < 1:
+        raise ValueError('chunk_shape must have one positive entry per dimension of x.')
+    compress, _ = _codec(codec)
+
+    def encode(index):
+        chunk = np.asarray(x[_chunk_slices(index, chunk_shape, data_size)], dtype=np_dtype)
+        raw = chunk.tobytes(order='F')
+        if not np.frombuffer(raw, dtype=np.uint8).any():
+            return b''
+        return compress(raw, level)
+
+    if workers is None:
+        workers = min(32, (os.cpu_count() or 1) + 4)
+    grid = _chunk_grid(data_size, chunk_shape)
+    chunks = []
+    with open(file_path, 'wb') as f, ThreadPoolExecutor(max_workers=workers) as pool:
+        f.write(_HEADER.pack(MAGIC, VERSION))
+        offset = _HEADER.size
+        indices = _chunk_indices(grid)
+        # Compress a bounded window of chunks at a time so memory stays small
+        window = 4 * workers
+        while True:
+            batch = list(itertools.islice(indices, window))
+            if not batch:
+                break
+            for data in pool.map(encode, batch):
+                f.write(data)
+                chunks.append([offset, len(data)])
+                offset += len(data)
+
+        footer = json.dumps({
+            'data_size': data_size,
+            'data_type': data_type,
+            'chunk_shape': chunk_shape,
+            'codec': codec,
+            'chunks': chunks,
+        }).encode('utf-8')
+        f.write(footer)
+        f.write(_TRAILER.pack(offset, len(footer), MAGIC))
+
+def read_ngrid_chunked_info(filename_or_fileobj):
+    """
+    Reads the index of a file written by write_ngrid_chunked.
+
+    Returns:
+        dict: data_size, data_type, chunk_shape, codec and the (offset, length)
+            of each chunk in column-major order of the chunk grid.
+    """
+    reader = _ByteReader(filename_or_fileobj)
+    try:
+        return _read_info(reader)
+    finally:
+        reader.close()
+
+def _read_info(reader):
+    magic, version = _HEADER.unpack(reader.read(0, _HEADER.size))
+    if magic != MAGIC:
+        raise ValueError('Not a chunked ngrid file.')
+    if version > VERSION:
+        raise ValueError(f"Chunked ngrid format version {version} is not supported.")
+    if hasattr(reader.f, 'seek'):
+        end = reader.f.seek(0, 2) - reader.base
+    else:
+        reader.f.fseek(0, 'eof')
+        end = reader.f.ftell() - reader.base
+    footer_offset, footer_length, magic = _TRAILER.unpack(reader.read(end - _TRAILER.size, _TRAILER.size))
+    if magic != MAGIC:
+        raise ValueError('The chunked ngrid file is truncated.')
+    return json.loads(reader.read(footer_offset, footer_length))
+
+def read_ngrid_chunked(filename_or_fileobj, index_ranges=None, workers=None):
+    """
+    Read an n-dimensional matrix, or a block of it, from a file written by write_ngrid_chunked.
+
+    Only the chunks that the block touches are read and decompressed; they
+    are decompressed in a pool of threads.
+
+    Args:
+        filename_or_fileobj (str or fileobj): Path to file, file object or
+            ndi.database.binarydoc.BinaryDoc.
+        index_ranges (list): The block to read, as for read_ngrid_block
+            (default: the whole matrix).
+        workers (int): The number of decompression threads.
+
+    Returns:
+        np.ndarray: The matrix or block, in Fortran order.
+    """
+    reader = _ByteReader(filename_or_fileobj)
+    try:
+        info = _read_info(reader)
+        data_size = info['data_size']
+        chunk_shape = info['chunk_shape']
+        np_dtype = np.dtype(ngrid_dtype(info['data_type']))
+        _, decompress = _codec(info['codec'])
+
+        index_ranges = list(index_ranges or []) + [None] * (len(data_size) - len(index_ranges or []))
+        if len(index_ranges) > len(data_size):
+            raise ValueError('index_ranges has more entries than data_size has dimensions.')
+        ranges = [_index_range(index, n) for index, n in zip(index_ranges, data_size)]
+        out = np.zeros(tuple(stop - start for start, stop in ranges), dtype=np_dtype, order='F')
+        if out.size == 0:
+            return out
+
+        # The chunks that overlap the block, and their compressed bytes
+        grid = _chunk_grid(data_size, chunk_shape)
+        strides = np.cumprod([1] + grid[:-1])
+        touched = itertools.product(*(range(start // c, (stop - 1) // c + 1)
+                                      for (start, stop), c in zip(ranges, chunk_shape)))
+        jobs = []
+        for index in touched:
+            offset, length = info['chunks'][int(np.dot(index, strides))]
+            if length:
+                jobs.append((index, reader.read(offset, length)))
+    finally:
+        reader.close()
+
+    def place(job):
+        index, data = job
+        region = _chunk_slices(index, chunk_shape, data_size)
+        shape = tuple(s.stop - s.start for s in region)
+        chunk = np.frombuffer(decompress(data), dtype=np_dtype).reshape(shape, order='F')
+        # The overlap of the chunk and the block, in chunk and in block coordinates
+        src = tuple(slice(max(start, s.start) - s.start, min(stop, s.stop) - s.start)
+                    for (start, stop), s in zip(ranges, region))
+        dst = tuple(slice(max(start, s.start) - start, min(stop, s.stop) - start)
+                    for (start, stop), s in zip(ranges, region))
+        out[dst] = chunk[src]
+
+    if len(jobs) <= 1 or workers == 1:
+        for job in jobs:
+            place(job)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(place, jobs))
+    return out
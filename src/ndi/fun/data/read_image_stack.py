@@ -1,5 +1,92 @@
-def read_image_stack(session, doc, fmt):
+import os
+import tempfile
+from ndi.fun.file import BinaryReader
+from .image_stack import CACHE_FRAMES, RawImageStack, TiffImageStack
+from .read_ngrid import ngrid_dtype
+
+_TIFF_FORMATS = ('tif', 'tiff')
+_RAW_FORMATS = ('raw', 'bin', 'ngrid')
+
+# The number of bytes copied at a time from binary documents that are not files
+COPY_BUFFER_SIZE = 1 << 20
+
+def _local_copy(session, doc, fmt):
+    """
+    Returns (path, is_temporary) for the document's 'imageStack' file.
+
+    Binary documents that are plain files are used in place; others (such as
+    an ndi.database.binarydoc.BinaryDoc) are copied to a temporary file.
+    """
+    f = session.database_openbinarydoc(doc, 'imageStack')
+    if f is None:
+        raise FileNotFoundError("The document's 'imageStack' file is not available.")
+    try:
+        name = getattr(f, 'name', None)
+        if isinstance(name, str) and os.path.isfile(name):
+            return name, False
+        reader = BinaryReader(f)
+        fd, path = tempfile.mkstemp(suffix='.' + fmt)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    block = reader.read(COPY_BUFFER_SIZE)
+                    if not block:
+                        break
+                    out.write(block)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path, True
+    finally:
+        session.database_closebinarydoc(f)
+
+def read_image_stack(session, doc, fmt, cache_frames=CACHE_FRAMES):
     """
     Read image stack or video.
+
+    The stack is opened lazily: the frame offsets are indexed once, and a
+    frame is decoded only when it is indexed (uncompressed frames are
+    memory-mapped). The most recently used frames are kept in a bounded cache.
+
+    Args:
+        session (ndi.session): The session that holds doc.
+        doc (ndi.document): An imageStack document; its binary file is 'imageStack'.
+        fmt (str): The file format: 'tif'/'tiff', or 'raw'/'bin'/'ngrid' for
+            an uncompressed grid whose last dimension is the frame number.
+            Raw stacks take their size and type from the document's
+            imageStack_parameters (dimension_size and data_type).
+        cache_frames (int): The number of decoded frames to keep.
+
+    Returns:
+        ndi.fun.data.image_stack.ImageStack: An array-like stack; stack[i] is frame i.
+            Binary documents that are not plain files are copied to a
+            temporary file, which is removed when the stack is closed.
     """
-    raise NotImplementedError("This function depends on imageio or opencv which are not yet in dependencies.")
+    fmt = fmt.lower().lstrip('.')
+    if fmt not in _TIFF_FORMATS + _RAW_FORMATS:
+        raise NotImplementedError(f"Reading '{fmt}' stacks depends on imageio or opencv which are not yet in dependencies.")
+
+    if fmt in _RAW_FORMATS:
+        parameters = doc.document_properties.get('imageStack_parameters', {})
+        dimension_size = parameters.get('dimension_size')
+        if not dimension_size:
+            raise ValueError('Raw image stacks need imageStack_parameters.dimension_size.')
+        dimension_size = list(dimension_size)
+        frame_shape, n_frames = dimension_size[:-1], dimension_size[-1]
+
+    path, is_temporary = _local_copy(session, doc, fmt)
+    try:
+        if fmt in _TIFF_FORMATS:
+            stack = TiffImageStack(path, cache_frames=cache_frames)
+        else:
+            stack = RawImageStack(path, frame_shape, ngrid_dtype(parameters.get('data_type', 'double')),
+                                  n_frames=n_frames, cache_frames=cache_frames)
+    except BaseException:
+        if is_temporary:
+            os.remove(path)
+        raise
+    if is_temporary:
+        # The file is memory-mapped (which keeps Windows from removing it), so
+        # the stack removes it when it is closed
+        stack._temporary_file = path
+    return stack
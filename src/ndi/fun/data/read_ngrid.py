@@ -1,17 +1,15 @@
 import numpy as np
 import os
 
-def read_ngrid(filename_or_fileobj, data_size, data_type='double'):
+def ngrid_dtype(data_type):
     """
-    Read an n-dimensional matrix from a binary file.
+    Returns the numpy dtype for an ngrid data type name.
 
     Args:
-        filename_or_fileobj (str or fileobj): Path to file or file object.
-        data_size (list of int): Dimensions of matrix.
         data_type (str): 'double', 'single', 'int8', 'uint8', etc.
 
     Returns:
-        np.ndarray: N-dimensional matrix.
+        numpy type: The matching type (np.float64 for unknown names).
     """
     dtype_map = {
         'double': np.float64,
@@ -24,11 +22,76 @@ def read_ngrid(filename_or_fileobj, data_size, data_type='double'):
         'uint32': np.uint32,
         'int64': np.int64,
         'uint64': np.uint64,
-        'char': np.char, # ?
+        'char': np.uint8, # Matlab 'char' precision reads and writes 8-bit characters
         'logical': np.bool_
     }
+    return dtype_map.get(data_type, np.float64)
+
+def _has_fileno(fileobj):
+    try:
+        fileobj.fileno()
+        return True
+    except (AttributeError, OSError, ValueError):
+        return False
+
+class _ByteReader:
+    """
+    Random access to the bytes of a file path, file object or ndi.database.binarydoc.BinaryDoc.
+    Offsets are relative to the position of a file object when the reader is made.
+    """
+
+    def __init__(self, filename_or_fileobj):
+        self.close_file = isinstance(filename_or_fileobj, str)
+        if self.close_file:
+            if not os.path.isfile(filename_or_fileobj):
+                raise FileNotFoundError(f"File not found: {filename_or_fileobj}")
+            self.f = open(filename_or_fileobj, 'rb')
+        else:
+            self.f = filename_or_fileobj
+        self.binarydoc = not hasattr(self.f, 'read') and hasattr(self.f, 'fread')
+        self.base = self.f.ftell() if self.binarydoc else self.f.tell()
+
+    def read(self, offset, nbytes):
+        if self.binarydoc:
+            self.f.fseek(self.base + offset, 'bof')
+            data = self.f.fread(nbytes, 'uint8', 0)
+            return data if isinstance(data, bytes) else np.asarray(data, dtype=np.uint8).tobytes()
+        self.f.seek(self.base + offset)
+        return self.f.read(nbytes)
+
+    def close(self):
+        if self.close_file:
+            self.f.close()
+
+def read_ngrid(filename_or_fileobj, data_size, data_type='double', mmap=False):
+    """
+    Read an n-dimensional matrix from a binary file.
+
+    Args:
+        filename_or_fileobj (str or fileobj): Path to file, file object or
+            ndi.database.binarydoc.BinaryDoc.
+        data_size (list of int): Dimensions of matrix.
+        data_type (str): 'double', 'single', 'int8', 'uint8', etc.
+        mmap (bool): Return a read-only, Fortran-ordered numpy.memmap of the
+            file instead of reading it; only the parts that are indexed are
+            ever read from disk. Requires a path or a file object with a file
+            descriptor.
+
+    Returns:
+        np.ndarray: N-dimensional matrix.
+    """
+    np_dtype = ngrid_dtype(data_type)
 
-    np_dtype = dtype_map.get(data_type, np.float64)
+    if mmap:
+        shape = tuple(int(n) for n in data_size)
+        if isinstance(filename_or_fileobj, str):
+            if not os.path.isfile(filename_or_fileobj):
+                raise FileNotFoundError(f"File not found: {filename_or_fileobj}")
+            return np.memmap(filename_or_fileobj, dtype=np_dtype, mode='r', shape=shape, order='F')
+        if not _has_fileno(filename_or_fileobj):
+            raise ValueError('mmap requires a file path or a file object with a file descriptor.')
+        return np.memmap(filename_or_fileobj, dtype=np_dtype, mode='r', shape=shape, order='F',
+                         offset=filename_or_fileobj.tell())
 
     if isinstance(filename_or_fileobj, str):
         if not os.path.isfile(filename_or_fileobj):
@@ -42,10 +105,98 @@ def read_ngrid(filename_or_fileobj, data_size, data_type='double'):
             x = np.fromfile(f, dtype=np_dtype, count=count)
             x = x.reshape(data_size, order='F')
 
-    else: # file object
-        # Assuming read method
+    elif _has_fileno(filename_or_fileobj):
         count = np.prod(data_size)
         x = np.fromfile(filename_or_fileobj, dtype=np_dtype, count=count)
         x = x.reshape(data_size, order='F')
 
+    else: # file-like object or BinaryDoc
+        count = int(np.prod(data_size))
+        reader = _ByteReader(filename_or_fileobj)
+        x = np.frombuffer(reader.read(0, count * np.dtype(np_dtype).itemsize), dtype=np_dtype, count=count)
+        x = x.reshape(data_size, order='F')
+
     return x
+
+def _index_range(index, n):
+    # Converts a per-dimension index (None, int, (start, stop) or slice) to (start, stop)
+    if index is None:
+        return 0, n
+    if isinstance(index, slice):
+        start, stop, step = index.indices(n)
+        if step != 1:
+            raise ValueError('Only contiguous index ranges (step 1) are supported.')
+        return start, max(start, stop)
+    if isinstance(index, (int, np.integer)):
+        index = int(index) + n if index < 0 else int(index)
+        if not 0 <= index < n:
+            raise IndexError(f"Index {index} is out of range for a dimension of size {n}.")
+        return index, index + 1
+    start, stop = index
+    if not 0 <= start <= stop <= n:
+        raise IndexError(f"Range {start}:{stop} is out of range for a dimension of size {n}.")
+    return int(start), int(stop)
+
+def read_ngrid_block(filename_or_fileobj, data_size, index_ranges, data_type='double'):
+    """
+    Read a rectangular sub-block of an n-dimensional matrix from a binary file.
+
+    Only the bytes of the block are read: each run that is contiguous in the
+    file (column-major order) is read with one seek and one read.
+
+    Args:
+        filename_or_fileobj (str or fileobj): Path to file, file object or
+            ndi.database.binarydoc.BinaryDoc.
+        data_size (list of int): Dimensions of the whole matrix.
+        index_ranges (list): For each dimension, a (start, stop) pair of
+            0-based indices (stop exclusive), a slice with step 1, a single
+            index, or None for the whole dimension. Missing trailing dimensions
+            are taken whole.
+        data_type (str): 'double', 'single', 'int8', 'uint8', etc.
+
+    Returns:
+        np.ndarray: The block, in Fortran order, with one dimension per
+            dimension of the matrix.
+    """
+    np_dtype = np.dtype(ngrid_dtype(data_type))
+    data_size = [int(n) for n in data_size]
+    index_ranges = list(index_ranges) + [None] * (len(data_size) - len(index_ranges))
+    if len(index_ranges) > len(data_size):
+        raise ValueError('index_ranges has more entries than data_size has dimensions.')
+    ranges = [_index_range(index, n) for index, n in zip(index_ranges, data_size)]
+    shape = tuple(stop - start for start, stop in ranges)
+    out = np.empty(shape, dtype=np_dtype, order='F')
+    if out.size == 0:
+        return out
+
+    # Element strides of each dimension in the file
+    strides = np.cumprod([1] + data_size[:-1])
+
+    # The leading whole dimensions and the next dimension form one contiguous run
+    k = 0
+    while k < len(ranges) - 1 and ranges[k] == (0, data_size[k]):
+        k += 1
+    run = int(strides[k]) * shape[k]
+    run_start = int(strides[k]) * ranges[k][0]
+
+    outer = ranges[k + 1:]
+    outer_shape = shape[k + 1:]
+    outer_strides = strides[k + 1:]
+    flat = out.reshape(-1, order='F')
+    reader = _ByteReader(filename_or_fileobj)
+    try:
+        position = 0
+        # Runs are visited in column-major order of the outer dimensions, which
+        # is the order in which they are laid out in the (Fortran-ordered) output
+        for index in np.ndindex(*reversed(outer_shape)):
+            element = run_start
+            for i, (start, _), stride in zip(reversed(index), outer, outer_strides):
+                element += (start + i) * int(stride)
+            data = reader.read(element * np_dtype.itemsize, run * np_dtype.itemsize)
+            if len(data) < run * np_dtype.itemsize:
+                raise ValueError('The file is smaller than data_size requires.')
+            flat[position:position + run] = np.frombuffer(data, dtype=np_dtype)
+            position += run
+    finally:
+        reader.close()
+    return out
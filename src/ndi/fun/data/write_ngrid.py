@@ -1,40 +1,100 @@
 import numpy as np
+from .read_ngrid import ngrid_dtype
 
-def write_ngrid(x, file_path, data_type='double'):
+# The number of elements cast and written at a time
+BLOCK_SIZE = 1 << 20
+
+def _has_fileno(f):
+    # ndarray.tofile needs a file descriptor; io.BytesIO and similar objects have none
+    try:
+        f.fileno()
+    except (AttributeError, OSError):
+        return False
+    return True
+
+def _write_blocks(x, f, np_dtype, block_size):
+    # Writes x in Fortran order (column-major, to match Matlab), casting at
+    # most block_size elements at a time instead of copying the whole array
+    if x.size == 0:
+        return
+    write = (lambda a: a.tofile(f)) if _has_fileno(f) else (lambda a: f.write(a.tobytes(order='F')))
+    if x.dtype == np_dtype and x.flags['F_CONTIGUOUS']:
+        write(x.reshape(-1, order='F'))
+        return
+    it = np.nditer(x, flags=['external_loop', 'buffered', 'zerosize_ok'], op_flags=['readonly'],
+                   op_dtypes=[np_dtype], casting='unsafe', order='F', buffersize=block_size)
+    for block in it:
+        write(block)
+
+def write_ngrid(x, file_path, data_type='double', append=False, block_size=BLOCK_SIZE):
     """
     Write an n-dimensional matrix to a binary file.
 
+    The data are cast and written in column-major blocks straight from x, so
+    no full copy of the array is made.
+
     Args:
         x (np.ndarray): Data to write.
-        file_path (str): Path to output file.
+        file_path (str or fileobj): Path to output file, or a binary file object.
         data_type (str): Data type to write as.
+        append (bool): Add x to the end of the file. Because the file is in
+            column-major order, this extends a grid along its last dimension
+            when x has the same leading dimensions.
+        block_size (int): The number of elements cast and written at a time.
     """
-    dtype_map = {
-        'double': np.float64,
-        'single': np.float32,
-        'int8': np.int8,
-        'uint8': np.uint8,
-        'int16': np.int16,
-        'uint16': np.uint16,
-        'int32': np.int32,
-        'uint32': np.uint32,
-        'int64': np.int64,
-        'uint64': np.uint64,
-        'logical': np.bool_
-    }
-
-    np_dtype = dtype_map.get(data_type, np.float64)
+    np_dtype = np.dtype(ngrid_dtype(data_type))
 
     # Ensure x is numpy array
     if not isinstance(x, np.ndarray):
         x = np.array(x)
 
-    # Cast to type
-    x_casted = x.astype(np_dtype)
+    if hasattr(file_path, 'write'):
+        _write_blocks(x, file_path, np_dtype, block_size)
+        return
+    with open(file_path, 'ab' if append else 'wb') as f:
+        _write_blocks(x, f, np_dtype, block_size)
+
+def write_ngrid_blocks(blocks, file_path, data_type='double', append=False, data_size=None,
+                       block_size=BLOCK_SIZE):
+    """
+    Write an n-dimensional matrix to a binary file from a sequence of blocks
+    along its last dimension.
+
+    Each block is written as it arrives, so the grid can come from a generator
+    and never be held in memory all at once.
+
+    Args:
+        blocks (iterable of np.ndarray): The blocks, in order. All have the
+            dimensions of the grid; their last dimensions add up to the last
+            dimension of the grid.
+        file_path (str): Path to output file.
+        data_type (str): Data type to write as.
+        append (bool): Extend an existing grid instead of starting a new file.
+        data_size (list of int): With append, the dimensions of the existing grid.
+        block_size (int): The number of elements cast and written at a time.
+
+    Returns:
+        list of int: The dimensions of the grid in the file.
+    """
+    np_dtype = np.dtype(ngrid_dtype(data_type))
+    if append and data_size is None:
+        raise ValueError('data_size of the existing grid is required to append.')
+    leading = list(data_size[:-1]) if append else None
+    count = int(data_size[-1]) if append else 0
+
+    with open(file_path, 'ab' if append else 'wb') as f:
+        for block in blocks:
+            if not isinstance(block, np.ndarray):
+                block = np.array(block)
+            if block.ndim == 0:
+                raise ValueError('Blocks must have at least one dimension.')
+            if leading is None:
+                leading = list(block.shape[:-1])
+            elif list(block.shape[:-1]) != leading:
+                raise ValueError(f"Block of shape {block.shape} does not match the leading dimensions {leading}.")
+            _write_blocks(block, f, np_dtype, block_size)
+            count += block.shape[-1]
 
-    with open(file_path, 'wb') as f:
-        # Write in Fortran order (column-major) to match Matlab
-        # To do this correctly:
-        # 1. Flatten in F order
-        # 2. Write to file
-        x_casted.flatten(order='F').tofile(f)
+    if leading is None:
+        return [0]
+    return leading + [count]
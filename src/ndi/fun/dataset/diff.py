@@ -1,9 +1,14 @@
-def diff(dataset1, dataset2):
+def diff(dataset1, dataset2, verbose=True, workers=None, manifest_path=None, check_files=False):
     """
     Compares two NDI datasets.
 
     This functionality is similar to ndi.fun.session.diff, as dataset often inherits from session or behaves similarly.
+    Documents are compared by content hash first, and only changed documents
+    are compared in full (in workers processes if workers > 1). With
+    manifest_path, only documents changed since the previous diff are re-examined.
+    With check_files, the binary files of the common documents are compared too.
     """
     # Reuse session diff
     from ndi.fun.session.diff import diff as session_diff
-    return session_diff(dataset1, dataset2)
+    return session_diff(dataset1, dataset2, verbose=verbose, workers=workers, manifest_path=manifest_path,
+                        check_files=check_files)
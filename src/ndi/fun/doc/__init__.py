@@ -1,6 +1,6 @@
 from .all_types import all_types
 from .diff import diff
-from .find_fuid import find_fuid
+from .find_fuid import find_fuid, find_fuids
 from .get_doc_types import get_doc_types
 from .ontology_table_row_doc_to_table import ontology_table_row_doc_to_table
 from .ontology_table_row_vars import ontology_table_row_vars
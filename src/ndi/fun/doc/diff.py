@@ -1,6 +1,70 @@
-import copy
+from concurrent.futures import ThreadPoolExecutor
+from ndi.fun.file import BinaryReader, open_binary, compare_readers
+from ndi.util.cow import without_fields
+from ndi.document_hash import content_hash, dependency_sort_key
 
-def diff(doc1, doc2, ignore_fields=None, check_file_list=True, check_files=False, session1=None, session2=None):
+# Files are read in large blocks so that comparisons run at disk speed
+BUFFER_SIZE = 4 * 1024 * 1024
+
+
+def compare_binary_file(session1, doc1, session2, doc2, filename, buffer_size=BUFFER_SIZE):
+    """
+    Compares a binary file of two documents through the sessions' binary-doc API.
+
+    The sizes are compared first; the contents are then read in blocks of
+    buffer_size bytes, and reading stops at the first block that differs.
+    A file that cannot be opened (or that the database does not provide)
+    counts as a difference.
+
+    Args:
+        session1, session2: ndi.session objects.
+        doc1, doc2: The documents (or document IDs) in session1 and session2.
+        filename (str): The name of the file in both documents.
+        buffer_size (int): The number of bytes read from each file at a time.
+
+    Returns:
+        str: None if the files are identical, otherwise a description of the difference.
+    """
+    f1 = f2 = None
+    try:
+        try:
+            f1 = open_binary(session1, doc1, filename)
+            f2 = open_binary(session2, doc2, filename)
+        except Exception as e:
+            return f"could not be opened ({e})."
+        try:
+            return compare_readers(BinaryReader(f1), BinaryReader(f2), buffer_size)
+        except OSError as e:
+            return f"could not be read ({e})."
+    finally:
+        if f1 is not None:
+            session1.database_closebinarydoc(f1)
+        if f2 is not None:
+            session2.database_closebinarydoc(f2)
+
+
+def compare_binary_files(tasks, workers=None, buffer_size=BUFFER_SIZE):
+    """
+    Compares many pairs of binary files in a pool of threads.
+
+    Args:
+        tasks (list of tuple): (session1, doc1, session2, doc2, filename) for
+            each pair of files (see compare_binary_file).
+        workers (int): The number of threads (default: ThreadPoolExecutor's default).
+        buffer_size (int): The number of bytes read from each file at a time.
+
+    Returns:
+        list: The result of compare_binary_file for each task, in order.
+    """
+    tasks = list(tasks)
+    if len(tasks) <= 1 or workers == 1:
+        return [compare_binary_file(*task, buffer_size=buffer_size) for task in tasks]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda task: compare_binary_file(*task, buffer_size=buffer_size), tasks))
+
+
+def diff(doc1, doc2, ignore_fields=None, check_file_list=True, check_files=False, session1=None, session2=None,
+         workers=None):
     """
     Compare two NDI documents for equality.
 
@@ -10,6 +74,7 @@ def diff(doc1, doc2, ignore_fields=None, check_file_list=True, check_files=False
         check_file_list (bool): Check if file lists match (default: True).
         check_files (bool): Check binary content (default: False).
         session1, session2: ndi.session objects (required if check_files=True).
+        workers (int): The number of threads that compare binary files.
 
     Returns:
         tuple: (are_equal, report)
@@ -23,50 +88,44 @@ def diff(doc1, doc2, ignore_fields=None, check_file_list=True, check_files=False
         if session1 is None or session2 is None:
             raise ValueError('If check_files is True, session1 and session2 must be provided.')
 
+    # Identical content hashes settle the comparison without walking the documents.
+    # They are computed afresh: a memoized hash would miss changes made in place.
+    if not check_files:
+        hash_ignore = tuple(ignore_fields) + (() if check_file_list else ('files',))
+        if content_hash(doc1.document_properties, hash_ignore) == content_hash(doc2.document_properties, hash_ignore):
+            return True, {'mismatch': False, 'details': []}
+
     are_equal = True
     details = []
 
-    # Deep copy properties to avoid modifying originals
-    props1 = copy.deepcopy(doc1.document_properties)
-    props2 = copy.deepcopy(doc2.document_properties)
-
-    # 1. Remove ignored fields
-    for field in ignore_fields:
-        parts = field.split('.')
-        if len(parts) == 1:
-            props1.pop(field, None)
-            props2.pop(field, None)
-        elif len(parts) == 2:
-            if parts[0] in props1 and isinstance(props1[parts[0]], dict):
-                props1[parts[0]].pop(parts[1], None)
-            if parts[0] in props2 and isinstance(props2[parts[0]], dict):
-                props2[parts[0]].pop(parts[1], None)
+    # 1. Remove ignored fields; the views share every untouched subtree with the originals
+    props1 = without_fields(doc1.document_properties, ignore_fields)
+    props2 = without_fields(doc2.document_properties, ignore_fields)
+    dep1 = props1.get('depends_on', [])
+    dep2 = props2.get('depends_on', [])
+    files1 = props1.get('files', {})
+    files2 = props2.get('files', {})
+    props1 = without_fields(props1, ['depends_on', 'files'])
+    props2 = without_fields(props2, ['depends_on', 'files'])
 
     # 2. Handle 'depends_on' (Order Independent)
-    dep1 = props1.pop('depends_on', [])
-    dep2 = props2.pop('depends_on', [])
-
     if dep1 or dep2:
         if len(dep1) != len(dep2):
             are_equal = False
             details.append(f"Number of dependencies differs: {len(dep1)} vs {len(dep2)}.")
         else:
-            # Sort by name
-            dep1_sorted = sorted(dep1, key=lambda x: x.get('name', ''))
-            dep2_sorted = sorted(dep2, key=lambda x: x.get('name', ''))
+            # Sort by name and value, as content_hash does
+            dep1_sorted = sorted(dep1, key=dependency_sort_key)
+            dep2_sorted = sorted(dep2, key=dependency_sort_key)
 
             if dep1_sorted != dep2_sorted:
                 are_equal = False
                 details.append("Dependencies do not match.")
 
     # 3. Handle 'files' (Order Independent List Check)
-    files1 = props1.pop('files', {})
-    files2 = props2.pop('files', {})
-
+    f_list1 = files1.get('file_list', [])
+    f_list2 = files2.get('file_list', [])
     if check_file_list:
-        f_list1 = files1.get('file_list', [])
-        f_list2 = files2.get('file_list', [])
-
         # Ensure lists are sorted
         if sorted(f_list1) != sorted(f_list2):
             are_equal = False
@@ -79,11 +138,13 @@ def diff(doc1, doc2, ignore_fields=None, check_file_list=True, check_files=False
 
     # 5. Check binary file content if requested
     if check_files:
-        # Not fully implemented yet due to missing binary comparison utilities
-        # and session.database_openbinarydoc implementation details in Python port.
-        details.append("Binary file comparison requested but not fully implemented in Python port.")
-        # Stub implementation
-        pass
+        filenames = sorted(set(f_list1).intersection(f_list2))
+        results = compare_binary_files([(session1, doc1, session2, doc2, name) for name in filenames],
+                                       workers=workers)
+        for name, difference in zip(filenames, results):
+            if difference is not None:
+                are_equal = False
+                details.append(f"Binary file '{name}' {difference}")
 
     report = {'mismatch': not are_equal, 'details': details}
     return are_equal, report
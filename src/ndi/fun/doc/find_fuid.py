@@ -13,20 +13,33 @@ def find_fuid(ndi_obj, fuid):
             doc (ndi.document or None): The document object if found, else None.
             filename (str): The filename associated with the FUID, else ''.
     """
-    doc = None
-    filename = ''
+    return find_fuids(ndi_obj, [fuid])[fuid]
 
-    search_query = Query('base.id', 'regexp', '(.*)')
-    all_docs = ndi_obj.database_search(search_query)
+def find_fuids(ndi_obj, fuids):
+    """
+    Find the documents that hold many file UIDs at once.
 
-    for current_doc in all_docs:
-        file_list = current_doc.current_file_list()
+    Sessions look the UIDs up in their database's file UID index. Other
+    objects are searched with a single pass over all of their documents.
 
-        for fname in file_list:
-            doc_fuid = current_doc.get_fuid(fname)
-            if doc_fuid == fuid:
-                doc = current_doc
-                filename = fname
-                return doc, filename
+    Args:
+        ndi_obj (ndi.dataset or ndi.session): An ndi.dataset or ndi.session object to search within.
+        fuids (list of str): The file unique identifiers to search for.
 
-    return doc, filename
+    Returns:
+        dict: Maps each FUID to (doc, filename), or to (None, '') if it was not found.
+    """
+    fuids = list(fuids)
+    if hasattr(ndi_obj, 'database_find_fuids'):
+        found = ndi_obj.database_find_fuids(fuids)
+    else:
+        wanted = set(fuids)
+        found = {}
+        for current_doc in ndi_obj.database_search(Query('base.id', 'regexp', '(.*)')):
+            for fname in current_doc.current_file_list():
+                doc_fuid = current_doc.get_fuid(fname)
+                if doc_fuid in wanted and doc_fuid not in found:
+                    found[doc_fuid] = (current_doc, fname)
+            if len(found) == len(wanted):
+                break
+    return {fuid: found.get(fuid, (None, '')) for fuid in fuids}
@@ -1,66 +1,117 @@
+import csv
+import os
 import pandas as pd
-from ndi.fun.table import vstack
 
-def ontology_table_row_doc_to_table(table_row_doc, stack_all=False):
+def _group_key(variable_names):
+    if isinstance(variable_names, list):
+        return tuple(variable_names)
+    return variable_names
+
+def _data_rows(data):
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        return [data]
+    return []
+
+class _Group:
+    def __init__(self, number):
+        self.number = number
+        self.rows = []
+        self.doc_ids = []
+        self.filename = None
+        self.columns = None
+        self.header_columns = 0
+
+    def flush(self, output_folder):
+        # Appends the buffered rows to the group's CSV file under the columns
+        # seen so far. New columns are only ever added at the end, so earlier
+        # rows hold a prefix of the final columns; finish() fixes the header
+        chunk = pd.DataFrame(self.rows)
+        self.rows = []
+        if self.filename is None:
+            self.filename = os.path.join(output_folder, f'ontologyTableRow_{self.number:05d}.csv')
+            self.columns = list(chunk.columns)
+            self.header_columns = len(self.columns)
+            chunk.to_csv(self.filename, mode='w', header=True, index=False)
+            return
+        if chunk.empty and not len(chunk.columns):
+            return
+        self.columns = self.columns + [c for c in chunk.columns if c not in self.columns]
+        chunk.reindex(columns=self.columns).to_csv(self.filename, mode='a', header=False, index=False)
+
+    def finish(self, output_folder):
+        # Writes the remaining rows; if columns were added after the header was
+        # written, the file is rewritten once, as text, with the full header and
+        # the shorter rows padded
+        self.flush(output_folder)
+        if len(self.columns) == self.header_columns:
+            return
+        tmp = self.filename + '.tmp'
+        with open(self.filename, 'r', newline='') as src, open(tmp, 'w', newline='') as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst, lineterminator=os.linesep)
+            next(reader, None)
+            writer.writerow(self.columns)
+            padding = [''] * len(self.columns)
+            for row in reader:
+                writer.writerow(row + padding[len(row):])
+        os.replace(tmp, self.filename)
+        self.header_columns = len(self.columns)
+
+def ontology_table_row_doc_to_table(table_row_doc, stack_all=False, output_folder=None, chunk_size=10000):
     """
     Converts NDI ontologyTableRow documents to pandas DataFrames.
 
+    Documents are grouped by their variableNames in a single pass; the raw
+    rows of each group are gathered and each group's table is built once.
+
     Args:
-        table_row_doc (ndi.document or list of ndi.document): Documents to convert.
+        table_row_doc (ndi.document, list or iterable of ndi.document): Documents to convert.
         stack_all (bool): Whether to stack all tables together.
+        output_folder (str): If given, stream the groups to CSV files in this
+            folder instead of building tables in memory. Rows are appended to a
+            group's file every chunk_size rows, so table_row_doc may be a
+            generator over more documents than fit in memory.
+        chunk_size (int): The number of buffered rows per group in streaming mode.
 
     Returns:
         tuple: (data_tables, doc_ids)
-            data_tables (list of pd.DataFrame): The extracted tables.
+            data_tables (list of pd.DataFrame): The extracted tables (in
+                streaming mode, the CSV file of each group).
             doc_ids (list of list of str): The corresponding document IDs.
     """
-    if not isinstance(table_row_doc, list):
+    if hasattr(table_row_doc, 'document_properties'):
         table_row_doc = [table_row_doc]
+    if output_folder is not None:
+        os.makedirs(output_folder, exist_ok=True)
 
-    table_rows = []
-    variable_names_list = []
-    doc_id_list = []
-
+    groups = {}
     for doc in table_row_doc:
         props = doc.document_properties['ontologyTableRow']
-        data = props['data']
-        # Convert to DataFrame
-        if isinstance(data, list):
-            df = pd.DataFrame(data)
-        elif isinstance(data, dict):
-            df = pd.DataFrame([data])
-        else:
-            # Handle empty or scalar?
-            df = pd.DataFrame()
-
-        table_rows.append(df)
-        variable_names_list.append(props.get('variableNames'))
-        doc_id_list.append(doc.id)
-
-    if stack_all:
-        data_tables = [vstack(table_rows)]
-        doc_ids = [doc_id_list]
-    else:
-        # Group by variableNames
-        # Need to handle if variableNames is list or str
-        def get_key(v):
-            if isinstance(v, list):
-                return tuple(v)
-            return v
-
-        unique_vars = sorted(list(set(get_key(v) for v in variable_names_list)), key=lambda x: str(x))
+        key = None if stack_all else _group_key(props.get('variableNames'))
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = _Group(len(groups))
+        group.rows.extend(_data_rows(props['data']))
+        group.doc_ids.append(doc.id())
+        if output_folder is not None and len(group.rows) >= chunk_size:
+            group.flush(output_folder)
 
-        data_tables = []
-        doc_ids = []
+    keys = list(groups) if stack_all else sorted(groups, key=lambda x: str(x))
 
-        for var_key in unique_vars:
-            # Find indices
-            indices = [i for i, v in enumerate(variable_names_list) if get_key(v) == var_key]
-
-            group_tables = [table_rows[i] for i in indices]
-            group_ids = [doc_id_list[i] for i in indices]
-
-            data_tables.append(vstack(group_tables))
-            doc_ids.append(group_ids)
+    data_tables = []
+    doc_ids = []
+    for key in keys:
+        group = groups[key]
+        if output_folder is not None:
+            group.finish(output_folder)
+            data_tables.append(group.filename)
+        else:
+            data_tables.append(pd.DataFrame(group.rows))
+        doc_ids.append(group.doc_ids)
 
+    if stack_all and not data_tables and output_folder is None:
+        data_tables = [pd.DataFrame()]
+        doc_ids = [[]]
     return data_tables, doc_ids
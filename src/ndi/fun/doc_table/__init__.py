@@ -1,3 +1,4 @@
+from .class_table import class_table
 from .doc_cell_array_to_table import doc_cell_array_to_table
 from .element import element
 from .epoch import epoch
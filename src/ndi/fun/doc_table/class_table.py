@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+from did.query import Query
+from ndi.database.fieldsearch import project_fields
+
+def _search_fields(session, query, fields):
+    if hasattr(session, 'database_search_fields'):
+        return session.database_search_fields(query, fields)
+    docs = session.database_search(query)
+    return project_fields((doc.document_properties for doc in docs), fields)
+
+def class_table(session, class_name, property_list_name=None, fields=None, joins=None):
+    """
+    Generate a table of all documents of a class, one row per document.
+
+    The database returns only the needed fields, as columns, and each column
+    of the table is assembled directly from them. No document objects are
+    built, but the database still reads each matching document in full.
+
+    Args:
+        session: ndi.session or ndi.dataset object.
+        class_name (str): The document class (documents are found with 'isa').
+        property_list_name (str): The property block whose fields become the
+            columns (default: class_name).
+        fields (list of str): The fields of the block to include (default: all).
+        joins (dict): Columns taken from the documents that each document depends
+            on. Maps a dependency name (e.g. 'subject_id') to a tuple
+            (class_name, fields), where fields are dotted fields of the
+            dependency (e.g. ['subject.local_identifier']); each becomes a column
+            of that name. Missing dependencies give None.
+
+    Returns:
+        tuple: (table, doc_ids)
+            table (pd.DataFrame): The table.
+            doc_ids (list): The document IDs, one per row.
+    """
+    block = property_list_name or class_name
+    requested = [f'{block}.{f}' for f in fields] if fields else [block]
+    if joins:
+        requested.append('depends_on')
+    result = _search_fields(session, Query('', 'isa', class_name), requested)
+    doc_ids = result['base.id']
+    n = len(doc_ids)
+
+    columns = {}
+    if fields:
+        for f in fields:
+            columns[f] = result[f'{block}.{f}']
+    else:
+        blocks = [b if isinstance(b, dict) else {} for b in result[block]]
+        names = {}
+        for b in blocks:
+            for k in b:
+                names.setdefault(k, None)
+        for k in names:
+            columns[k] = [b.get(k) for b in blocks]
+
+    for dependency_name, (join_class, join_fields) in (joins or {}).items():
+        target = _search_fields(session, Query('', 'isa', join_class), list(join_fields))
+        position = {doc_id: i for i, doc_id in enumerate(target['base.id'])}
+        rows = np.full(n, -1, dtype=np.int64)
+        for i, depends_on in enumerate(result['depends_on']):
+            for d in depends_on or []:
+                if d.get('name') == dependency_name:
+                    rows[i] = position.get(d.get('value'), -1)
+                    break
+        missing = rows < 0
+        for f in join_fields:
+            values = np.empty(len(target['base.id']) + 1, dtype=object)
+            values[:-1] = target[f]
+            # Row -1 picks the trailing None for documents without the dependency
+            columns[f] = values[np.where(missing, -1, rows)]
+
+    return pd.DataFrame(columns, index=pd.RangeIndex(n)), doc_ids
@@ -1,12 +1,15 @@
 import pandas as pd
-from ndi.fun.table import vstack
+from ndi.util.cow import without_fields
+from ndi.util.vlt.data import flattenstruct2table
 
-def doc_cell_array_to_table(doc_cell_array):
+def doc_cell_array_to_table(doc_cell_array, infer_dtypes=True, categorical=False):
     """
     Converts a cell array of NDI documents to a table, with document IDs.
 
     Args:
         doc_cell_array (list of ndi.document): List of documents.
+        infer_dtypes (bool): Give columns numeric/boolean dtypes where possible.
+        categorical (bool): Store repetitive string columns as categoricals.
 
     Returns:
         tuple: (data_table, doc_ids)
@@ -16,12 +19,8 @@ def doc_cell_array_to_table(doc_cell_array):
     if not isinstance(doc_cell_array, list):
         doc_cell_array = [doc_cell_array]
 
-    tables = []
-    doc_ids = []
-
-    for doc in doc_cell_array:
-        tables.append(doc.to_table())
-        doc_ids.append(doc.id)
-
-    data_table = vstack(tables) if tables else pd.DataFrame()
+    # All documents are flattened in one pass into a single table
+    doc_ids = [doc.id() for doc in doc_cell_array]
+    rows = [without_fields(doc.document_properties, ['depends_on', 'files']) for doc in doc_cell_array]
+    data_table = flattenstruct2table(rows, infer_dtypes=infer_dtypes, categorical=categorical) if rows else pd.DataFrame()
     return data_table, doc_ids
@@ -1,36 +1,18 @@
-import pandas as pd
-from did.query import Query
+from .class_table import class_table
 
-def element(session):
+def element(session, include_subject=False):
     """
     Generate a table of all 'element' documents in a session/dataset.
 
     Args:
         session: ndi.session object.
+        include_subject (bool): Add the 'subject.local_identifier' of the subject
+            each element depends on.
 
     Returns:
         tuple: (element_table, doc_ids)
             element_table (pd.DataFrame): Table of element info.
             doc_ids (list): List of document IDs.
     """
-    query = Query('', 'isa', 'element')
-    docs = session.database_search(query)
-
-    rows = []
-    doc_ids = []
-
-    for doc in docs:
-        props = doc.document_properties['element']
-
-        # Flatten basic properties
-        row = props.copy()
-
-        # Handle direct_recording if present (it's a struct/dict)
-        # We might want to flatten it or keep as dict.
-        # Matlab flattenstruct2table typically flattens one level.
-
-        rows.append(row)
-        doc_ids.append(doc.id)
-
-    element_table = pd.DataFrame(rows)
-    return element_table, doc_ids
+    joins = {'subject_id': ('subject', ['subject.local_identifier'])} if include_subject else None
+    return class_table(session, 'element', joins=joins)
@@ -1,5 +1,4 @@
-import pandas as pd
-from did.query import Query
+from .class_table import class_table
 
 def probe(session):
     """
@@ -11,17 +10,4 @@ def probe(session):
     Returns:
         tuple: (probe_table, doc_ids)
     """
-    query = Query('', 'isa', 'probe')
-    docs = session.database_search(query)
-
-    rows = []
-    doc_ids = []
-
-    for doc in docs:
-        props = doc.document_properties['probe']
-        row = props.copy()
-        rows.append(row)
-        doc_ids.append(doc.id)
-
-    probe_table = pd.DataFrame(rows)
-    return probe_table, doc_ids
+    return class_table(session, 'probe')
@@ -1,5 +1,4 @@
-import pandas as pd
-from did.query import Query
+from .class_table import class_table
 
 def subject(session):
     """
@@ -11,21 +10,8 @@ def subject(session):
     Returns:
         tuple: (subject_table, doc_ids)
     """
-    query = Query('', 'isa', 'subject')
-    docs = session.database_search(query)
+    subject_table, doc_ids = class_table(session, 'subject')
 
-    rows = []
-    doc_ids = []
-
-    for doc in docs:
-        props = doc.document_properties['subject']
-        row = props.copy()
-
-        # Add ID for convenience if not present
-        row['subject_id'] = doc.id
-
-        rows.append(row)
-        doc_ids.append(doc.id)
-
-    subject_table = pd.DataFrame(rows)
+    # Add ID for convenience if not present
+    subject_table['subject_id'] = doc_ids
     return subject_table, doc_ids
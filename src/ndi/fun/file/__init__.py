@@ -1,3 +1,5 @@
-from .md5 import md5
+from .md5 import md5, md5_many
+from .checksum_cache import ChecksumCache
 from .date_created import date_created
 from .date_updated import date_updated
+from .binary import BinaryReader, open_binary, compare_readers
@@ -0,0 +1,119 @@
+import io
+import os
+
+
+class BinaryReader:
+    """
+    Sequential reads from an open binary document: an
+    ndi.database.binarydoc.BinaryDoc (fread/fseek/ftell) or a file object.
+    """
+
+    def __init__(self, f):
+        """
+        Args:
+            f: The open binary document or file object.
+        """
+        self.f = f
+        self.binarydoc = not hasattr(f, 'read') and hasattr(f, 'fread')
+
+    def read(self, size):
+        """
+        Reads size bytes, or fewer only at the end of the file.
+        """
+        parts = []
+        remaining = size
+        while remaining:
+            if self.binarydoc:
+                data = self.f.fread(remaining, 'uint8', 0)
+                if not isinstance(data, bytes):
+                    data = data.tobytes() if hasattr(data, 'tobytes') else bytes(bytearray(data))
+            else:
+                data = self.f.read(remaining)
+            if not data:
+                break
+            parts.append(data)
+            remaining -= len(data)
+        return b''.join(parts)
+
+    def size(self):
+        """
+        Returns the size of the file, or None if it cannot be told without reading it.
+        """
+        stat = self.stat()
+        if stat is not None:
+            return stat.st_size
+        try:
+            if self.binarydoc:
+                position = self.f.ftell()
+                self.f.fseek(0, 'eof')
+                size = self.f.ftell()
+                self.f.fseek(position, 'bof')
+                return size
+            position = self.f.tell()
+            size = self.f.seek(0, os.SEEK_END)
+            self.f.seek(position)
+            return size
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return None
+
+    def stat(self):
+        """
+        Returns os.fstat of the file if it is a file on disk, otherwise None.
+        """
+        try:
+            return os.fstat(self.f.fileno())
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return None
+
+
+def open_binary(session, doc, filename):
+    """
+    Opens a binary file of a document through the session's database.
+
+    Args:
+        session: An ndi.session object.
+        doc: The document (or document ID).
+        filename (str): The name of the file in the document.
+
+    Returns:
+        The open binary document; close it with session.database_closebinarydoc.
+
+    Raises:
+        OSError: If the database does not provide the file.
+    """
+    f = session.database_openbinarydoc(doc, filename)
+    if f is None:
+        raise OSError('the file is not available')
+    return f
+
+
+def compare_readers(r1, r2, buffer_size, checksum=None):
+    """
+    Compares two BinaryReaders block by block.
+
+    Args:
+        r1, r2 (BinaryReader): The files, positioned at their start.
+        buffer_size (int): The number of bytes read from each file at a time.
+        checksum (optional): A hashlib object, updated with the contents
+            while the files are equal.
+
+    Returns:
+        str: None if the files are identical, otherwise a description of the difference.
+    """
+    size1, size2 = r1.size(), r2.size()
+    if size1 is not None and size2 is not None and size1 != size2:
+        return f"sizes differ ({size1} vs {size2} bytes)."
+
+    offset = 0
+    while True:
+        block1 = r1.read(buffer_size)
+        block2 = r2.read(buffer_size)
+        if block1 != block2:
+            if len(block1) != len(block2) and block1[:len(block2)] == block2[:len(block1)]:
+                return f"sizes differ ({offset + len(block1)} vs {offset + len(block2)} bytes read)."
+            return f"contents differ in the block at byte {offset}."
+        if not block1:
+            return None
+        if checksum is not None:
+            checksum.update(block1)
+        offset += len(block1)
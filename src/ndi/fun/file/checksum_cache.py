@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+import time
+from ndi.util.vlt.file import RACY_NS
+
+class ChecksumCache:
+    """
+    A persistent cache of file checksums.
+
+    An entry is used only while the file keeps the size, modification time
+    (in nanoseconds) and inode it had when it was hashed, so a changed or
+    replaced file is always hashed again. A file modified within RACY_NS of
+    being hashed is not recorded: it could be written again without its
+    modification time changing.
+    """
+
+    def __init__(self, filename):
+        """
+        Initializes a new ChecksumCache object, loading the entries saved in filename.
+
+        Args:
+            filename (str): The JSON file that holds the cache. It is created by save().
+        """
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._modified = False
+        try:
+            with open(filename, 'r') as f:
+                self._entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _key(path):
+        return os.path.abspath(path)
+
+    @staticmethod
+    def _signature(st):
+        return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+    def get(self, path, st=None):
+        """
+        Returns the cached checksum of a file, or None if the file is not
+        cached or has changed since it was hashed.
+
+        Args:
+            path (str): The file.
+            st (os.stat_result, optional): The file's status, if already known.
+        """
+        entry = self._entries.get(self._key(path))
+        if entry is None:
+            return None
+        if st is None:
+            st = os.stat(path)
+        if entry[:3] != self._signature(st):
+            return None
+        return entry[3]
+
+    def put(self, path, checksum, st=None):
+        """
+        Records the checksum of a file with its current size, modification time and inode.
+
+        Nothing is recorded if the file was modified too recently for its
+        modification time to tell a later change apart.
+        """
+        if st is None:
+            st = os.stat(path)
+        if st.st_mtime_ns >= time.time_ns() - RACY_NS:
+            return
+        with self._lock:
+            self._entries[self._key(path)] = self._signature(st) + [checksum]
+            self._modified = True
+
+    def save(self):
+        """
+        Writes the cache to its file if it has new entries.
+        """
+        with self._lock:
+            if not self._modified:
+                return
+            folder = os.path.dirname(os.path.abspath(self.filename))
+            os.makedirs(folder, exist_ok=True)
+            tmp = f"{self.filename}.{os.getpid()}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp, self.filename)
+            self._modified = False
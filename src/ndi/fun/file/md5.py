@@ -1,12 +1,18 @@
 import hashlib
 import os
+from concurrent.futures import ThreadPoolExecutor
+from .checksum_cache import ChecksumCache
 
-def md5(file_path):
+# Files are read in large blocks; hashlib releases the GIL while hashing them
+BUFFER_SIZE = 1 << 20
+
+def md5(file_path, cache=None):
     """
     Calculates the MD5 checksum of a file.
 
     Args:
         file_path (str): The path to the file.
+        cache (ChecksumCache, optional): A checksum cache to consult and update.
 
     Returns:
         str: The 32-character hexadecimal MD5 hash.
@@ -17,8 +23,48 @@ def md5(file_path):
     if not os.path.isfile(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
 
+    st = None
+    if cache is not None:
+        st = os.stat(file_path)
+        checksum = cache.get(file_path, st)
+        if checksum is not None:
+            return checksum
+
     hash_md5 = hashlib.md5()
     with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
+        for chunk in iter(lambda: f.read(BUFFER_SIZE), b""):
             hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+    checksum = hash_md5.hexdigest()
+
+    if cache is not None:
+        cache.put(file_path, checksum, st)
+    return checksum
+
+def md5_many(paths, workers=None, cache=None):
+    """
+    Calculates the MD5 checksums of many files in a pool of threads.
+
+    Args:
+        paths (list of str): The paths to the files.
+        workers (int): The number of threads (default: ThreadPoolExecutor's default).
+        cache (ChecksumCache or str, optional): A checksum cache, or the file of
+            one. Files that have not changed since they were cached are not read;
+            the cache is saved afterwards.
+
+    Returns:
+        list of str: The checksum of each file, in order.
+
+    Raises:
+        FileNotFoundError: If a file does not exist.
+    """
+    paths = list(paths)
+    if isinstance(cache, str):
+        cache = ChecksumCache(cache)
+    try:
+        if len(paths) <= 1 or workers == 1:
+            return [md5(path, cache=cache) for path in paths]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda path: md5(path, cache=cache), paths))
+    finally:
+        if cache is not None:
+            cache.save()
@@ -2,6 +2,18 @@ import os
 import glob
 from ndi.common.path_constants import PathConstants
 
+def calc_search_path():
+    """
+    Returns the directory that find_calc_directories searches: three
+    directories up from the main NDI toolbox location, where calculator
+    toolboxes are installed as sibling directories.
+    """
+    # PathConstants.root_folder() is .../src/ndi
+    # 1. .../src
+    # 2. .../ (repo root)
+    # 3. .../.. (parent of repo root)
+    return os.path.dirname(os.path.dirname(os.path.dirname(PathConstants.root_folder())))
+
 def find_calc_directories():
     """
     Finds all NDI calculator toolbox directories.
@@ -20,12 +32,7 @@ def find_calc_directories():
     d = []
     try:
         # Navigate three directories up from the NDI toolbox directory
-        # PathConstants.root_folder() is .../src/ndi
-        # 1. .../src
-        # 2. .../ (repo root)
-        # 3. .../.. (parent of repo root)
-
-        base_path = os.path.dirname(os.path.dirname(os.path.dirname(PathConstants.root_folder())))
+        base_path = calc_search_path()
 
         if not os.path.isdir(base_path):
             return []
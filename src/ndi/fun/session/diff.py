@@ -1,15 +1,220 @@
-import warnings
-from ndi.fun.doc.diff import diff as doc_diff
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from ndi.fun.doc.diff import diff as doc_diff, BUFFER_SIZE
+from ndi.fun.file import BinaryReader, open_binary, compare_readers
+from ndi.document_hash import content_hash
 from did.query import Query
 
-def diff(session1, session2, verbose=True, recheck_file_report=None):
+_IGNORE_FIELDS = ('base.session_id',)
+MANIFEST_VERSION = 2
+
+class _Properties:
+    # A minimal document for fun.doc.diff in worker processes
+    def __init__(self, document_properties):
+        self.document_properties = document_properties
+
+def _doc_hash(doc):
+    if getattr(type(doc), 'content_hash', None) is not None:
+        return doc.content_hash(_IGNORE_FIELDS)
+    return content_hash(doc.document_properties, _IGNORE_FIELDS)
+
+class _SessionDocuments:
+    """
+    The document IDs, content hashes and properties of one session.
+
+    Databases that keep content hashes (ndi.database.dir.Dir) are read through
+    a snapshot: the session's document IDs are found with a field search, and
+    their hashes are taken from the database instead of being computed, so
+    only the documents that are compared in full are built. Otherwise every
+    document is fetched and hashed.
+    """
+
+    def __init__(self, session):
+        snapshot = None
+        if hasattr(session, 'database_snapshot'):
+            try:
+                snapshot = session.database_snapshot()
+            except (AttributeError, NotImplementedError):
+                snapshot = None
+        everything = Query('base.id', 'regexp', '(.*)')
+        if snapshot is not None and hasattr(snapshot, 'content_hash'):
+            in_session = session.database_search_fields(everything, [], snapshot=snapshot)['base.id']
+            self.hashes = {doc_id: snapshot.content_hash(doc_id) for doc_id in in_session}
+            self.properties = snapshot.read_properties
+        else:
+            docs = session.database_search(everything)
+            doc_map = {d.id(): d for d in docs}
+            self.hashes = {doc_id: _doc_hash(d) for doc_id, d in doc_map.items()}
+            self.properties = lambda doc_id: doc_map[doc_id].document_properties
+
+def _diff_pairs(pairs):
+    """
+    Fully compares (doc_id, properties1, properties2) triples. Runs in worker processes.
+    """
+    mismatches = []
+    for doc_id, props1, props2 in pairs:
+        are_equal, diff_report = doc_diff(_Properties(props1), _Properties(props2),
+                                          ignore_fields=list(_IGNORE_FIELDS), check_file_list=True)
+        if not are_equal:
+            mismatches.append({'id': doc_id, 'mismatch': ' '.join(diff_report['details'])})
+    return mismatches
+
+def _compare(doc_ids, docs1, docs2, workers, chunk_size, verbose):
+    pairs = [(doc_id, docs1.properties(doc_id), docs2.properties(doc_id)) for doc_id in doc_ids]
+    if workers is None or workers <= 1 or len(pairs) <= chunk_size:
+        return _diff_pairs(pairs)
+    mismatches = []
+    chunks = [pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for i, chunk_mismatches in enumerate(pool.map(_diff_pairs, chunks)):
+            mismatches.extend(chunk_mismatches)
+            if verbose:
+                print(f"...examined {min((i + 1) * chunk_size, len(pairs))} documents...")
+    return mismatches
+
+def _file_list(properties):
+    return (properties or {}).get('files', {}).get('file_list', [])
+
+def _signature(reader):
+    # The size and modification time of a file on disk, or None
+    stat = reader.stat()
+    return None if stat is None else [stat.st_size, stat.st_mtime_ns]
+
+def _check_file(session1, session2, doc_id, filename, previous, buffer_size=BUFFER_SIZE):
+    """
+    Compares one pair of binary files, using the manifest entry of the
+    previous diff if there is one.
+
+    Returns:
+        tuple: (difference, entry) The description of the difference (None if
+            the files are identical), and the manifest entry for the pair (None
+            if the files are not files on disk).
+    """
+    f1 = f2 = None
+    try:
+        try:
+            f1 = open_binary(session1, doc_id, filename)
+            f2 = open_binary(session2, doc_id, filename)
+        except Exception as e:
+            return f"could not be opened ({e}).", None
+        r1, r2 = BinaryReader(f1), BinaryReader(f2)
+        sig1, sig2 = _signature(r1), _signature(r2)
+        same1 = previous is not None and sig1 is not None and previous['session1'] == sig1
+        same2 = previous is not None and sig2 is not None and previous['session2'] == sig2
+        try:
+            if same1 and same2:
+                return previous['difference'], previous
+            if (same1 or same2) and previous.get('md5'):
+                # The unchanged file matched the other one before; only the
+                # changed one is read and compared with their checksum
+                changed = r2 if same1 else r1
+                checksum = hashlib.md5()
+                while True:
+                    block = changed.read(buffer_size)
+                    if not block:
+                        break
+                    checksum.update(block)
+                equal = checksum.hexdigest() == previous['md5']
+                difference = None if equal else 'contents differ (the MD5 checksums do not match).'
+                md5 = previous['md5'] if equal else None
+            else:
+                checksum = hashlib.md5()
+                difference = compare_readers(r1, r2, buffer_size, checksum)
+                md5 = checksum.hexdigest() if difference is None else None
+        except OSError as e:
+            return f"could not be read ({e}).", None
+        entry = None
+        if sig1 is not None and sig2 is not None:
+            entry = {'session1': sig1, 'session2': sig2, 'md5': md5, 'difference': difference}
+        return difference, entry
+    finally:
+        if f1 is not None:
+            session1.database_closebinarydoc(f1)
+        if f2 is not None:
+            session2.database_closebinarydoc(f2)
+
+def _file_key(doc_id, filename):
+    return f"{doc_id}/{filename}"
+
+def _compare_files(file_pairs, session1, session2, file_workers, previous_files=None):
+    """
+    Compares (doc_id, filename) pairs that exist in both sessions.
+
+    Returns:
+        tuple: (differences, entries) The report entries of the pairs that
+            differ, and the manifest entries of the pairs, keyed by _file_key.
+    """
+    previous_files = previous_files or {}
+    check = lambda pair: _check_file(session1, session2, pair[0], pair[1], previous_files.get(_file_key(*pair)))
+    if len(file_pairs) <= 1 or file_workers == 1:
+        results = [check(pair) for pair in file_pairs]
+    else:
+        with ThreadPoolExecutor(max_workers=file_workers) as pool:
+            results = list(pool.map(check, file_pairs))
+    differences = [{'id': doc_id, 'filename': filename, 'difference': difference}
+                   for (doc_id, filename), (difference, _) in zip(file_pairs, results) if difference is not None]
+    entries = {_file_key(*pair): entry for pair, (_, entry) in zip(file_pairs, results) if entry is not None}
+    return differences, entries
+
+def read_manifest(manifest_path):
+    """
+    Reads a diff manifest written by diff, or returns None if there is none.
+    """
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+def _write_manifest(manifest_path, manifest):
+    folder = os.path.dirname(os.path.abspath(manifest_path))
+    os.makedirs(folder, exist_ok=True)
+    tmp = manifest_path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, manifest_path)
+
+def diff(session1, session2, verbose=True, recheck_file_report=None, workers=None, chunk_size=500, manifest_path=None,
+         check_files=False, file_workers=None):
     """
     Compares two NDI sessions.
 
+    The canonical content hash of every document (see ndi.document_hash) is
+    compared first; only the common documents whose hashes differ are compared
+    in full, optionally in a pool of worker processes.
+
+    With manifest_path, the content hashes of both sessions and the result for
+    each mismatched document are saved after the comparison. The next diff of
+    the same pair re-examines only documents that were added, removed or
+    modified since then; results for unchanged documents are taken from the
+    manifest, which is then updated. With check_files, the manifest also
+    keeps the size, modification time and MD5 checksum of each pair of
+    binary files: a pair whose files have not changed is not read again,
+    and if only one of them has changed, only that one is read and compared
+    with the checksum.
+
     Args:
         session1, session2: ndi.session objects.
         verbose (bool): Print progress.
-        recheck_file_report (dict): Previous report to recheck specific files.
+        recheck_file_report (dict): A previous report. Only the documents it
+            lists as mismatched, and (with check_files) the files it lists as
+            different, are compared again; the lists of documents found in only
+            one session are kept.
+        workers (int): If greater than 1, the number of worker processes used for
+            the full comparisons.
+        chunk_size (int): The number of document pairs sent to a worker at a time.
+        manifest_path (str): A JSON file that holds the state of the previous
+            diff of this pair of sessions.
+        check_files (bool): Also compare the binary files of the common
+            documents, through the sessions' binary-doc API. File pairs are
+            compared in a pool of file_workers threads; see
+            ndi.fun.doc.diff.compare_binary_file.
+        file_workers (int): The number of threads that compare binary files.
 
     Returns:
         dict: A report structure detailing differences.
@@ -21,49 +226,82 @@ def diff(session1, session2, verbose=True, recheck_file_report=None):
         'fileDifferences': []
     }
 
+    docs1 = _SessionDocuments(session1)
+    docs2 = _SessionDocuments(session2)
+
     if recheck_file_report:
-        # Recheck logic not fully implemented in this port step
         if verbose:
-            print("Re-checking file differences... (Not fully implemented)")
+            print("Re-checking the documents listed in the previous report...")
+        report['documentsInAOnly'] = set(recheck_file_report.get('documentsInAOnly', set()))
+        report['documentsInBOnly'] = set(recheck_file_report.get('documentsInBOnly', set()))
+        listed = {m['id'] for m in recheck_file_report.get('mismatchedDocuments', [])}
+        listed.update(f['id'] for f in recheck_file_report.get('fileDifferences', []) if 'id' in f)
+        recheck = sorted(i for i in listed if i in docs1.hashes and i in docs2.hashes)
+        report['mismatchedDocuments'] = _compare(recheck, docs1, docs2, workers, chunk_size, verbose)
+        if check_files:
+            file_pairs = [(f['id'], f['filename']) for f in recheck_file_report.get('fileDifferences', [])
+                          if f.get('id') in docs1.hashes and f.get('id') in docs2.hashes]
+            report['fileDifferences'], _ = _compare_files(file_pairs, session1, session2, file_workers)
         return report
 
-    # Fetch all documents
-    q = Query('base.id', 'regexp', '(.*)')
-    d1_docs = session1.database_search(q)
-    d2_docs = session2.database_search(q)
-
-    d1_map = {d.id: d for d in d1_docs}
-    d2_map = {d.id: d for d in d2_docs}
-
-    d1_ids = set(d1_map.keys())
-    d2_ids = set(d2_map.keys())
+    d1_ids = set(docs1.hashes)
+    d2_ids = set(docs2.hashes)
 
     report['documentsInAOnly'] = d1_ids - d2_ids
     report['documentsInBOnly'] = d2_ids - d1_ids
 
-    common_ids = d1_ids.intersection(d2_ids)
+    common_ids = sorted(d1_ids.intersection(d2_ids))
 
     if verbose:
         print(f"Found {len(d1_ids)} docs in session1 and {len(d2_ids)} docs in session2.")
         print(f"Comparing {len(common_ids)} common documents...")
 
-    for i, doc_id in enumerate(common_ids):
-        if verbose and (i + 1) % 500 == 0:
-            print(f"...examined {i + 1} documents...")
+    # Identical hashes mean identical documents; only the rest are diffed in full
+    changed = [doc_id for doc_id in common_ids if docs1.hashes[doc_id] != docs2.hashes[doc_id]]
 
-        doc1 = d1_map[doc_id]
-        doc2 = d2_map[doc_id]
+    # Documents whose hashes match the previous manifest keep their previous result
+    previous = read_manifest(manifest_path) if manifest_path else None
+    reused = {}
+    if previous is not None:
+        prev1, prev2 = previous['session1'], previous['session2']
+        prev_mismatches = previous['mismatches']
+        for doc_id in changed:
+            if doc_id in prev_mismatches and prev1.get(doc_id) == docs1.hashes[doc_id] \
+                    and prev2.get(doc_id) == docs2.hashes[doc_id]:
+                reused[doc_id] = prev_mismatches[doc_id]
 
-        are_equal, diff_report = doc_diff(doc1, doc2, ignore_fields=['base.session_id'], check_file_list=True)
+    to_compare = [doc_id for doc_id in changed if doc_id not in reused]
+    if verbose:
+        print(f"{len(changed)} common documents have different content hashes; "
+              f"{len(to_compare)} need a full comparison.")
 
-        if not are_equal:
-            report['mismatchedDocuments'].append({
-                'id': doc_id,
-                'mismatch': ' '.join(diff_report['details'])
-            })
-
-        # File comparison logic
-        # Note: opening binary docs requires valid file paths and implementation in session/database
-        # Simplified for now
+    mismatches = {m['id']: m['mismatch'] for m in _compare(to_compare, docs1, docs2, workers, chunk_size, verbose)}
+    mismatches.update(reused)
+    report['mismatchedDocuments'] = [{'id': doc_id, 'mismatch': mismatches[doc_id]}
+                                     for doc_id in changed if doc_id in mismatches]
+
+    if check_files:
+        changed_ids = set(changed)
+        file_pairs = []
+        for doc_id in common_ids:
+            names = _file_list(docs1.properties(doc_id))
+            if doc_id in changed_ids:
+                names = sorted(set(names).intersection(_file_list(docs2.properties(doc_id))))
+            file_pairs.extend((doc_id, name) for name in names)
+        if verbose:
+            print(f"Comparing {len(file_pairs)} binary files...")
+        report['fileDifferences'], files = _compare_files(
+            file_pairs, session1, session2, file_workers, previous['files'] if previous is not None else None)
+    else:
+        files = previous['files'] if previous is not None else {}
+
+    if manifest_path:
+        _write_manifest(manifest_path, {
+            'version': MANIFEST_VERSION,
+            'session1': docs1.hashes,
+            'session2': docs2.hashes,
+            'mismatches': mismatches,
+            'files': files,
+        })
 
     return report
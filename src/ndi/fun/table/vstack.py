@@ -1,16 +1,133 @@
+import numpy as np
 import pandas as pd
 
-def vstack(tables):
+def vstack(tables, memory_efficient=False, categorical=False):
     """
     Vertically stack tables (DataFrames), aligning columns.
 
     Args:
-        tables (list of pd.DataFrame): List of tables to stack.
+        tables (list or iterable of pd.DataFrame): The tables to stack.
+        memory_efficient (bool): Stack column by column into preallocated
+            arrays of the union schema instead of calling pd.concat. tables
+            may then be a generator: each table is reduced to its column data
+            as it arrives and can be freed, so peak memory stays close to the
+            size of the output.
+        categorical (bool): With memory_efficient, store string columns as
+            pandas categoricals; repeated strings are kept once while stacking.
 
     Returns:
         pd.DataFrame: Stacked table.
     """
-    if not tables:
+    if not memory_efficient:
+        tables = list(tables)
+        if not tables:
+            return pd.DataFrame()
+        return pd.concat(tables, ignore_index=True)
+
+    # Tables in a list stay alive anyway, so their columns can be referenced
+    # without copying; tables from a generator are copied so that they can be freed
+    copy = not isinstance(tables, (list, tuple))
+
+    columns = {}
+    n = 0
+    for table in tables:
+        for name in table.columns:
+            column = columns.get(name)
+            if column is None:
+                column = columns[name] = _Column(categorical)
+            column.add(n, table[name], copy)
+        n += len(table)
+        del table
+
+    if not columns and n == 0:
         return pd.DataFrame()
+    data = {}
+    for name in list(columns):
+        data[name] = columns.pop(name).assemble(n)
+    return pd.DataFrame(data, index=pd.RangeIndex(n))
+
+class _Column:
+    """
+    The pieces of one output column, collected from each input table.
+    """
+
+    def __init__(self, categorical):
+        self.categorical = categorical
+        self.chunks = []  # (start row, values, values are category codes)
+        self.categories = {}
+        self.strings_only = True
+
+    def add(self, start, series, copy):
+        if isinstance(series.dtype, np.dtype) and series.dtype != object:
+            values = series.to_numpy(copy=copy)
+            self.strings_only = False
+        else:
+            values = series.to_numpy(dtype=object)
+            if self.strings_only and not all(isinstance(v, str) for v in values if not _is_missing(v)):
+                self.strings_only = False
+        if self.categorical and self.strings_only:
+            self.chunks.append((start, self._encode(values), True))
+        else:
+            self.chunks.append((start, values, False))
 
-    return pd.concat(tables, ignore_index=True)
+    def _encode(self, values):
+        # Each distinct string is kept once; the chunk holds integer codes
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, v in enumerate(values):
+            if _is_missing(v):
+                codes[i] = -1
+            else:
+                code = self.categories.get(v)
+                if code is None:
+                    code = self.categories[v] = len(self.categories)
+                codes[i] = code
+        return codes
+
+    def assemble(self, n):
+        if self.categorical and self.strings_only:
+            codes = np.full(n, -1, dtype=np.int32)
+            while self.chunks:
+                start, values, _ = self.chunks.pop()
+                codes[start:start + len(values)] = values
+            return pd.Categorical.from_codes(codes, categories=list(self.categories))
+
+        if self.categories:
+            # The column turned out not to hold only strings
+            lookup = np.array(list(self.categories) + [np.nan], dtype=object)
+            self.chunks = [(start, lookup[values] if encoded else values, False)
+                           for start, values, encoded in self.chunks]
+
+        covered = sum(len(values) for _, values, _ in self.chunks)
+        dtype = _result_dtype([values.dtype for _, values, _ in self.chunks], covered < n)
+        if dtype.kind in 'Mm':
+            out = np.full(n, np.datetime64('NaT') if dtype.kind == 'M' else np.timedelta64('NaT'), dtype=dtype)
+        elif dtype.kind == 'f' or dtype == object:
+            out = np.full(n, np.nan, dtype=dtype)
+        else:
+            out = np.empty(n, dtype=dtype)
+        while self.chunks:
+            start, values, _ = self.chunks.pop()
+            out[start:start + len(values)] = values
+        return out
+
+def _is_missing(v):
+    return v is None or (isinstance(v, float) and v != v)
+
+def _result_dtype(dtypes, has_missing):
+    """
+    The dtype that holds every chunk, following pd.concat: integers become
+    floats when values are missing, and mixed kinds become object.
+    """
+    if not dtypes:
+        return np.dtype(object)
+    kinds = {d.kind for d in dtypes}
+    if kinds <= {'i', 'u', 'f'}:
+        dtype = np.result_type(*dtypes)
+        if has_missing and dtype.kind in 'iu':
+            dtype = np.dtype(np.float64)
+        return dtype
+    if len(set(dtypes)) == 1 and kinds <= {'M', 'm'}:
+        return dtypes[0]
+    if kinds == {'b'} and not has_missing:
+        return dtypes[0]
+    return np.dtype(object)
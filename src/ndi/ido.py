@@ -1,9 +1,94 @@
 import uuid
 import abc
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class _TimeOrderedGenerator:
+    """
+    Generates UUIDv7-style identifiers that sort in creation order.
+
+    Each ID holds the Unix time in milliseconds (48 bits), the version and
+    variant bits, a 12-bit counter and 62 random bits. Within one millisecond
+    the counter is incremented, so IDs from one process are strictly increasing;
+    if the counter overflows, the timestamp is advanced by a millisecond.
+    """
 
-class Ido(abc.ABC):
     def __init__(self):
-        self._id = str(uuid.uuid4())
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._counter = 0
+
+    def _next(self):
+        ms = time.time_ns() // 1_000_000
+        if ms > self._last_ms:
+            self._last_ms = ms
+            # Start low in the counter range to leave room for increments
+            self._counter = int.from_bytes(os.urandom(2), 'big') & 0x7FF
+        else:
+            self._counter += 1
+            if self._counter > 0xFFF:
+                self._last_ms += 1
+                self._counter = 0
+        rand = int.from_bytes(os.urandom(8), 'big') & ((1 << 62) - 1)
+        value = (self._last_ms << 80) | (0x7 << 76) | (self._counter << 64) | (0b10 << 62) | rand
+        return str(uuid.UUID(int=value))
+
+    def ids(self, n):
+        with self._lock:
+            return [self._next() for _ in range(n)]
+
+
+_time_ordered_generator = _TimeOrderedGenerator()
+
+
+class Ido(abc.ABC):
+    # Set to True to give new objects (and documents) time-ordered IDs by default
+    time_ordered = False
+
+    def __init__(self, time_ordered=None):
+        if time_ordered is None:
+            time_ordered = Ido.time_ordered
+        self._id = Ido.ids(1, time_ordered=time_ordered)[0]
 
     def id(self):
         return self._id
+
+    @staticmethod
+    def ids(n, time_ordered=None):
+        """
+        Generates n new unique identifiers.
+
+        Args:
+            n (int): The number of identifiers.
+            time_ordered (bool, optional): Generate UUIDv7-style identifiers that
+                sort in creation order (see id_time). Defaults to Ido.time_ordered;
+                otherwise random (version 4) UUIDs are generated.
+
+        Returns:
+            list of str: The identifiers.
+        """
+        if time_ordered is None:
+            time_ordered = Ido.time_ordered
+        if time_ordered:
+            return _time_ordered_generator.ids(n)
+        return [str(uuid.uuid4()) for _ in range(n)]
+
+    @staticmethod
+    def id_time(identifier):
+        """
+        Returns the creation time of a time-ordered identifier.
+
+        Returns:
+            datetime: The UTC creation time (millisecond resolution), or None if
+                the identifier is not time-ordered.
+        """
+        try:
+            u = uuid.UUID(identifier)
+        except (ValueError, TypeError, AttributeError):
+            return None
+        if u.version != 7:
+            return None
+        return datetime.fromtimestamp((u.int >> 80) / 1000, tz=timezone.utc)
@@ -53,21 +53,174 @@ class Session:
 
     def database_add(self, document):
         """
-        Adds a document to the session's database.
+        Adds a document (or a list of documents) to the session's database.
+
+        Documents without a session_id are assigned to this session.
         """
-        raise NotImplementedError("This method is not yet implemented.")
+        if not isinstance(document, list):
+            document = [document]
+
+        for doc in document:
+            if not doc.document_properties['base'].get('session_id'):
+                doc.set_session_id(self.id())
+
+        if hasattr(self.database, 'transaction'):
+            with self.database.transaction():
+                for doc in document:
+                    self.database.add(doc)
+        else:
+            for doc in document:
+                self.database.add(doc)
 
     def database_rm(self, doc_unique_id, **kwargs):
         """
-        Removes a document from the session's database.
+        Removes a document (or a list of documents or IDs) from the session's database.
         """
-        raise NotImplementedError("This method is not yet implemented.")
+        self.database.remove(doc_unique_id)
 
-    def database_search(self, searchparameters):
+    def database_search(self, searchparameters, snapshot=None):
         """
         Searches for documents in the session's database.
+
+        Args:
+            searchparameters: An ndi.query.Query object.
+            snapshot (optional): A snapshot returned by database_snapshot(). If
+                given, the search sees the database as it was when the snapshot
+                was taken; otherwise the latest committed state is searched.
+        """
+        from ..query import Query
+        in_session = Query('base.session_id', 'exact_string', self.id(), '')
+        searchparameters = searchparameters & in_session
+        if snapshot is not None:
+            return snapshot.search(searchparameters)
+        return self.database.search(searchparameters)
+
+    def database_search_fields(self, searchparameters, fields, snapshot=None):
         """
-        raise NotImplementedError("This method is not yet implemented.")
+        Searches the session's database and returns only selected fields of the
+        matches, as columns (see ndi.database.Database.search_fields).
+
+        Args:
+            searchparameters: An ndi.query.Query object.
+            fields (list of str): Dotted field names, e.g. ['element.name'].
+            snapshot (optional): A snapshot returned by database_snapshot().
+
+        Returns:
+            dict: 'base.id' and each field, mapped to a list of values.
+        """
+        from ..query import Query
+        in_session = Query('base.session_id', 'exact_string', self.id(), '')
+        searchparameters = searchparameters & in_session
+        source = snapshot if snapshot is not None else self.database
+        return source.search_fields(searchparameters, fields)
+
+    def database_find_fuids(self, fuids, snapshot=None):
+        """
+        Finds the documents of this session that hold the given file UIDs.
+
+        The database's file UID index is probed; documents are not scanned.
+
+        Args:
+            fuids (list of str): File unique identifiers.
+            snapshot (optional): A snapshot returned by database_snapshot().
+
+        Returns:
+            dict: file UID -> (document, filename) for each UID that was found.
+        """
+        source = snapshot if snapshot is not None else self.database
+        docs = {}
+        found = {}
+        for fuid, holders in source.find_fuids(fuids).items():
+            # Other sessions' documents may hold the same file
+            for doc_id, filename in holders:
+                if doc_id not in docs:
+                    docs[doc_id] = source.read(doc_id)
+                doc = docs[doc_id]
+                if doc is not None and doc.document_properties['base'].get('session_id') == self.id():
+                    found[fuid] = (doc, filename)
+                    break
+        return found
+
+    def validate_documents(self, document, workers=None):
+        """
+        Checks that documents are valid for adding to this session.
+
+        Each document must belong to this session (or to no session yet) and
+        must satisfy the schemas of its class and superclasses. The problems
+        found in each document are returned by validation_failures.
+
+        Args:
+            document: An ndi.document or a list of them.
+            workers (int, optional): If greater than 1, check the schemas in this
+                many worker processes.
+
+        Returns:
+            tuple: (b, errmsg), where b is True if every document is valid and
+                errmsg summarizes the problems.
+        """
+        if not isinstance(document, list):
+            document = [document]
+        for doc in document:
+            if not hasattr(doc, 'document_properties'):
+                return False, 'All entries of DOCUMENT must be ndi.document objects.'
+
+        failures = self.validation_failures(document, workers=workers)
+        if not failures:
+            return True, ''
+        return False, f"{len(failures)} of {len(document)} documents are not valid."
+
+    def validation_failures(self, document, workers=None):
+        """
+        Returns the problems that keep documents from being added to this session.
+
+        Args:
+            document: An ndi.document or a list of them.
+            workers (int, optional): If greater than 1, check the schemas in this
+                many worker processes.
+
+        Returns:
+            dict: The problems found (a list of str), keyed by document ID.
+                Valid documents are omitted.
+        """
+        from ..validate import validate_documents
+        if not isinstance(document, list):
+            document = [document]
+
+        failures = validate_documents(document, workers=workers)
+        for doc in document:
+            session_id = doc.document_properties.get('base', {}).get('session_id')
+            if session_id and session_id != self.id():
+                doc_id = doc.document_properties['base'].get('id')
+                failures.setdefault(doc_id, []).append(
+                    f"base.session_id '{session_id}' does not match this session ('{self.id()}').")
+        return failures
+
+    def database_openbinarydoc(self, ndi_document_or_id, filename):
+        """
+        Opens a binary file of a document for reading.
+        """
+        return self.database.openbinarydoc(ndi_document_or_id, filename)
+
+    def database_existbinarydoc(self, ndi_document_or_id, filename):
+        """
+        Checks whether a document has the named binary file.
+        """
+        return self.database.existbinarydoc(ndi_document_or_id, filename)
+
+    def database_closebinarydoc(self, ndi_binarydoc_obj):
+        """
+        Closes a binary file opened with database_openbinarydoc.
+        """
+        return self.database.closebinarydoc(ndi_binarydoc_obj)
+
+    def database_snapshot(self):
+        """
+        Returns a consistent, point-in-time view of the session's database.
+
+        Several searches made with the same snapshot see the same state, even
+        while another thread or process keeps writing to the database.
+        """
+        return self.database.snapshot()
 
     def getpath(self):
         """
@@ -1,4 +1,43 @@
+import os
+import threading
+import time
 from . import Session
+from ..database.dir import Dir as DirDatabase
+
+def _shared_reference(filename, identifier):
+    """
+    Returns the unique reference stored in filename, storing identifier there
+    first if the file does not exist yet.
+
+    The file is written under a temporary name and linked into place, so a
+    concurrent opener never sees it empty.
+    """
+    tmp = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(identifier)
+    try:
+        os.link(tmp, filename)
+        return identifier
+    except FileExistsError:
+        pass
+    except OSError:
+        # The file system has no hard links
+        try:
+            with open(filename, 'x') as f:
+                f.write(identifier)
+            return identifier
+        except FileExistsError:
+            pass
+    finally:
+        os.remove(tmp)
+    # Without hard links, another opener may still be writing the file
+    for _ in range(100):
+        with open(filename, 'r') as f:
+            stored = f.read().strip()
+        if stored:
+            return stored
+        time.sleep(0.01)
+    raise RuntimeError(f"{filename} is empty.")
 
 class Dir(Session):
     """
@@ -18,8 +57,15 @@ class Dir(Session):
 
         super().__init__(reference)
         self.path = path_name
-        # In a full implementation, we would initialize the database here.
-        # self.database = SomeDatabaseClass(self.path)
+
+        ndi_dir = os.path.join(self.path, '.ndi')
+        if os.path.isdir(self.path):
+            # The unique reference is stored so that every process that opens
+            # this directory sees the same session
+            os.makedirs(ndi_dir, exist_ok=True)
+            self.identifier = _shared_reference(os.path.join(ndi_dir, 'unique_reference.txt'), self.identifier)
+
+        self.database = DirDatabase(os.path.join(ndi_dir, 'database'), self.identifier, content_hashes=True)
 
     def getpath(self):
         """
@@ -0,0 +1,95 @@
+"""
+Copy-on-write helpers for document properties.
+
+The functions here derive new document_properties from existing ones by path
+copying: only the dicts on the path to a changed field are copied, and every
+other subtree is shared with the original. Deriving a view therefore costs
+memory proportional to the depth of the changed fields, not the size of the
+document. Shared subtrees must be treated as read-only; change a derived view
+with with_fields() rather than in place.
+"""
+
+_MISSING = object()
+
+
+def get_field(properties, field, default=None):
+    """
+    Returns the value of a dotted field (e.g. 'base.session_id'), or default if it is absent.
+    """
+    value = properties
+    for part in field.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return default
+        value = value[part]
+    return value
+
+
+def _own(d, copied):
+    if id(d) in copied:
+        return d
+    new = dict(d)
+    copied.add(id(new))
+    return new
+
+
+def _remove(d, parts, copied):
+    key = parts[0]
+    if not isinstance(d, dict) or key not in d:
+        return d
+    if len(parts) == 1:
+        new = _own(d, copied)
+        del new[key]
+        return new
+    child = d[key]
+    new_child = _remove(child, parts[1:], copied)
+    if new_child is child:
+        return d
+    new = _own(d, copied)
+    new[key] = new_child
+    return new
+
+
+def _set(d, parts, value, copied):
+    new = _own(d, copied)
+    key = parts[0]
+    if len(parts) == 1:
+        new[key] = value
+    else:
+        child = d.get(key)
+        new[key] = _set(child if isinstance(child, dict) else {}, parts[1:], value, copied)
+    return new
+
+
+def without_fields(properties, fields):
+    """
+    Returns a view of properties without the given fields.
+
+    Args:
+        properties (dict): The document properties.
+        fields (list of str): Dotted field names, e.g. ['base.session_id', 'files'].
+
+    Returns:
+        dict: The view (properties itself if none of the fields are present).
+    """
+    copied = set()
+    for field in fields:
+        properties = _remove(properties, field.split('.'), copied)
+    return properties
+
+
+def with_fields(properties, updates):
+    """
+    Returns a view of properties with the given fields set.
+
+    Args:
+        properties (dict): The document properties.
+        updates (dict): New values keyed by dotted field name; missing
+            intermediate dicts are created.
+
+    Returns:
+        dict: The view.
+    """
+    copied = set()
+    for field, value in updates.items():
+        properties = _set(properties, field.split('.'), value, copied)
+    return properties
@@ -0,0 +1,78 @@
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    An advisory, cross-process lock backed by a lock file.
+
+    The lock is exclusive between processes and between separate FileLock
+    objects in the same process. It is released when the holding process exits.
+
+    Example:
+        with FileLock('/path/to/LOCK'):
+            ...  # critical section
+    """
+
+    def __init__(self, path, timeout=None, poll_interval=0.01):
+        """
+        Initializes a new FileLock object.
+
+        Args:
+            path (str): The lock file; created if it does not exist.
+            timeout (float, optional): Seconds to wait in acquire() before raising
+                TimeoutError. None waits forever.
+            poll_interval (float): Seconds between attempts while waiting.
+        """
+        self.path = path
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fd = None
+
+    def acquire(self):
+        if self._fd is not None:
+            raise RuntimeError(f"Lock {self.path} is already held by this object.")
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    os.close(fd)
+                    raise TimeoutError(f"Could not acquire lock {self.path} within {self.timeout} seconds.")
+                time.sleep(self.poll_interval)
+        self._fd = fd
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def locked(self):
+        return self._fd is not None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
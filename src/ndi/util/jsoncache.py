@@ -0,0 +1,43 @@
+import json
+import os
+import threading
+
+
+class JSONFileCache:
+    """
+    A cache of parsed JSON files that re-reads a file when it changes on disk.
+
+    A file is considered changed when its modification time or size differs
+    from when it was parsed. The returned objects are shared between callers
+    and must not be modified.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def load(self, path):
+        """
+        Returns the parsed contents of a JSON file.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+        """
+        st = os.stat(path)
+        signature = (st.st_mtime_ns, st.st_size)
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        with self._lock:
+            self._entries[path] = (signature, data)
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide cache of NDI definition and schema files
+json_file_cache = JSONFileCache()
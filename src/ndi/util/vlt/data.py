@@ -51,13 +51,93 @@ def structmerge(s1, s2):
     """
     return {**s1, **s2}
 
-def flattenstruct2table(s):
+def flattenstruct2table(s, infer_dtypes=True, categorical=False):
     """
-    Flattens a dictionary to a table-like structure.
+    Flattens a dictionary, or a list of dictionaries, to a table.
+
+    Each dictionary becomes one row. Nested dictionaries become dotted
+    columns (e.g. 'element.name'). A field holding a list of dictionaries
+    becomes one column per subfield (e.g. 'epochs.t0'), and each cell holds
+    the list of that subfield's values. All rows are flattened in a single
+    pass into per-column lists, and the table is built once at the end.
+
+    :param s: A dictionary or a list of dictionaries.
+    :param infer_dtypes: If True, columns get numeric/boolean dtypes where the
+        values allow; otherwise every column has dtype object.
+    :param categorical: If True, string columns with many repeated values are
+        converted to the pandas 'category' dtype.
+    :return: A pandas DataFrame with one row per dictionary.
+    """
+    import pandas as pd
+
+    if isinstance(s, dict):
+        s = [s]
+
+    columns = {}
+    n = 0
+    for row in s:
+        items = []
+        _flatten_struct('', row, items)
+        for name, value in items:
+            col = columns.get(name)
+            if col is None:
+                col = columns[name] = [None] * n
+            elif len(col) < n:
+                col.extend([None] * (n - len(col)))
+            col.append(value)
+        n += 1
+    for col in columns.values():
+        if len(col) < n:
+            col.extend([None] * (n - len(col)))
+
+    if infer_dtypes:
+        table = pd.DataFrame(columns, index=pd.RangeIndex(n))
+    else:
+        table = pd.DataFrame(columns, index=pd.RangeIndex(n), dtype=object)
+    if categorical:
+        table = _categorize_strings(table)
+    return table
+
+def _flatten_struct(prefix, d, out):
+    """
+    Appends (dotted name, value) pairs for the leaves of dictionary d to out.
+    """
+    for key, value in d.items():
+        name = prefix + str(key)
+        if isinstance(value, dict):
+            if value:
+                _flatten_struct(name + '.', value, out)
+            else:
+                out.append((name, None))
+        elif isinstance(value, list) and value and all(isinstance(v, dict) for v in value):
+            subfields = {}
+            for i, element in enumerate(value):
+                element_items = []
+                _flatten_struct('', element, element_items)
+                for subname, subvalue in element_items:
+                    subfields.setdefault(subname, [None] * len(value))[i] = subvalue
+            for subname, subvalues in subfields.items():
+                out.append((name + '.' + subname, subvalues))
+        else:
+            out.append((name, value))
+
+def _categorize_strings(table, max_unique_fraction=0.5):
     """
-    # This is a simplified implementation. A more robust version
-    # would handle nested dictionaries and lists of dictionaries.
-    return s
+    Converts object columns that hold only strings (or missing values) and
+    repeat them often to the 'category' dtype.
+    """
+    import pandas as pd
+
+    for name in table.columns:
+        col = table[name]
+        if len(col) == 0 or not (col.dtype == object or pd.api.types.is_string_dtype(col.dtype)):
+            continue
+        values = col.dropna()
+        if len(values) == 0 or not all(isinstance(v, str) for v in values):
+            continue
+        if values.nunique() <= max_unique_fraction * len(col):
+            table[name] = col.astype('category')
+    return table
 
 import hashlib
 import json
@@ -1,6 +1,10 @@
 import os
 import re
-from .string import strcmp_substitution
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Characters with a special meaning in a regular expression
+_METACHARACTERS = frozenset('.^$*+?{}[]\\|()')
 
 def dirstrip(ds):
     """
@@ -8,74 +12,301 @@ def dirstrip(ds):
     """
     return [d for d in ds if d.name not in ['.', '..', '.DS_Store', '.git']]
 
-def findfilegroups(parentdir, fileparameters, **kwargs):
+def _literal(fragment):
     """
-    Finds groups of files based on parameters.
+    Returns the string a regular expression fragment matches if it is a plain
+    literal, or None if it is not.
+
+    Only ordinary characters and escaped punctuation (such as '\\.') are
+    literal. Anything else, including groups and inline flags such as
+    '(?i)', makes the fragment a regular expression.
     """
-    search_depth = kwargs.get('SearchDepth', float('inf'))
-    search_parent_first = kwargs.get('SearchParentFirst', True)
-    search_parent = kwargs.get('SearchParent', True)
+    chars = []
+    i = 0
+    while i < len(fragment):
+        c = fragment[i]
+        if c == '\\':
+            # Escaped letters and digits are classes, anchors or backreferences
+            if i + 1 == len(fragment) or fragment[i + 1].isalnum():
+                return None
+            chars.append(fragment[i + 1])
+            i += 2
+        elif c in _METACHARACTERS:
+            return None
+        else:
+            chars.append(c)
+            i += 1
+    return ''.join(chars)
 
-    filelist = []
+class _FileParameter:
+    """
+    One compiled file parameter of findfilegroups (see strcmp_substitution).
+    """
 
-    if search_depth < 0:
-        return filelist
+    def __init__(self, pattern, symbol, use_substitute_string):
+        self.pattern = pattern
+        self.symbol = symbol
+        self.substitutes = use_substitute_string and symbol in pattern
+        if self.substitutes:
+            self.search = re.compile(pattern.replace(symbol, '(.+)'))
+            literals = [_literal(part) for part in pattern.split(symbol)]
+            # With literal text around the symbol, the substituted string of a
+            # matching name is determined by its length, so names can be indexed by it
+            self.parts = literals if all(p is not None for p in literals) else None
+            self._filled = {}
+        else:
+            self.regex = re.compile(pattern)
+
+    def search_matches(self, names):
+        """
+        Returns (name, substitute string) for each matching name, as the first parameter.
+        """
+        if self.substitutes:
+            matches = ((name, self.search.fullmatch(name)) for name in names)
+            return [(name, m.group(1)) for name, m in matches if m]
+        return [(name, '') for name in names if self.regex.fullmatch(name)]
 
+    def index(self, names):
+        """
+        Returns the lookup of matching names for a directory listing: either a
+        list (every group matches the same names) or a dict from substitute
+        string to names.
+        """
+        if not self.substitutes:
+            return [name for name in names if self.regex.fullmatch(name)]
+        if self.parts is None:
+            return None
+        n = len(self.parts) - 1
+        fixed = sum(len(p) for p in self.parts)
+        first = self.parts[0]
+        index = {}
+        for name in names:
+            extra = len(name) - fixed
+            if extra < 0 or extra % n or not name.startswith(first):
+                continue
+            value = name[len(first):len(first) + extra // n]
+            if value.join(self.parts) == name:
+                index.setdefault(value, []).append(name)
+        return index
+
+    def matches(self, index, names, value):
+        """
+        Returns the names that match with the substitute string value.
+        """
+        if isinstance(index, list):
+            return index
+        if index is not None:
+            return index.get(value, [])
+        filled = self._filled.get(value)
+        if filled is None:
+            filled = self._filled[value] = re.compile(self.pattern.replace(self.symbol, re.escape(value)))
+        return [name for name in names if filled.fullmatch(name)]
+
+class FileGroupMatcher:
+    """
+    Finds the groups of files in a directory listing that match a set of file
+    parameters (see findfilegroups).
+
+    Each parameter is compiled once. The names matching each later parameter
+    are indexed by their substitute string, so groups are joined with dict
+    lookups instead of a regular expression match per group and file.
+    """
+
+    def __init__(self, fileparameters, **kwargs):
+        symbol = kwargs.get('SubstituteStringSymbol', '#')
+        use_substitute_string = kwargs.get('UseSubstituteString', True)
+        self.parameters = [_FileParameter(p, symbol, use_substitute_string) for p in fileparameters]
+
+    def match(self, parentdir, names):
+        """
+        Returns the groups of files in parentdir, as lists of full paths.
+
+        Args:
+            parentdir (str): The directory.
+            names (list of str): The names of the regular files in parentdir.
+        """
+        if not self.parameters:
+            return []
+        groups = [(value, [name]) for name, value in self.parameters[0].search_matches(names)]
+        for parameter in self.parameters[1:]:
+            if not groups:
+                break
+            index = parameter.index(names)
+            groups = [(value, filelist + [name])
+                      for value, filelist in groups
+                      for name in parameter.matches(index, names, value)]
+        return [[os.path.join(parentdir, name) for name in filelist] for _, filelist in groups]
+
+def _scan(directory):
+    """
+    Returns the (subdirectories, regular files) of a directory, each sorted by
+    name as Matlab's dir lists them, or None if it does not exist.
+    """
     subdirs = []
     regularfiles = []
     try:
-        with os.scandir(parentdir) as it:
+        with os.scandir(directory) as it:
             for entry in it:
                 if entry.is_dir():
                     subdirs.append(entry.name)
                 else:
                     regularfiles.append(entry.name)
     except FileNotFoundError:
-        return filelist
+        return None
+    return sorted(subdirs), sorted(regularfiles)
+
+def _lister(matcher):
+    # Returns visit(directory, match) -> (subdirectories, groups), or None if
+    # the directory does not exist
+    def visit(directory, match):
+        scanned = _scan(directory)
+        if scanned is None:
+            return None
+        subdirs, regularfiles = scanned
+        return subdirs, matcher.match(directory, regularfiles) if match else []
+    return visit
+
+def _walk(parentdir, search_depth, visit, search_parent, search_parent_first, exclude=()):
+    # Iterative depth-first search; each directory's groups come before
+    # (search_parent_first) or after those of its subdirectories. search_parent
+    # applies to parentdir only; subdirectories are always searched.
+    filelist = []
+    stack = [(parentdir, search_depth, search_parent)]
+    while stack:
+        directory, depth, match = stack.pop()
+        if depth is None:
+            # The groups of a directory, after those of its subdirectories
+            filelist.extend(match)
+            continue
+        if depth < 0:
+            continue
+        visited = visit(directory, match)
+        if visited is None:
+            continue
+        subdirs, groups = visited
+        if search_parent_first:
+            filelist.extend(groups)
+        else:
+            stack.append((directory, None, groups))
+        for subdir in reversed(subdirs):
+            if subdir not in exclude:
+                stack.append((os.path.join(directory, subdir), depth - 1, True))
+    return filelist
 
+def _search(parentdir, visit, workers, kwargs):
+    search_depth = kwargs.get('SearchDepth', float('inf'))
+    search_parent_first = kwargs.get('SearchParentFirst', True)
+    search_parent = kwargs.get('SearchParent', True)
+    exclude = set(kwargs.get('ExcludeDirs', ()))
+
+    if workers is None or workers <= 1:
+        return _walk(parentdir, search_depth, visit, search_parent, search_parent_first, exclude)
+
+    if search_depth < 0:
+        return []
+    visited = visit(parentdir, search_parent)
+    if visited is None:
+        return []
+    subdirs, parent = visited
+    subdirs = [subdir for subdir in subdirs if subdir not in exclude]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        subtrees = list(pool.map(
+            lambda subdir: _walk(os.path.join(parentdir, subdir), search_depth - 1, visit,
+                                 True, search_parent_first, exclude), subdirs))
+    filelist = list(parent) if search_parent_first else []
+    for subtree in subtrees:
+        filelist.extend(subtree)
     if not search_parent_first:
-        for subdir in subdirs:
-            filelist.extend(findfilegroups(os.path.join(parentdir, subdir), fileparameters, **kwargs))
+        filelist.extend(parent)
+    return filelist
 
-    if search_parent:
-        filelist_potential = []
+def findfilegroups(parentdir, fileparameters, workers=None, **kwargs):
+    """
+    Finds groups of files based on parameters.
 
-        tf, match_string, search_string = strcmp_substitution(fileparameters[0], regularfiles, **kwargs)
+    Args:
+        parentdir (str): The directory to search.
+        fileparameters (list of str): Regular expressions for the files of a
+            group. The SubstituteStringSymbol ('#') in the first one matches any
+            string, which the later ones must then contain in its place.
+        workers (int): If greater than 1, the subdirectories of parentdir are
+            searched in this many threads.
+        **kwargs: SearchDepth, SearchParent (search parentdir itself; its
+            subdirectories are always searched), SearchParentFirst,
+            SubstituteStringSymbol, UseSubstituteString and ExcludeDirs (names
+            of directories not to search).
 
-        for i, t in enumerate(tf):
-            if t:
-                filelist_potential.append({'searchString': search_string[i], 'filelist': [match_string[i]]})
+    Returns:
+        list of list of str: The full paths of the files of each group.
+    """
+    matcher = FileGroupMatcher(fileparameters, **kwargs)
+    return _search(parentdir, _lister(matcher), workers, kwargs)
 
-        for k in range(1, len(fileparameters)):
-            new_filelist_potential = []
-            for j in range(len(filelist_potential)):
-                kwargs['SubstituteString'] = filelist_potential[j]['searchString']
-                tf, match_string, new_search_string = strcmp_substitution(fileparameters[k], regularfiles, **kwargs)
+# A directory modified this close to its scan may change again within the
+# resolution of its modification time, so its fingerprint is not kept
+RACY_NS = 2 * 10**9
 
+class _FingerprintLister:
+    """
+    Lists directories for findfilegroups_incremental, reusing the groups of
+    directories whose fingerprints have not changed.
+    """
 
-                for i, t in enumerate(tf):
-                    if t:
-                        matchpotential = {}
-                        if not filelist_potential[j]['searchString']:
-                            matchpotential['searchString'] = new_search_string[i]
-                        else:
-                            matchpotential['searchString'] = filelist_potential[j]['searchString']
-                        matchpotential['filelist'] = filelist_potential[j]['filelist'] + [match_string[i]]
-                        new_filelist_potential.append(matchpotential)
+    def __init__(self, matcher, parentdir, previous):
+        self.matcher = matcher
+        self.parentdir = parentdir
+        self.previous = previous or {}
+        self.state = {}
 
-            filelist_potential = new_filelist_potential
-            if not filelist_potential:
-                break
+    def __call__(self, directory, match):
+        key = os.path.relpath(directory, self.parentdir)
+        scan_time = time.time_ns()
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        entry = self.previous.get(key)
+        if entry is None or entry['fingerprint'][0] != mtime:
+            scanned = _scan(directory)
+            if scanned is None:
+                return None
+            subdirs, regularfiles = scanned
+            groups = self.matcher.match('', regularfiles)
+            entry = {
+                'fingerprint': [mtime],
+                'subdirs': subdirs,
+                'groups': groups,
+            }
+            if mtime >= scan_time - RACY_NS:
+                entry = dict(entry, fingerprint=None)
+        if entry['fingerprint'] is not None:
+            self.state[key] = entry
+        groups = [[os.path.join(directory, name) for name in group] for group in entry['groups']] if match else []
+        return entry['subdirs'], groups
 
-        for j in range(len(filelist_potential)):
-            myfilelist = []
-            for k in range(len(filelist_potential[j]['filelist'])):
-                myfilelist.append(os.path.join(parentdir, filelist_potential[j]['filelist'][k]))
-            filelist.append(myfilelist)
+def findfilegroups_incremental(parentdir, fileparameters, previous=None, workers=None, **kwargs):
+    """
+    Finds groups of files like findfilegroups, rescanning only the directories
+    that have changed since a previous search.
 
-    if search_parent_first:
-        kwargs['SearchDepth'] = search_depth - 1
-        for subdir in subdirs:
-            filelist.extend(findfilegroups(os.path.join(parentdir, subdir), fileparameters, **kwargs))
+    Each directory is fingerprinted by its modification time, which changes
+    whenever an entry is added, removed or renamed. A directory whose
+    modification time matches its fingerprint in previous is not listed again: its subdirectories and groups are taken
+    from previous. The caller keeps the returned state (which can be saved as
+    JSON) and passes it as previous to the next search with the same
+    fileparameters and options.
 
-    return filelist
+    Args:
+        parentdir (str): The directory to search.
+        fileparameters (list of str): As for findfilegroups.
+        previous (dict): The state returned by an earlier search, or None.
+        workers (int): As for findfilegroups.
+        **kwargs: As for findfilegroups.
+
+    Returns:
+        tuple: (list of list of str, dict) The full paths of the files of each
+            group, and the state of this search.
+    """
+    lister = _FingerprintLister(FileGroupMatcher(fileparameters, **kwargs), parentdir, previous)
+    filelist = _search(parentdir, lister, workers, kwargs)
+    return filelist, lister.state
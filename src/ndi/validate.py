@@ -0,0 +1,389 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from .common.path_constants import PathConstants
+from .util.jsoncache import json_file_cache
+
+_TYPE_CHECKS = {
+    'object': lambda v: isinstance(v, dict),
+    'array': lambda v: isinstance(v, list),
+    'string': lambda v: isinstance(v, str),
+    'number': lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'integer': lambda v: (isinstance(v, int) and not isinstance(v, bool)) or (isinstance(v, float) and v.is_integer()),
+    'boolean': lambda v: isinstance(v, bool),
+    'null': lambda v: v is None,
+}
+
+_is_number = _TYPE_CHECKS['number']
+
+
+def _accept(value, path, errors):
+    pass
+
+
+def compile_schema(schema, resolve_ref=None):
+    """
+    Compiles a JSON schema into a validation function.
+
+    The common JSON Schema keywords used by NDI schemas are supported: type,
+    enum, const, minimum/maximum (and the exclusive forms), minLength,
+    maxLength, pattern, items, minItems, maxItems, properties, required,
+    additionalProperties, allOf, anyOf, oneOf, not and $ref. Other keywords
+    (including NDI's doc_* annotations) are ignored.
+
+    Args:
+        schema (dict or bool): The schema.
+        resolve_ref (callable, optional): Maps a $ref string to a compiled
+            validation function. $ref is ignored if not given.
+
+    Returns:
+        callable: check(value, path, errors), which appends a message to the
+            list errors for each violation found in value. path is the dotted
+            name of value used in the messages.
+    """
+    if schema is True or schema == {}:
+        return _accept
+    if schema is False:
+        return lambda value, path, errors: errors.append(f"{path}: no value is allowed here.")
+
+    checks = []
+
+    if '$ref' in schema and resolve_ref is not None:
+        ref = schema['$ref']
+        resolved = []
+
+        def check_ref(value, path, errors):
+            if not resolved:
+                resolved.append(resolve_ref(ref))
+            resolved[0](value, path, errors)
+        checks.append(check_ref)
+
+    if 'type' in schema:
+        types = schema['type'] if isinstance(schema['type'], list) else [schema['type']]
+        type_checks = [_TYPE_CHECKS[t] for t in types if t in _TYPE_CHECKS]
+        if type_checks:
+            expected = ' or '.join(types)
+
+            def check_type(value, path, errors):
+                if not any(t(value) for t in type_checks):
+                    errors.append(f"{path}: expected {expected}, found {type(value).__name__}.")
+            checks.append(check_type)
+
+    if 'enum' in schema:
+        allowed = schema['enum']
+
+        def check_enum(value, path, errors):
+            if value not in allowed:
+                errors.append(f"{path}: {value!r} is not one of {allowed!r}.")
+        checks.append(check_enum)
+
+    if 'const' in schema:
+        constant = schema['const']
+
+        def check_const(value, path, errors):
+            if value != constant:
+                errors.append(f"{path}: expected {constant!r}.")
+        checks.append(check_const)
+
+    bounds = [(k, schema[k]) for k in ('minimum', 'maximum', 'exclusiveMinimum', 'exclusiveMaximum')
+              if _is_number(schema.get(k))]
+    if bounds:
+        tests = {
+            'minimum': lambda v, b: v >= b,
+            'maximum': lambda v, b: v <= b,
+            'exclusiveMinimum': lambda v, b: v > b,
+            'exclusiveMaximum': lambda v, b: v < b,
+        }
+
+        def check_bounds(value, path, errors):
+            if _is_number(value):
+                for k, b in bounds:
+                    if not tests[k](value, b):
+                        errors.append(f"{path}: {value} violates {k} {b}.")
+        checks.append(check_bounds)
+
+    min_length = schema.get('minLength')
+    max_length = schema.get('maxLength')
+    pattern = re.compile(schema['pattern']) if 'pattern' in schema else None
+    if min_length is not None or max_length is not None or pattern is not None:
+        def check_string(value, path, errors):
+            if not isinstance(value, str):
+                return
+            if min_length is not None and len(value) < min_length:
+                errors.append(f"{path}: shorter than {min_length} characters.")
+            if max_length is not None and len(value) > max_length:
+                errors.append(f"{path}: longer than {max_length} characters.")
+            if pattern is not None and pattern.search(value) is None:
+                errors.append(f"{path}: does not match pattern {pattern.pattern!r}.")
+        checks.append(check_string)
+
+    if 'items' in schema or 'minItems' in schema or 'maxItems' in schema:
+        items = schema.get('items', True)
+        if isinstance(items, list):
+            item_checks = [compile_schema(s, resolve_ref) for s in items]
+            item_check = None
+        else:
+            item_checks = None
+            item_check = compile_schema(items, resolve_ref)
+        min_items = schema.get('minItems')
+        max_items = schema.get('maxItems')
+
+        def check_array(value, path, errors):
+            if not isinstance(value, list):
+                return
+            if min_items is not None and len(value) < min_items:
+                errors.append(f"{path}: fewer than {min_items} items.")
+            if max_items is not None and len(value) > max_items:
+                errors.append(f"{path}: more than {max_items} items.")
+            if item_check is not None:
+                if item_check is not _accept:
+                    for i, item in enumerate(value):
+                        item_check(item, f"{path}[{i}]", errors)
+            else:
+                for i, (check, item) in enumerate(zip(item_checks, value)):
+                    check(item, f"{path}[{i}]", errors)
+        checks.append(check_array)
+
+    if 'properties' in schema or 'required' in schema or 'additionalProperties' in schema:
+        property_checks = {k: compile_schema(s, resolve_ref) for k, s in schema.get('properties', {}).items()}
+        required = list(schema.get('required', []))
+        additional = schema.get('additionalProperties', True)
+        additional_check = None if additional is True else compile_schema(additional, resolve_ref)
+
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return
+            for k in required:
+                if k not in value:
+                    errors.append(f"{path}: missing required field '{k}'.")
+            for k, v in value.items():
+                check = property_checks.get(k)
+                if check is not None:
+                    check(v, f"{path}.{k}", errors)
+                elif additional_check is not None:
+                    additional_check(v, f"{path}.{k}", errors)
+        checks.append(check_object)
+
+    if 'allOf' in schema:
+        for s in schema['allOf']:
+            checks.append(compile_schema(s, resolve_ref))
+
+    if 'anyOf' in schema or 'oneOf' in schema:
+        key = 'anyOf' if 'anyOf' in schema else 'oneOf'
+        alternatives = [compile_schema(s, resolve_ref) for s in schema[key]]
+
+        def check_alternatives(value, path, errors):
+            matches = 0
+            for alternative in alternatives:
+                trial = []
+                alternative(value, path, trial)
+                if not trial:
+                    matches += 1
+            if matches == 0 or (key == 'oneOf' and matches > 1):
+                errors.append(f"{path}: does not satisfy {key}.")
+        checks.append(check_alternatives)
+
+    if 'not' in schema:
+        negated = compile_schema(schema['not'], resolve_ref)
+
+        def check_not(value, path, errors):
+            trial = []
+            negated(value, path, trial)
+            if not trial:
+                errors.append(f"{path}: matches a schema it must not match.")
+        checks.append(check_not)
+
+    if not checks:
+        return _accept
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value, path, errors):
+        for check in checks:
+            check(value, path, errors)
+    return check_all
+
+
+def _json_pointer(document, pointer):
+    node = document
+    for part in pointer.lstrip('#').split('/'):
+        if part:
+            node = node[part.replace('~1', '/').replace('~0', '~')]
+    return node
+
+
+class ValidatorCache:
+    """
+    A process-wide cache of compiled NDI document schemas.
+
+    Each schema file is read and compiled once; it is recompiled only if the
+    file changes on disk. Classes whose document_class block does not name
+    their schema or definition are looked up among the document types NDI
+    defines (see ndi.fun.doc.all_types).
+    """
+
+    def __init__(self):
+        self._compiled = {}
+        self._classes = None
+
+    def class_definitions(self):
+        """
+        Returns the 'document_class' block of each document type, keyed by class name.
+
+        The types are listed by ndi.fun.doc.all_types and read once.
+        """
+        if self._classes is None:
+            from .document_definition import definition_path
+            from .fun.doc import all_types
+            classes = {}
+            for document_type in all_types():
+                path = definition_path(document_type)
+                if path is None:
+                    continue
+                document_class = json_file_cache.load(path).get('document_class')
+                if isinstance(document_class, dict) and document_class.get('class_name'):
+                    classes.setdefault(document_class['class_name'], document_class)
+            self._classes = classes
+        return self._classes
+
+    def schema_validator(self, schema_path):
+        """
+        Returns the compiled validation function of a schema file.
+        """
+        schema = json_file_cache.load(schema_path)
+        entry = self._compiled.get(schema_path)
+        if entry is not None and entry[0] is schema:
+            return entry[1]
+        check = compile_schema(schema, resolve_ref=lambda ref: self._resolve_ref(ref, schema_path, schema))
+        self._compiled[schema_path] = (schema, check)
+        return check
+
+    def _resolve_ref(self, ref, schema_path, schema):
+        location, _, pointer = ref.partition('#')
+        if not location:
+            return compile_schema(_json_pointer(schema, pointer), lambda r: self._resolve_ref(r, schema_path, schema))
+        path = PathConstants.expand_path(location)
+        if path is None or not os.path.isabs(path):
+            path = os.path.join(os.path.dirname(schema_path), location)
+        if pointer:
+            target = json_file_cache.load(path)
+            return compile_schema(_json_pointer(target, pointer), lambda r: self._resolve_ref(r, path, target))
+        return self.schema_validator(path)
+
+    def class_validators(self, document_class):
+        """
+        Returns the validators that apply to a document class.
+
+        Args:
+            document_class (dict): The 'document_class' block of a document.
+
+        Returns:
+            list of tuple: (class_name, property_list_name, check, whole_document)
+                for the class and each of its superclasses that has a schema.
+                whole_document is True if the schema describes the entire
+                document rather than the class's property block.
+        """
+        class_name = document_class.get('class_name')
+        validation = document_class.get('validation')
+        if not validation:
+            validation = self.class_definitions().get(class_name, {}).get('validation')
+        classes = [(class_name, document_class.get('property_list_name'), validation)]
+        for superclass in document_class.get('superclasses', []) or []:
+            definition = superclass.get('definition', '')
+            definition_path = PathConstants.expand_path(definition)
+            if definition_path is not None and os.path.isfile(definition_path):
+                sc = json_file_cache.load(definition_path).get('document_class', {})
+            else:
+                name = os.path.splitext(definition.replace('\\', '/').split('/')[-1])[0]
+                sc = self.class_definitions().get(name, {})
+            classes.append((sc.get('class_name'), sc.get('property_list_name'), sc.get('validation')))
+
+        validators = []
+        for class_name, property_list_name, validation in classes:
+            property_list_name = property_list_name or class_name
+            schema_path = PathConstants.expand_path(validation) if validation else None
+            if schema_path is None or not os.path.isfile(schema_path):
+                # A class without a schema has nothing to check
+                continue
+            check = self.schema_validator(schema_path)
+            schema = json_file_cache.load(schema_path)
+            whole_document = property_list_name in schema.get('properties', {})
+            validators.append((class_name, property_list_name, check, whole_document))
+        return validators
+
+    def validate(self, document_properties, _memo=None):
+        """
+        Validates the properties of one document.
+
+        Returns:
+            list of str: The problems found (empty if the document is valid).
+        """
+        document_class = document_properties.get('document_class')
+        if not isinstance(document_class, dict):
+            return ["document_class: missing."]
+
+        key = (document_class.get('class_name'), document_class.get('validation'),
+               tuple(s.get('definition', '') for s in document_class.get('superclasses', []) or []))
+        validators = None if _memo is None else _memo.get(key)
+        if validators is None:
+            validators = self.class_validators(document_class)
+            if _memo is not None:
+                _memo[key] = validators
+
+        errors = []
+        for class_name, property_list_name, check, whole_document in validators:
+            if whole_document:
+                check(document_properties, '', errors)
+            elif property_list_name not in document_properties:
+                errors.append(f"Missing the '{property_list_name}' properties of class '{class_name}'.")
+            else:
+                check(document_properties[property_list_name], property_list_name, errors)
+        return errors
+
+
+# Process-wide cache (each worker process builds its own)
+validator_cache = ValidatorCache()
+
+
+def _validate_chunk(chunk):
+    memo = {}
+    failures = []
+    for position, document_properties in chunk:
+        errors = validator_cache.validate(document_properties, memo)
+        if errors:
+            failures.append((position, errors))
+    return failures
+
+
+def validate_documents(documents, workers=None, chunk_size=2000):
+    """
+    Validates many documents against their class schemas.
+
+    Each schema is compiled once per process, and class lookups are shared by
+    all documents of a batch. Classes without a schema are not checked.
+
+    Args:
+        documents (list): ndi.document objects or document_properties dicts.
+        workers (int, optional): If greater than 1, validate in this many worker processes.
+        chunk_size (int): The number of documents sent to a worker at a time.
+
+    Returns:
+        dict: The problems found, keyed by document ID (or by position in
+            documents, for a document without an ID). Valid documents are omitted.
+    """
+    properties = [d if isinstance(d, dict) else d.document_properties for d in documents]
+    indexed = list(enumerate(properties))
+
+    if workers is not None and workers > 1 and len(indexed) > chunk_size:
+        chunks = [indexed[i:i + chunk_size] for i in range(0, len(indexed), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = [f for chunk_failures in pool.map(_validate_chunk, chunks) for f in chunk_failures]
+    else:
+        results = _validate_chunk(indexed)
+
+    failures = {}
+    for position, errors in results:
+        doc_id = properties[position].get('base', {}).get('id') or position
+        failures.setdefault(doc_id, []).extend(errors)
+    return failures
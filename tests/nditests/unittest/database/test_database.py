@@ -35,6 +35,28 @@ class TestDatabase(unittest.TestCase):
         self.assertIsInstance(doc, Document)
         self.assertIsNotNone(doc.id())
 
+    def test_document_plus_shares_subtrees(self):
+        a = Document({'base': {'id': 'a', 'session_id': 's1'}, 'a': {'x': 1},
+                      'document_class': {'class_name': 'a', 'superclasses': [{'definition': 'base'}]}})
+        b = Document({'base': {'id': 'b', 'session_id': 's2'}, 'b': {'y': 2},
+                      'document_class': {'class_name': 'b', 'superclasses': [{'definition': 'b_super'}]}})
+        c = a + b
+        self.assertIs(c.document_properties['a'], a.document_properties['a'])
+        self.assertEqual(len(c.document_properties['document_class']['superclasses']), 2)
+        self.assertEqual(len(a.document_properties['document_class']['superclasses']), 1)
+        c.set_session_id('s3')
+        self.assertEqual(b.document_properties['base']['session_id'], 's2')
+        self.assertEqual(a.document_properties['base']['session_id'], 's1')
+
+    def test_setters_change_properties_in_place(self):
+        properties = {'base': {'id': 'a', 'session_id': 's1'}, 'depends_on': [{'name': 'x', 'value': '1'}]}
+        doc = Document(properties)
+        doc.set_session_id('s2')
+        doc.set_dependency_value('x', '2')
+        self.assertIs(doc.document_properties, properties)
+        self.assertEqual(properties['base']['session_id'], 's2')
+        self.assertEqual(properties['depends_on'][0]['value'], '2')
+
     def test_binarydoc_creation(self):
         bin_doc = MockBinaryDoc()
         self.assertIsInstance(bin_doc, BinaryDoc)
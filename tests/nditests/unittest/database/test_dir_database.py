@@ -0,0 +1,232 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+from ndi.database import dir as dir_module
+from ndi.database.dir import Dir
+
+class FakeDoc:
+    def __init__(self, doc_id, name, class_name='base'):
+        self.document_properties = {
+            'base': {'id': doc_id, 'name': name, 'session_id': 's1'},
+            'document_class': {'class_name': class_name, 'superclasses': []},
+        }
+
+def names(docs):
+    return sorted(d.document_properties['base']['name'] for d in docs)
+
+class TestDirDatabase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'db')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_add_read_remove(self):
+        db = Dir(self.path, 'ref', durable=False)
+        self.assertEqual(db.alldocids(), [])
+        db.add(FakeDoc('a', 'first'))
+        db.add(FakeDoc('b', 'second'))
+        self.assertEqual(sorted(db.alldocids()), ['a', 'b'])
+        self.assertEqual(db.read('a').document_properties['base']['name'], 'first')
+        db.remove('a')
+        self.assertIsNone(db.read('a'))
+        with self.assertRaises(ValueError):
+            db.add(FakeDoc('b', 'again'), update=False)
+
+    def test_pending_documents_and_names(self):
+        db = Dir(self.path, 'ref')
+        doc = FakeDoc('a', 'first')
+        with db.transaction():
+            db.add(doc)
+            # Changes made after the add are not part of the commit
+            doc.document_properties['base']['name'] = 'changed'
+        self.assertEqual(db.read('a').document_properties['base']['name'], 'first')
+
+        # IDs that differ only by case, or that look like encoded names, get distinct files
+        ids = ['Ab', 'aB', 'ab', '4162', '=4162']
+        db.add_many([FakeDoc(i, i) for i in ids])
+        self.assertEqual(len({os.path.normcase(db.snapshot()._entries[i]).lower() for i in ids}), len(ids))
+        self.assertEqual([db.read(i).document_properties['base']['name'] for i in ids], ids)
+
+    def test_search(self):
+        db = Dir(self.path, 'ref', index_fields=['base.name'], durable=False)
+        with db.transaction():
+            db.add(FakeDoc('a', 'probe_1', 'probe'))
+            db.add(FakeDoc('b', 'probe_2', 'probe'))
+            db.add(FakeDoc('c', 'element_1', 'element'))
+        self.assertEqual(db.generation(), 1)
+        q = {'field': 'base.name', 'operation': 'regexp', 'param1': 'probe_\\d', 'param2': ''}
+        self.assertEqual(names(db.search(q)), ['probe_1', 'probe_2'])
+        q = {'field': 'base.id', 'operation': 'regexp', 'param1': '(.*)', 'param2': ''}
+        self.assertEqual(len(db.search(q)), 3)
+        q = {'field': '', 'operation': 'isa', 'param1': 'element', 'param2': ''}
+        self.assertEqual(names(db.search(q)), ['element_1'])
+        self.assertEqual([d.id() for d in db.search(q, compact=True)], ['c'])
+
+    def test_snapshot_isolation(self):
+        db = Dir(self.path, 'ref', durable=False)
+        db.add(FakeDoc('a', 'first'))
+        snapshot = db.snapshot()
+        db.add(FakeDoc('a', 'changed'))
+        db.add(FakeDoc('b', 'second'))
+        self.assertEqual(snapshot.alldocids(), ['a'])
+        self.assertEqual(snapshot.read('a').document_properties['base']['name'], 'first')
+        self.assertEqual(db.read('a').document_properties['base']['name'], 'changed')
+
+    def test_transaction_invisible_until_commit(self):
+        db = Dir(self.path, 'ref', durable=False)
+        seen = []
+        with db.transaction():
+            db.add(FakeDoc('a', 'first'))
+            reader = threading.Thread(target=lambda: seen.append(len(db.snapshot())))
+            reader.start()
+            reader.join()
+        self.assertEqual(seen, [0])
+        self.assertEqual(len(db.snapshot()), 1)
+
+    def test_two_handles_same_directory(self):
+        writer = Dir(self.path, 'ref', checkpoint_interval=4, durable=False)
+        reader = Dir(self.path, 'ref', index_fields=['base.name'], durable=False)
+        for i in range(10):
+            writer.add(FakeDoc(f'd{i}', f'doc_{i}'))
+        self.assertEqual(len(reader.snapshot()), 10)
+        writer.remove('d3')
+        q = {'field': 'base.name', 'operation': 'contains_string', 'param1': 'doc_3', 'param2': ''}
+        self.assertEqual(reader.search(q), [])
+
+    def test_vacuum(self):
+        db = Dir(self.path, 'ref', durable=False)
+        for i in range(5):
+            db.add(FakeDoc('a', f'version_{i}'))
+        db.vacuum()
+        objects = os.listdir(os.path.join(self.path, 'objects', 'a'))
+        self.assertEqual(len(objects), 1)
+        fresh = Dir(self.path, 'ref')
+        self.assertEqual(fresh.read('a').document_properties['base']['name'], 'version_4')
+
+    def test_content_hashes(self):
+        db = Dir(self.path, 'ref', durable=False, content_hashes=True)
+        db.add(FakeDoc('a', 'same'))
+        db.add(FakeDoc('b', 'same'))
+        db.add(FakeDoc('c', 'other'))
+        other = Dir(self.path, 'ref')
+        hashes = other.snapshot().content_hashes()
+        self.assertEqual(len(other._hash_cache), 3)
+        self.assertNotEqual(hashes['a'], hashes['c'])
+        self.assertEqual(db.snapshot().content_hash('c'), hashes['c'])
+
+    def test_find_fuids(self):
+        def with_file(doc, filename, uid):
+            doc.document_properties['files'] = {
+                'file_list': [filename],
+                'file_info': [{'name': filename, 'locations': [{'uid': uid}]}],
+            }
+            return doc
+
+        db = Dir(self.path, 'ref', durable=False)
+        db.add(with_file(FakeDoc('a', 'first'), 'a.bin', 'u1'))
+        db.add(with_file(FakeDoc('b', 'second'), 'b.bin', 'u2'))
+        self.assertEqual(db.find_fuid('u1'), ('a', 'a.bin'))
+        old = db.snapshot()
+
+        # The index follows later generations without re-reading unchanged documents
+        db.remove('a')
+        db.add(with_file(FakeDoc('b', 'second'), 'b.bin', 'u3'))
+        self.assertEqual(db.find_fuids(['u1', 'u2', 'u3']), {'u3': [('b', 'b.bin')]})
+        self.assertEqual(old.find_fuids(['u1', 'u2', 'u3']), {'u1': [('a', 'a.bin')], 'u2': [('b', 'b.bin')]})
+        self.assertEqual(Dir(self.path, 'ref').find_fuid('u3'), ('b', 'b.bin'))
+
+        # A UID held by two documents maps to both
+        db.add(with_file(FakeDoc('c', 'third'), 'c.bin', 'u3'))
+        self.assertEqual(db.find_fuids(['u3']), {'u3': [('b', 'b.bin'), ('c', 'c.bin')]})
+        db.remove('b')
+        self.assertEqual(db.find_fuid('u3'), ('c', 'c.bin'))
+
+    def test_binary_files(self):
+        source = os.path.join(self.temp_dir, 'source.bin')
+        with open(source, 'wb') as f:
+            f.write(b'contents')
+        doc = FakeDoc('a', 'first')
+        doc.document_properties['files'] = {
+            'file_list': ['ingested.bin', 'in_place.bin', 'missing.bin'],
+            'file_info': [
+                {'name': 'ingested.bin', 'locations': [{'uid': 'u1', 'location': source, 'ingest': 1,
+                                                        'delete_original': 1, 'location_type': 'file'}]},
+                {'name': 'in_place.bin', 'locations': [{'uid': 'u2', 'location': __file__, 'ingest': 0,
+                                                        'delete_original': 0, 'location_type': 'file'}]},
+                {'name': 'missing.bin', 'locations': [{'uid': 'u3', 'location': source + '.none', 'ingest': 0}]},
+            ],
+        }
+        db = Dir(self.path, 'ref', durable=False)
+        db.add(doc)
+        # The ingested copy is kept by the database and the original is deleted
+        self.assertFalse(os.path.exists(source))
+        f = db.openbinarydoc('a', 'ingested.bin')
+        self.assertEqual(f.read(), b'contents')
+        db.closebinarydoc(f)
+        exists, path = db.existbinarydoc(doc, 'in_place.bin')
+        self.assertEqual((exists, path), (True, __file__))
+        self.assertEqual(db.existbinarydoc('a', 'missing.bin'), (False, ''))
+        with self.assertRaises(FileNotFoundError):
+            db.openbinarydoc('a', 'missing.bin')
+        with self.assertRaises(FileNotFoundError):
+            db.openbinarydoc('a', 'other.bin')
+        with self.assertRaises(FileNotFoundError):
+            db.openbinarydoc('b', 'ingested.bin')
+
+        # A location marked for ingestion that does not exist fails the commit
+        bad = FakeDoc('b', 'second')
+        bad.document_properties['files'] = {'file_info': [
+            {'name': 'x.bin', 'locations': [{'uid': 'u4', 'location': source, 'ingest': 1}]}]}
+        with self.assertRaises(FileNotFoundError):
+            db.add(bad)
+        self.assertEqual(db.alldocids(), ['a'])
+
+    def test_export_import(self):
+        db = Dir(self.path, 'ref', durable=False)
+        db.add_many([FakeDoc(f'd{i}', f'doc_{i}') for i in range(25)])
+        export_dir = os.path.join(self.temp_dir, 'export')
+        manifest = db.export(export_dir, shards=4)
+        self.assertEqual(manifest['document_count'], 25)
+        self.assertEqual(sum(s['count'] for s in manifest['shards']), 25)
+
+        for compression, workers in [('gzip', 2), ('zlib', 1), (None, 1)]:
+            target = Dir(os.path.join(self.temp_dir, f'copy_{compression}'), 'ref', durable=False)
+            source_dir = export_dir
+            if compression != 'gzip':
+                source_dir = os.path.join(self.temp_dir, f'export_{compression}')
+                db.export(source_dir, shards=3, compression=compression)
+            self.assertEqual(target.import_(source_dir, workers=workers), 25)
+            self.assertEqual(sorted(target.alldocids()), sorted(db.alldocids()))
+            self.assertEqual(target.read('d7').document_properties, db.read('d7').document_properties)
+
+    def test_import_hashes_in_workers(self):
+        db = Dir(self.path, 'ref', durable=False, content_hashes=True)
+        db.add_many([FakeDoc(f'd{i}', f'doc_{i}') for i in range(10)])
+        export_dir = os.path.join(self.temp_dir, 'export')
+        db.export(export_dir, shards=2)
+
+        # The hashes come from the shard parse; the commit does not parse again
+        target = Dir(os.path.join(self.temp_dir, 'copy'), 'ref', durable=False, content_hashes=True)
+        with mock.patch.object(dir_module, 'content_hash') as commit_hash:
+            self.assertEqual(target.import_(export_dir, workers=2), 10)
+        commit_hash.assert_not_called()
+        self.assertEqual(target.snapshot().content_hashes(), db.snapshot().content_hashes())
+
+    def test_import_detects_corruption(self):
+        db = Dir(self.path, 'ref', durable=False)
+        db.add(FakeDoc('a', 'first'))
+        export_dir = os.path.join(self.temp_dir, 'export')
+        manifest = db.export(export_dir)
+        with open(os.path.join(export_dir, manifest['shards'][0]['file']), 'ab') as f:
+            f.write(b'garbage')
+        target = Dir(os.path.join(self.temp_dir, 'copy'), 'ref')
+        with self.assertRaises(ValueError):
+            target.import_(export_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from ndi.database import Database
+from ndi.database.fileuid import FileUIDIndex, file_uids
+
+class MemoryDatabase(Database):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.docs = {}
+    def do_add(self, ndi_document_obj, add_parameters):
+        self.docs[ndi_document_obj.document_properties['base']['id']] = ndi_document_obj
+    def do_read(self, ndi_document_id): return self.docs.get(ndi_document_id)
+    def do_remove(self, ndi_document_id): self.docs.pop(ndi_document_id, None)
+    def do_search(self, searchoptions, searchparams): return []
+    def do_openbinarydoc(self, ndi_document_id): pass
+    def check_exist_binarydoc(self, ndi_document_id): pass
+    def do_closebinarydoc(self, ndi_binarydoc_obj): pass
+    def do_open_database(self): pass
+    def alldocids(self): return list(self.docs)
+
+class FakeDoc:
+    def __init__(self, doc_id, files):
+        self.document_properties = {
+            'base': {'id': doc_id},
+            'files': {
+                'file_list': list(files),
+                'file_info': [{'name': name, 'locations': [{'uid': uid, 'location': f'/data/{uid}'}]}
+                              for name, uid in files.items()],
+            },
+        }
+
+class TestFileUID(unittest.TestCase):
+    def test_file_uids(self):
+        doc = FakeDoc('a', {'x.bin': 'u1', 'y.bin': 'u2'})
+        self.assertEqual(list(file_uids(doc.document_properties)), [('u1', 'x.bin'), ('u2', 'y.bin')])
+        self.assertEqual(list(file_uids({'base': {'id': 'b'}})), [])
+
+    def test_index(self):
+        index = FileUIDIndex()
+        index.add('a', FakeDoc('a', {'x.bin': 'u1', 'y.bin': 'u2'}).document_properties)
+        index.add('b', FakeDoc('b', {'z.bin': 'u3'}).document_properties)
+        self.assertEqual(index.find('u2'), [('a', 'y.bin')])
+        self.assertEqual(index.find_many(['u3', 'missing', 'u1']), {'u3': [('b', 'z.bin')], 'u1': [('a', 'x.bin')]})
+
+        # Re-indexing a document drops the files it no longer has
+        index.add('a', FakeDoc('a', {'x.bin': 'u1'}).document_properties)
+        self.assertEqual(index.find('u2'), [])
+        index.remove('b')
+        self.assertEqual(len(index), 1)
+
+    def test_shared_uid(self):
+        index = FileUIDIndex()
+        index.add('b', FakeDoc('b', {'copy.bin': 'u1'}).document_properties)
+        index.add('a', FakeDoc('a', {'x.bin': 'u1'}).document_properties)
+        self.assertEqual(index.find('u1'), [('a', 'x.bin'), ('b', 'copy.bin')])
+
+        # Removing one holder keeps the other
+        index.remove('a')
+        self.assertEqual(index.find_many(['u1']), {'u1': [('b', 'copy.bin')]})
+        index.remove('b')
+        self.assertEqual(len(index), 0)
+
+    def test_database_index(self):
+        db = MemoryDatabase('path', 'ref')
+        db.add(FakeDoc('a', {'x.bin': 'u1'}))
+        db.add(FakeDoc('b', {'y.bin': 'u2'}))
+        self.assertEqual(db.find_fuid('u2'), ('b', 'y.bin'))
+        db.remove('b')
+        self.assertEqual(db.find_fuid('u2'), (None, ''))
+
+        db.fuid_index.clear()
+        db.open()
+        self.assertEqual(db.find_fuids(['u1', 'u2']), {'u1': [('a', 'x.bin')]})
+
+if __name__ == '__main__':
+    unittest.main()
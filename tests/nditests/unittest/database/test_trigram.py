@@ -0,0 +1,91 @@
+import unittest
+from ndi.database import Database
+from ndi.database.fieldsearch import field_search
+from ndi.database.trigram import TrigramIndex, is_match_all, regex_trigrams, plan_search
+
+class RecordingDatabase(Database):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.docs = {}
+        self.last_searchoptions = None
+    def do_add(self, ndi_document_obj, add_parameters):
+        self.docs[ndi_document_obj.document_properties['base']['id']] = ndi_document_obj
+    def do_read(self, ndi_document_id): return self.docs.get(ndi_document_id)
+    def do_remove(self, ndi_document_id): self.docs.pop(ndi_document_id, None)
+    def do_search(self, searchoptions, searchparams):
+        self.last_searchoptions = searchoptions
+        return []
+    def do_openbinarydoc(self, ndi_document_id): pass
+    def check_exist_binarydoc(self, ndi_document_id): pass
+    def do_closebinarydoc(self, ndi_binarydoc_obj): pass
+    def do_open_database(self): pass
+    def alldocids(self): return list(self.docs)
+
+class FakeDoc:
+    def __init__(self, doc_id, name):
+        self.document_properties = {'base': {'id': doc_id, 'name': name}}
+
+class TestTrigram(unittest.TestCase):
+    def test_is_match_all(self):
+        for pattern in ['(.*)', '.*', '^.*?', '', '(a*)']:
+            self.assertTrue(is_match_all(pattern), pattern)
+        for pattern in ['^.*$', 'a', '.+', '(.*)x', '[']:
+            self.assertFalse(is_match_all(pattern), pattern)
+
+    def test_regex_trigrams(self):
+        self.assertEqual(regex_trigrams('^abcd.*'), {'abc', 'bcd'})
+        self.assertEqual(regex_trigrams('ab[cd]ef'), set())
+        self.assertEqual(regex_trigrams('x(yz|qq)'), set())
+        self.assertEqual(regex_trigrams('(?i)ABC'), {'abc'})
+
+    def test_index_candidates(self):
+        index = TrigramIndex(['base.name'])
+        index.add('1', {'base': {'name': 'probe_alpha'}})
+        index.add('2', {'base': {'name': 'probe_beta'}})
+        index.add('3', {'base': {'name': 42}})
+        self.assertEqual(index.candidates('base.name', 'regexp', '^probe_al'), {'1'})
+        self.assertEqual(index.candidates('base.name', 'contains_string', 'probe'), {'1', '2'})
+        self.assertIsNone(index.candidates('base.name', 'regexp', 'p.*'))
+        self.assertIsNone(index.candidates('base.id', 'regexp', 'probe'))
+        # Field presence counts values of any type, as 'hasfield' does
+        self.assertEqual(index.documents_with_field('base.name'), {'1', '2', '3'})
+        self.assertEqual(index.documents_with_string('base.name'), {'1', '2'})
+        index.remove('1')
+        self.assertEqual(index.candidates('base.name', 'contains_string', 'alpha'), set())
+        self.assertEqual(index.documents_with_field('base.name'), {'2', '3'})
+
+    def test_plan_search(self):
+        terms = [{'field': 'base.id', 'operation': 'regexp', 'param1': '(.*)', 'param2': ''}]
+        planned, candidates = plan_search(terms)
+        self.assertEqual((planned[0]['operation'], planned[0]['param1']), ('contains_string', ''))
+        self.assertIsNone(candidates)
+
+        # Like the regex, the rewritten term matches string values only
+        for value, expected in (('x', True), ('', True), (5, False), (None, False), ({'a': 1}, False)):
+            document = {'base': {'id': value}}
+            for negated in ('', '~'):
+                term = dict(terms[0], operation=negated + 'regexp')
+                self.assertEqual(field_search(document, plan_search([term])[0]),
+                                 field_search(document, [term]), (value, negated))
+        index = TrigramIndex(['base.id'])
+        index.add('1', {'base': {'id': 'x'}})
+        index.add('2', {'base': {'id': 7}})
+        self.assertEqual(plan_search(terms, index), ([], {'1'}))
+
+    def test_database_search_options(self):
+        db = RecordingDatabase('/fake/path', 'ref1', index_fields=['base.name'])
+        db.add(FakeDoc('1', 'element_one'))
+        db.add(FakeDoc('2', 'element_two'))
+        db.search({'field': 'base.name', 'operation': 'contains_string', 'param1': '_two', 'param2': ''})
+        self.assertEqual(db.last_searchoptions['candidate_ids'], {'2'})
+
+        db.search({'field': 'base.name', 'operation': 'regexp', 'param1': '(.*)', 'param2': ''})
+        self.assertEqual(db.last_searchoptions['search_structure'], [])
+        self.assertEqual(db.last_searchoptions['candidate_ids'], {'1', '2'})
+
+        db.remove('2')
+        db.search({'field': 'base.name', 'operation': 'contains_string', 'param1': '_two', 'param2': ''})
+        self.assertEqual(db.last_searchoptions['candidate_ids'], set())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,7 @@ import shutil
 import tempfile
 from ndi.session.dir import Dir as SessionDir
 from ndi.file import Navigator
+from ndi.file.navigator.epochdir import EpochDir
 
 class TestFileNavigator(unittest.TestCase):
 
@@ -47,13 +48,54 @@ class TestFileNavigator(unittest.TestCase):
                     with open(file_path, 'w') as f:
                         pass
 
-    @unittest.skip("Not implemented")
     def test_number_of_epochs(self):
         """
         Tests that the number of epochs is correct.
         """
         self.assertEqual(self.file_navigator.numepochs(), 6)
 
+    def test_incremental_rebuild(self):
+        """
+        Tests that file groups are kept with directory fingerprints and only
+        changed directories are searched again.
+        """
+        for root, dirs, files in os.walk(self.temp_dir):
+            os.utime(root, ns=(10**18, 10**18))
+        self.assertEqual(self.file_navigator.filematch_hashstring(), Navigator(
+            self.session, fileparameters=['myfile_#.ext1', 'myfile_#.ext2']).filematch_hashstring())
+        groups, _ = self.file_navigator.selectfilegroups()
+        self.assertEqual(len(groups), 6)
+        filename = self.file_navigator.fingerprint_filename()
+        self.assertTrue(os.path.isfile(filename))
+        self.assertTrue(filename.startswith(os.path.join(self.temp_dir, '.ndi')))
+
+        modified = os.path.getmtime(filename)
+        self.assertEqual(self.file_navigator.selectfilegroups_disk(), groups)
+        self.assertEqual(os.path.getmtime(filename), modified)
+
+        subdir = os.path.join(self.temp_dir, 'mysubdir2')
+        for ext in ['.ext1', '.ext2']:
+            open(os.path.join(subdir, f'myfile_3{ext}'), 'w').close()
+        os.utime(subdir, ns=(10**18 + 1, 10**18 + 1))
+        groups = self.file_navigator.selectfilegroups_disk()
+        self.assertEqual(len(groups), 7)
+        self.assertIn([os.path.join(subdir, 'myfile_3.ext1'), os.path.join(subdir, 'myfile_3.ext2')], groups)
+
+    def test_epochdir(self):
+        """
+        Tests that an EpochDir navigator finds one epoch per subdirectory.
+        """
+        class ConcreteEpochDir(EpochDir):
+            def search_query(self):
+                return {}
+
+        navigator = ConcreteEpochDir(self.session, fileparameters={'filematch': ['myfile_1.ext1', 'myfile_1.ext2']})
+        et = navigator.buildepochtable()
+        self.assertEqual([e['epoch_id'] for e in et], ['mysubdir1', 'mysubdir2', 'mysubdir3'])
+        self.assertEqual(et[2]['epoch_number'], 3)
+        self.assertEqual(et[0]['underlying_epochs']['underlying'],
+                         [os.path.join(self.temp_dir, 'mysubdir1', f) for f in ['myfile_1.ext1', 'myfile_1.ext2']])
+
     @unittest.skip("Not implemented")
     def test_epoch_files(self):
         """
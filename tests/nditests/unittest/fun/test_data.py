@@ -0,0 +1,215 @@
+import io
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import zlib
+from unittest.mock import MagicMock
+import numpy as np
+from ndi.fun.data import read_ngrid, read_ngrid_block, write_ngrid, write_ngrid_blocks
+from ndi.fun.data import write_ngrid_chunked, read_ngrid_chunked, read_ngrid_chunked_info, register_codec
+from ndi.fun.data import read_image_stack, RawImageStack, TiffImageStack
+from ndi.database.binarydoc import BinaryDoc
+
+class BytesBinaryDoc(BinaryDoc):
+    def __init__(self, data):
+        self.f = io.BytesIO(data)
+    def fopen(self): pass
+    def fseek(self, location, reference): self.f.seek(location)
+    def ftell(self): return self.f.tell()
+    def feof(self): return False
+    def fwrite(self, data, precision, skip): pass
+    def fread(self, count, precision, skip): return self.f.read(count)
+    def fclose(self): pass
+
+
+def write_tiff(filename, frames, compress=False, rows_per_strip=None):
+    # A minimal little-endian multi-page TIFF writer
+    with open(filename, 'wb') as f:
+        f.write(b'II' + struct.pack('<HI', 42, 0))
+        previous_next = 4
+        for frame in frames:
+            frame = np.ascontiguousarray(frame)
+            height, width = frame.shape[:2]
+            samples = frame.shape[2] if frame.ndim == 3 else 1
+            rows = rows_per_strip or height
+            strips = [frame[r:r + rows].tobytes() for r in range(0, height, rows)]
+            if compress:
+                strips = [zlib.compress(s) for s in strips]
+            offsets = []
+            for s in strips:
+                offsets.append(f.tell())
+                f.write(s)
+            counts = [len(s) for s in strips]
+            arrays = {}
+            def array(values):
+                pos = f.tell()
+                f.write(struct.pack('<%dI' % len(values), *values))
+                return pos
+            off_value = offsets[0] if len(offsets) == 1 else array(offsets)
+            cnt_value = counts[0] if len(counts) == 1 else array(counts)
+            kind = {'u': 1, 'i': 2, 'f': 3}[frame.dtype.kind]
+            entries = [(256, 4, 1, width), (257, 4, 1, height), (258, 3, 1, frame.dtype.itemsize * 8),
+                       (259, 3, 1, 8 if compress else 1), (273, 4, len(offsets), off_value),
+                       (277, 3, 1, samples), (278, 4, 1, rows), (279, 4, len(counts), cnt_value),
+                       (339, 3, 1, kind)]
+            if f.tell() % 2:
+                f.write(b'\0')
+            ifd = f.tell()
+            f.seek(previous_next)
+            f.write(struct.pack('<I', ifd))
+            f.seek(ifd)
+            f.write(struct.pack('<H', len(entries)))
+            for tag, typ, count, value in entries:
+                if typ == 3 and count == 1:
+                    f.write(struct.pack('<HHIHH', tag, typ, count, value, 0))
+                else:
+                    f.write(struct.pack('<HHII', tag, typ, count, value))
+            previous_next = f.tell()
+            f.write(struct.pack('<I', 0))
+
+class TestData(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir, 'grid.bin')
+        self.data = np.random.rand(6, 5, 4, 3)
+        write_ngrid(self.data, self.filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_write_ngrid_bytesio(self):
+        raw = open(self.filename, 'rb').read()
+        for x in (self.data, self.data[:, ::2]):
+            buf = io.BytesIO()
+            write_ngrid(x, buf, 'single', block_size=7)
+            self.assertEqual(buf.getvalue(), x.astype(np.float32).tobytes(order='F'))
+        buf = io.BytesIO()
+        write_ngrid(self.data, buf)
+        self.assertEqual(buf.getvalue(), raw)
+
+    def test_read_ngrid_mmap(self):
+        x = read_ngrid(self.filename, [6, 5, 4, 3], mmap=True)
+        self.assertIsInstance(x, np.memmap)
+        self.assertTrue(x.flags['F_CONTIGUOUS'])
+        np.testing.assert_array_equal(x[:, :, 2, 1], self.data[:, :, 2, 1])
+        del x
+
+        with open(self.filename, 'rb') as f:
+            np.testing.assert_array_equal(read_ngrid(f, [6, 5, 4, 3], mmap=True), self.data)
+        with self.assertRaises(ValueError):
+            read_ngrid(BytesBinaryDoc(b''), [6, 5, 4, 3], mmap=True)
+
+    def test_read_ngrid_block(self):
+        for ranges in ([(1, 4), (2, 5), (0, 4), 1], [None, None, (1, 3)], [None, 3], [(0, 6), (1, 2)], [5, 4, 3, 2]):
+            expected = self.data[tuple(slice(*r) if isinstance(r, tuple) else slice(r, r + 1) if isinstance(r, int)
+                                       else slice(None) for r in ranges)]
+            block = read_ngrid_block(self.filename, [6, 5, 4, 3], ranges)
+            self.assertTrue(block.flags['F_CONTIGUOUS'])
+            np.testing.assert_array_equal(block, expected)
+
+        with open(self.filename, 'rb') as f:
+            raw = f.read()
+        block = read_ngrid_block(BytesBinaryDoc(raw), [6, 5, 4, 3], [slice(0, 2), slice(3, None)])
+        np.testing.assert_array_equal(block, self.data[0:2, 3:])
+        np.testing.assert_array_equal(read_ngrid(BytesBinaryDoc(raw), [6, 5, 4, 3]), self.data)
+
+    def test_write_ngrid_blocks(self):
+        # Casting a non-contiguous view in small blocks matches casting it whole
+        x = np.arange(-60, 60).reshape(4, 30)[:, ::3] * 1.5
+        write_ngrid(x, self.filename, 'int16', block_size=7)
+        np.testing.assert_array_equal(read_ngrid(self.filename, [4, 10], 'int16'), x.astype(np.int16))
+
+        data_size = write_ngrid_blocks((self.data[..., i:i + 1] for i in range(2)), self.filename)
+        self.assertEqual(data_size, [6, 5, 4, 2])
+        data_size = write_ngrid_blocks([self.data[..., 2:]], self.filename, append=True, data_size=data_size)
+        self.assertEqual(data_size, [6, 5, 4, 3])
+        np.testing.assert_array_equal(read_ngrid(self.filename, data_size), self.data)
+
+        write_ngrid(self.data[..., :1], self.filename)
+        write_ngrid(self.data[..., 1:], self.filename, append=True)
+        np.testing.assert_array_equal(read_ngrid(self.filename, [6, 5, 4, 3]), self.data)
+        with self.assertRaises(ValueError):
+            write_ngrid_blocks([self.data, self.data[1:]], self.filename)
+
+    def test_ngrid_chunked(self):
+        filename = os.path.join(self.temp_dir, 'grid.ngc')
+        data = np.zeros((40, 30, 5))
+        data[5:12, 3:25, 1:3] = np.random.rand(7, 22, 2)
+        write_ngrid_chunked(data, filename, chunk_shape=[16, 16, 2], workers=3)
+
+        info = read_ngrid_chunked_info(filename)
+        self.assertEqual(info['data_size'], [40, 30, 5])
+        self.assertEqual(len(info['chunks']), 3 * 2 * 3)
+        self.assertEqual(sum(1 for _, length in info['chunks'] if length), 1 * 2 * 2)
+        np.testing.assert_array_equal(read_ngrid_chunked(filename), data)
+        block = read_ngrid_chunked(filename, [(10, 20), slice(2, 18), 2], workers=2)
+        self.assertTrue(block.flags['F_CONTIGUOUS'])
+        np.testing.assert_array_equal(block, data[10:20, 2:18, 2:3])
+
+        register_codec('reversed', lambda data, level: data[::-1], lambda data: data[::-1])
+        write_ngrid_chunked(data, filename, data_type='single', codec='reversed')
+        with open(filename, 'rb') as f:
+            np.testing.assert_array_equal(read_ngrid_chunked(f, [None, 7]), data[:, 7:8].astype(np.float32))
+
+    def test_tiff_image_stack(self):
+        filename = os.path.join(self.temp_dir, 'stack.tif')
+        frames = np.random.randint(0, 60000, size=(12, 9, 7)).astype(np.uint16)
+        write_tiff(filename, frames)
+        with TiffImageStack(filename, cache_frames=4) as stack:
+            self.assertEqual(stack.shape, (12, 9, 7))
+            np.testing.assert_array_equal(stack[5], frames[5])
+            np.testing.assert_array_equal(stack[[11, 0, 3], 2:4], frames[[11, 0, 3], 2:4])
+            np.testing.assert_array_equal(np.asarray(stack), frames)
+            self.assertEqual(len(stack._cache), 4)
+            self.assertFalse(stack[1].flags.writeable)
+
+        rgb = np.random.rand(3, 8, 6, 3).astype(np.float32)
+        write_tiff(filename, rgb, compress=True, rows_per_strip=3)
+        stack = TiffImageStack(filename)
+        np.testing.assert_array_equal(stack[-1], rgb[-1])
+        self.assertEqual(stack.dtype, np.float32)
+        # Floating-point prediction is not implemented
+        stack._pages[0]['predictor'] = 3
+        with self.assertRaises(NotImplementedError):
+            stack[0]
+
+    def test_read_image_stack(self):
+        frames = np.random.rand(4, 3, 10)
+        write_ngrid(frames, self.filename)
+        session = MagicMock()
+        session.database_openbinarydoc.side_effect = lambda doc, name: open(self.filename, 'rb')
+        session.database_closebinarydoc.side_effect = lambda f: f.close()
+        doc = MagicMock()
+        doc.document_properties = {'imageStack_parameters': {'dimension_size': [4, 3, 10], 'data_type': 'double'}}
+
+        stack = read_image_stack(session, doc, 'raw')
+        self.assertIsInstance(stack, RawImageStack)
+        self.assertEqual(stack.shape, (10, 4, 3))
+        np.testing.assert_array_equal(stack[7], frames[:, :, 7])
+
+        # Binary documents that are not plain files are copied first
+        with open(self.filename, 'rb') as f:
+            raw = f.read()
+        session.database_openbinarydoc.side_effect = lambda doc, name: io.BytesIO(raw)
+        stack = read_image_stack(session, doc, 'ngrid')
+        np.testing.assert_array_equal(stack[2], frames[:, :, 2])
+        temporary = stack._temporary_file
+        self.assertTrue(os.path.isfile(temporary))
+        stack.close()
+        self.assertFalse(os.path.exists(temporary))
+
+        # ndi.database.binarydoc.BinaryDoc objects are read with fread
+        session.database_openbinarydoc.side_effect = lambda doc, name: BytesBinaryDoc(raw)
+        session.database_closebinarydoc.side_effect = lambda f: f.fclose()
+        with read_image_stack(session, doc, 'raw') as stack:
+            np.testing.assert_array_equal(stack[9], frames[:, :, 9])
+        session.database_openbinarydoc.side_effect = lambda doc, name: None
+        with self.assertRaises(FileNotFoundError):
+            read_image_stack(session, doc, 'raw')
+        with self.assertRaises(NotImplementedError):
+            read_image_stack(session, doc, 'mp4')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,14 @@
+import contextlib
+import importlib
 import unittest
+from unittest import mock
 from unittest.mock import MagicMock
-from ndi.fun.doc import diff, get_doc_types, all_types
+import os
+import shutil
+import tempfile
+import pandas as pd
+from ndi.fun.doc import diff, get_doc_types, all_types, ontology_table_row_doc_to_table, find_fuid, find_fuids
+from ndi.fun.doc.diff import compare_binary_files
 
 class TestDoc(unittest.TestCase):
     def test_diff(self):
@@ -35,6 +43,97 @@ class TestDoc(unittest.TestCase):
         eq, report = diff(doc1, doc2)
         self.assertFalse(eq)
 
+    def test_diff_duplicate_dependency_names(self):
+        diff_module = importlib.import_module('ndi.fun.doc.diff')
+        deps = [{'name': 'x', 'value': 'a'}, {'name': 'x', 'value': 'b'}, {'name': 'w', 'value': 'c'}]
+        doc1, doc2, doc3 = MagicMock(), MagicMock(), MagicMock()
+        doc1.document_properties = {'base': {'id': 'd1'}, 'depends_on': deps}
+        doc2.document_properties = {'base': {'id': 'd1'}, 'depends_on': deps[::-1]}
+        doc3.document_properties = {'base': {'id': 'd1'}, 'depends_on': [deps[1], deps[0], {'name': 'w', 'value': 'd'}]}
+        # The hash shortcut and the full comparison agree
+        for patched in (False, True):
+            with mock.patch.object(diff_module, 'content_hash', side_effect=lambda *args: object()) if patched \
+                    else contextlib.nullcontext():
+                self.assertTrue(diff(doc1, doc2)[0])
+                self.assertFalse(diff(doc1, doc3)[0])
+
+    def test_diff_check_files(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+
+        def make_session(name, contents):
+            folder = os.path.join(tmp, name)
+            os.makedirs(folder)
+            for filename, data in contents.items():
+                with open(os.path.join(folder, filename), 'wb') as f:
+                    f.write(data)
+            session = MagicMock()
+            session.database_openbinarydoc.side_effect = lambda doc, filename: open(os.path.join(folder, filename), 'rb')
+            session.database_closebinarydoc.side_effect = lambda f: f.close()
+            return session
+
+        data = os.urandom(3000)
+        # The last byte flipped, so b.bin always differs
+        changed = data[:-1] + bytes([data[-1] ^ 0xFF])
+        session1 = make_session('s1', {'a.bin': data, 'b.bin': data, 'c.bin': data})
+        session2 = make_session('s2', {'a.bin': data, 'b.bin': changed, 'c.bin': data + b'y'})
+        doc = MagicMock()
+        doc.document_properties = {'base': {'id': 'd1'}, 'files': {'file_list': ['a.bin', 'b.bin', 'c.bin']}}
+
+        eq, report = diff(doc, doc, check_files=True, session1=session1, session2=session2)
+        self.assertFalse(eq)
+        self.assertEqual(len(report['details']), 2)
+        self.assertIn("'b.bin' contents differ", report['details'][0])
+        self.assertIn("'c.bin' sizes differ", report['details'][1])
+
+        results = compare_binary_files([(session1, doc, session2, doc, name) for name in ['a.bin', 'b.bin']],
+                                       workers=2, buffer_size=1024)
+        self.assertEqual(results, [None, 'contents differ in the block at byte 2048.'])
+        self.assertEqual(session1.database_closebinarydoc.call_count, session1.database_openbinarydoc.call_count)
+
+        # Binary documents are read through fread/fseek/ftell
+        class FakeBinaryDoc:
+            def __init__(self, data):
+                self.data, self.position = data, 0
+            def fseek(self, location, reference):
+                self.position = {'bof': 0, 'cof': self.position, 'eof': len(self.data)}[reference] + location
+            def ftell(self):
+                return self.position
+            def fread(self, count, precision, skip):
+                block = self.data[self.position:self.position + count]
+                self.position += len(block)
+                return block
+
+        session3 = MagicMock()
+        session3.database_openbinarydoc.side_effect = lambda doc, filename: FakeBinaryDoc(
+            data if filename == 'a.bin' else changed)
+        results = compare_binary_files([(session1, doc, session3, doc, name) for name in ['a.bin', 'b.bin']],
+                                       workers=1, buffer_size=1024)
+        self.assertEqual(results, [None, 'contents differ in the block at byte 2048.'])
+
+        # A file the database does not provide is a difference
+        session4 = MagicMock()
+        session4.database_openbinarydoc.return_value = None
+        eq, report = diff(doc, doc, check_files=True, session1=session1, session2=session4)
+        self.assertFalse(eq)
+        self.assertIn("'a.bin' could not be opened", report['details'][0])
+
+    def test_find_fuids(self):
+        doc = MagicMock()
+        doc.current_file_list.return_value = ['a.bin', 'b.bin']
+        doc.get_fuid.side_effect = lambda name: {'a.bin': 'u1', 'b.bin': 'u2'}[name]
+
+        class Searchable:
+            def database_search(self, query):
+                return [doc]
+
+        self.assertEqual(find_fuids(Searchable(), ['u2', 'u9']), {'u2': (doc, 'b.bin'), 'u9': (None, '')})
+
+        session = MagicMock()
+        session.database_find_fuids.return_value = {'u1': (doc, 'a.bin')}
+        self.assertEqual(find_fuid(session, 'u1'), (doc, 'a.bin'))
+        session.database_find_fuids.assert_called_once_with(['u1'])
+
     def test_get_doc_types(self):
         session = MagicMock()
         doc1 = MagicMock()
@@ -55,5 +154,57 @@ class TestDoc(unittest.TestCase):
         types = all_types()
         self.assertIsInstance(types, list)
 
+    def test_ontology_table_row_doc_to_table(self):
+        docs = []
+        for i in range(5):
+            doc = MagicMock()
+            doc.id.return_value = f'd{i}'
+            variable_names = 'A,B' if i % 2 else 'C'
+            data = [{'A': i, 'B': 'x'}, {'A': i + 10, 'B': 'y'}] if i % 2 else {'C': i}
+            doc.document_properties = {'ontologyTableRow': {'variableNames': variable_names, 'data': data}}
+            docs.append(doc)
+
+        tables, doc_ids = ontology_table_row_doc_to_table(docs)
+        self.assertEqual(doc_ids, [['d1', 'd3'], ['d0', 'd2', 'd4']])
+        self.assertEqual(list(tables[0]['A']), [1, 11, 3, 13])
+        self.assertEqual(list(tables[1]['C']), [0, 2, 4])
+
+        tables, doc_ids = ontology_table_row_doc_to_table(docs, stack_all=True)
+        self.assertEqual(len(tables), 1)
+        self.assertEqual(len(tables[0]), 7)
+
+        folder = tempfile.mkdtemp()
+        try:
+            files, doc_ids = ontology_table_row_doc_to_table(iter(docs), output_folder=folder, chunk_size=2)
+            self.assertEqual(list(pd.read_csv(files[0])['A']), [1, 11, 3, 13])
+            self.assertEqual(list(pd.read_csv(files[1])['C']), [0, 2, 4])
+
+            # Later chunks with other key orders or new keys keep their values in their columns
+            docs = []
+            for i, data in enumerate([[{'A': 1, 'B': 2}], [{'B': 3, 'A': 4}], [{'C': 5, 'A': 6}]]):
+                doc = MagicMock()
+                doc.id.return_value = f'e{i}'
+                doc.document_properties = {'ontologyTableRow': {'variableNames': 'A,B', 'data': data}}
+                docs.append(doc)
+            files, _ = ontology_table_row_doc_to_table(docs, output_folder=folder, chunk_size=1)
+            table = pd.read_csv(files[0])
+            self.assertEqual(list(table.columns), ['A', 'B', 'C'])
+            self.assertEqual(list(table['A']), [1, 4, 6])
+            self.assertEqual(list(table['B'].fillna(0)), [2, 3, 0])
+            self.assertEqual(list(table['C'].fillna(0)), [0, 0, 5])
+
+            # Values written before a new column appears are kept as written
+            docs = []
+            for i, data in enumerate([[{'A': '001', 'B': 'NA'}], [{'A': '002', 'C': 'x'}]]):
+                doc = MagicMock()
+                doc.id.return_value = f'f{i}'
+                doc.document_properties = {'ontologyTableRow': {'variableNames': 'A,B', 'data': data}}
+                docs.append(doc)
+            files, _ = ontology_table_row_doc_to_table(docs, output_folder=folder, chunk_size=1)
+            with open(files[0]) as f:
+                self.assertEqual(f.read().splitlines(), ['A,B,C', '001,NA,', '002,,x'])
+        finally:
+            shutil.rmtree(folder)
+
 if __name__ == '__main__':
     unittest.main()
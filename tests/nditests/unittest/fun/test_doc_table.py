@@ -0,0 +1,62 @@
+import unittest
+import os
+import shutil
+import tempfile
+import pandas as pd
+from ndi.database.dir import Dir
+from ndi.fun.doc_table import class_table, element, subject
+
+def make_doc(doc_id, class_name, block, depends_on=None):
+    return {
+        'base': {'id': doc_id, 'session_id': 's1'},
+        'document_class': {'class_name': class_name, 'superclasses': []},
+        class_name: block,
+        'depends_on': depends_on or [],
+    }
+
+class FakeDoc:
+    def __init__(self, document_properties):
+        self.document_properties = document_properties
+
+class DirSession:
+    def __init__(self, database):
+        self.database = database
+    def database_search_fields(self, query, fields):
+        return self.database.search_fields(query, fields)
+
+class TestDocTable(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        db = Dir(os.path.join(self.temp_dir, 'db'), 'ref', durable=False)
+        db.add_many([FakeDoc(d) for d in [
+            make_doc('s1', 'subject', {'local_identifier': 'mouse1@lab'}),
+            make_doc('e1', 'element', {'name': 'ctx', 'reference': 1}, [{'name': 'subject_id', 'value': 's1'}]),
+            make_doc('e2', 'element', {'name': 'lgn', 'reference': 2, 'type': 'n-trode'}),
+        ]])
+        self.session = DirSession(db)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_element(self):
+        table, doc_ids = element(self.session, include_subject=True)
+        order = sorted(range(len(doc_ids)), key=lambda i: doc_ids[i])
+        table = table.iloc[order].reset_index(drop=True)
+        self.assertEqual(sorted(doc_ids), ['e1', 'e2'])
+        self.assertEqual(list(table['name']), ['ctx', 'lgn'])
+        self.assertEqual(table.loc[0, 'subject.local_identifier'], 'mouse1@lab')
+        self.assertTrue(pd.isna(table.loc[1, 'subject.local_identifier']))
+        self.assertTrue(pd.isna(table.loc[0, 'type']))
+
+    def test_projection(self):
+        table, doc_ids = class_table(self.session, 'element', fields=['reference'])
+        self.assertEqual(list(table.columns), ['reference'])
+        self.assertEqual(sorted(table['reference']), [1, 2])
+
+    def test_subject(self):
+        table, doc_ids = subject(self.session)
+        self.assertEqual(doc_ids, ['s1'])
+        self.assertEqual(list(table['subject_id']), ['s1'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import hashlib
+import importlib
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from ndi.fun.file import md5, md5_many, ChecksumCache, BinaryReader, compare_readers
+
+md5_module = importlib.import_module('ndi.fun.file.md5')
+
+class TestFile(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(8):
+            path = os.path.join(self.temp_dir, f'file{i}.bin')
+            with open(path, 'wb') as f:
+                f.write(os.urandom(1000 * i))
+            self.age(path)
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    @staticmethod
+    def age(path):
+        # Files modified this recently are not cached
+        old = os.stat(path).st_mtime_ns - 60 * 10**9
+        os.utime(path, ns=(old, old))
+
+    def expected(self, path):
+        with open(path, 'rb') as f:
+            return hashlib.md5(f.read()).hexdigest()
+
+    def test_md5_many(self):
+        self.assertEqual(md5_many(self.paths, workers=4), [self.expected(p) for p in self.paths])
+        with self.assertRaises(FileNotFoundError):
+            md5_many(self.paths + [os.path.join(self.temp_dir, 'missing')], workers=4)
+
+    def test_checksum_cache(self):
+        cache_file = os.path.join(self.temp_dir, 'cache', 'checksums.json')
+        first = md5_many(self.paths, workers=4, cache=cache_file)
+        self.assertEqual(len(ChecksumCache(cache_file)), len(self.paths))
+
+        # Unchanged files are not read again; a rewritten file is
+        with open(self.paths[3], 'wb') as f:
+            f.write(b'new contents')
+        self.age(self.paths[3])
+        with mock.patch.object(md5_module.hashlib, 'md5', wraps=hashlib.md5) as hasher:
+            second = md5_many(self.paths, workers=4, cache=cache_file)
+        self.assertEqual(hasher.call_count, 1)
+        self.assertEqual(second[3], self.expected(self.paths[3]))
+        self.assertEqual(second[:3] + second[4:], first[:3] + first[4:])
+
+        cache = ChecksumCache(cache_file)
+        self.assertEqual(md5(self.paths[3], cache=cache), second[3])
+
+    def test_checksum_cache_skips_recent_files(self):
+        path = os.path.join(self.temp_dir, 'recent.bin')
+        with open(path, 'wb') as f:
+            f.write(b'first')
+        cache = ChecksumCache(os.path.join(self.temp_dir, 'checksums.json'))
+        self.assertEqual(md5(path, cache=cache), self.expected(path))
+        self.assertEqual(len(cache), 0)
+
+        # A rewrite with the same size within the timestamp resolution is still seen
+        mtime = os.stat(path).st_mtime_ns
+        with open(path, 'wb') as f:
+            f.write(b'other')
+        os.utime(path, ns=(mtime, mtime))
+        self.assertEqual(md5(path, cache=cache), self.expected(path))
+
+    def test_binary_reader(self):
+        class FakeBinaryDoc:
+            # Only the ndi.database.binarydoc.BinaryDoc reading methods
+            def __init__(self, data):
+                self.data, self.position = data, 0
+            def fseek(self, location, reference):
+                self.position = {'bof': 0, 'cof': self.position, 'eof': len(self.data)}[reference] + location
+            def ftell(self):
+                return self.position
+            def fread(self, count, precision, skip):
+                block = self.data[self.position:self.position + min(count, 100)]
+                self.position += len(block)
+                return block
+
+        with open(self.paths[5], 'rb') as f:
+            data = f.read()
+            reader = BinaryReader(FakeBinaryDoc(data))
+            self.assertEqual(reader.size(), 5000)
+            self.assertEqual(reader.read(1234), data[:1234])
+            f.seek(0)
+            checksum = hashlib.md5()
+            self.assertIsNone(compare_readers(BinaryReader(FakeBinaryDoc(data)), BinaryReader(f), 1024, checksum))
+            self.assertEqual(checksum.hexdigest(), self.expected(self.paths[5]))
+            f.seek(0)
+            changed = FakeBinaryDoc(data[:-1] + bytes([data[-1] ^ 0xFF]))
+            self.assertEqual(compare_readers(BinaryReader(changed), BinaryReader(f), 1024),
+                             'contents differ in the block at byte 4096.')
+
+if __name__ == '__main__':
+    unittest.main()
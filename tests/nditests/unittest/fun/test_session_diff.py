@@ -0,0 +1,132 @@
+import importlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+from ndi.fun.session import diff
+from ndi.fun.dataset import diff as dataset_diff
+
+class FakeDoc:
+    def __init__(self, doc_id, session_id, value):
+        self.document_properties = {
+            'base': {'id': doc_id, 'session_id': session_id},
+            'element': {'value': value},
+        }
+    def id(self):
+        return self.document_properties['base']['id']
+
+class FakeSession:
+    def __init__(self, docs):
+        self.docs = docs
+        self.files = {}
+    def database_search(self, query):
+        return self.docs
+    def database_openbinarydoc(self, doc_id, filename):
+        return io.BytesIO(self.files[(doc_id, filename)])
+    def database_closebinarydoc(self, f):
+        f.close()
+
+def make_sessions(n):
+    docs1 = [FakeDoc(f'd{i}', 's1', i) for i in range(n)]
+    docs2 = [FakeDoc(f'd{i}', 's2', i if i % 10 else -i) for i in range(1, n + 1)]
+    return FakeSession(docs1), FakeSession(docs2)
+
+class TestSessionDiff(unittest.TestCase):
+    def test_diff(self):
+        session1, session2 = make_sessions(30)
+        report = diff(session1, session2, verbose=False)
+        self.assertEqual(report['documentsInAOnly'], {'d0'})
+        self.assertEqual(report['documentsInBOnly'], {'d30'})
+        self.assertEqual([m['id'] for m in report['mismatchedDocuments']], ['d10', 'd20'])
+
+    def test_diff_workers(self):
+        session1, session2 = make_sessions(300)
+        serial = diff(session1, session2, verbose=False)
+        parallel = diff(session1, session2, verbose=False, workers=2, chunk_size=5)
+        self.assertEqual(len(serial['mismatchedDocuments']), 29)
+        self.assertEqual(parallel, serial)
+        self.assertEqual(dataset_diff(session1, session2, verbose=False, workers=2), serial)
+
+    def test_manifest(self):
+        diff_module = importlib.import_module('ndi.fun.session.diff')
+        session1, session2 = make_sessions(30)
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest_path = os.path.join(tmp, 'manifest.json')
+            first = diff(session1, session2, verbose=False, manifest_path=manifest_path)
+            self.assertEqual(diff_module.read_manifest(manifest_path)['session1']['d5'],
+                             diff_module._doc_hash(session1.docs[5]))
+
+            # Only documents that changed since the manifest are compared again
+            session2.docs[4].document_properties['element']['value'] = 'changed'
+            with mock.patch.object(diff_module, '_diff_pairs', wraps=diff_module._diff_pairs) as diff_pairs:
+                second = diff(session1, session2, verbose=False, manifest_path=manifest_path)
+            self.assertEqual([p[0] for p in diff_pairs.call_args[0][0]], ['d5'])
+            self.assertEqual([m['id'] for m in second['mismatchedDocuments']], ['d10', 'd20', 'd5'])
+            self.assertEqual(second['mismatchedDocuments'][0], first['mismatchedDocuments'][0])
+
+            session2.docs[4].document_properties['element']['value'] = 5
+            third = diff(session1, session2, verbose=False, manifest_path=manifest_path)
+            self.assertEqual(third, first)
+            self.assertNotIn('d5', diff_module.read_manifest(manifest_path)['mismatches'])
+
+    def test_recheck_file_report(self):
+        session1, session2 = make_sessions(30)
+        report = diff(session1, session2, verbose=False)
+        session2.docs[9].document_properties['element']['value'] = 10
+        rechecked = diff(session1, session2, verbose=False, recheck_file_report=report)
+        self.assertEqual([m['id'] for m in rechecked['mismatchedDocuments']], ['d20'])
+        self.assertEqual(rechecked['documentsInAOnly'], {'d0'})
+
+    def test_check_files(self):
+        session1, session2 = make_sessions(30)
+        for session in (session1, session2):
+            for doc in session.docs:
+                doc.document_properties['files'] = {'file_list': ['data.bin']}
+                session.files[(doc.id(), 'data.bin')] = doc.id().encode() * 1000
+        session2.files[('d3', 'data.bin')] = b'changed'
+        report = diff(session1, session2, verbose=False, check_files=True, file_workers=4)
+        self.assertEqual(report['fileDifferences'],
+                         [{'id': 'd3', 'filename': 'data.bin', 'difference': 'sizes differ (2000 vs 7 bytes).'}])
+
+        session2.files[('d3', 'data.bin')] = b'd3' * 1000
+        rechecked = diff(session1, session2, verbose=False, check_files=True, recheck_file_report=report)
+        self.assertEqual(rechecked['fileDifferences'], [])
+
+    def test_check_files_manifest(self):
+        diff_module = importlib.import_module('ndi.fun.session.diff')
+        session1, session2 = make_sessions(3)
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, session in (('a', session1), ('b', session2)):
+                for doc in session.docs:
+                    doc.document_properties['files'] = {'file_list': ['data.bin']}
+                    path = os.path.join(tmp, f'{name}_{doc.id()}.bin')
+                    with open(path, 'wb') as f:
+                        f.write(b'x' * 100)
+                    session.files[(doc.id(), 'data.bin')] = path
+                session.database_openbinarydoc = lambda doc_id, filename, s=session: open(s.files[(doc_id, filename)], 'rb')
+            manifest_path = os.path.join(tmp, 'manifest.json')
+            report = diff(session1, session2, verbose=False, check_files=True, manifest_path=manifest_path)
+            self.assertEqual(report['fileDifferences'], [])
+            files = diff_module.read_manifest(manifest_path)['files']
+            self.assertEqual(sorted(files), ['d1/data.bin', 'd2/data.bin'])
+            self.assertEqual(files['d1/data.bin']['session1'][0], 100)
+
+            # Unchanged files are not read again
+            with mock.patch.object(diff_module, 'compare_readers', wraps=diff_module.compare_readers) as compare:
+                again = diff(session1, session2, verbose=False, check_files=True, manifest_path=manifest_path)
+            compare.assert_not_called()
+            self.assertEqual(again, report)
+
+            # A file that changed on one side only is compared with the stored checksum
+            with open(session2.files[('d2', 'data.bin')], 'wb') as f:
+                f.write(b'y' * 100)
+            os.utime(session2.files[('d2', 'data.bin')], ns=(1, 1))
+            with mock.patch.object(diff_module, 'compare_readers', wraps=diff_module.compare_readers) as compare:
+                changed = diff(session1, session2, verbose=False, check_files=True, manifest_path=manifest_path)
+            compare.assert_not_called()
+            self.assertEqual(changed['fileDifferences'], [{'id': 'd2', 'filename': 'data.bin',
+                                                           'difference': 'contents differ (the MD5 checksums do not match).'}])
+
+if __name__ == '__main__':
+    unittest.main()
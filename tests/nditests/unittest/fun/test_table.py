@@ -30,5 +30,29 @@ class TestTable(unittest.TestCase):
         res = vstack([])
         self.assertTrue(res.empty)
 
+    def test_vstack_memory_efficient(self):
+        df1 = pd.DataFrame({'ID': [1, 2], 'Data': ['a', 'b']})
+        df2 = pd.DataFrame({'ID': [3, 4], 'Value': [10.5, 20.6]})
+        df3 = pd.DataFrame({'ID': [5], 'Data': ['a']})
+        expected = vstack([df1, df2, df3])
+
+        for tables in ([df1, df2, df3], (t for t in [df1, df2, df3])):
+            stacked = vstack(tables, memory_efficient=True)
+            self.assertEqual(list(stacked.columns), ['ID', 'Data', 'Value'])
+            self.assertEqual(stacked['ID'].dtype, np.int64)
+            self.assertEqual(list(stacked['ID']), list(expected['ID']))
+            self.assertTrue(np.isnan(stacked.iloc[2]['Data']))
+            self.assertTrue(np.isnan(stacked.iloc[0]['Value']))
+            self.assertEqual(stacked.iloc[3]['Value'], 20.6)
+
+        stacked = vstack(iter([df1, df2, df3]), memory_efficient=True, categorical=True)
+        self.assertEqual(str(stacked['Data'].dtype), 'category')
+        self.assertEqual(list(stacked['Data'].cat.categories), ['a', 'b'])
+        self.assertTrue(pd.isna(stacked.iloc[2]['Data']))
+
+        mixed = vstack([df1, pd.DataFrame({'Data': [7]})], memory_efficient=True, categorical=True)
+        self.assertEqual(list(mixed['Data']), ['a', 'b', 7])
+        self.assertTrue(vstack(iter([]), memory_efficient=True).empty)
+
 if __name__ == '__main__':
     unittest.main()
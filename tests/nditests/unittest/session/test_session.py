@@ -1,6 +1,8 @@
 import unittest
 import os
 import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from ndi.session import Session
 from ndi.session.dir import Dir as SessionDir
 from ndi.session.mock import Mock as MockSession
@@ -25,6 +27,59 @@ class TestSession(unittest.TestCase):
         self.assertEqual(session_dir.reference, 'my_session')
         self.assertEqual(session_dir.getpath(), '/fake/path')
 
+    def test_session_dir_shared_reference(self):
+        """
+        Tests that every opener of a directory gets the same session id.
+        """
+        path = tempfile.mkdtemp()
+        try:
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                ids = set(pool.map(lambda i: SessionDir('my_session', path).id(), range(16)))
+            self.assertEqual(len(ids), 1)
+            self.assertTrue(ids.pop())
+            self.assertEqual(os.listdir(os.path.join(path, '.ndi')), ['unique_reference.txt'])
+            self.assertTrue(SessionDir('my_session', path).database.store_content_hashes)
+        finally:
+            shutil.rmtree(path)
+
+    def test_validate_documents(self):
+        """
+        Tests that validate_documents returns (b, errmsg) and that the problems
+        of each document are reported by validation_failures.
+        """
+        class Doc:
+            def __init__(self, doc_id, session_id):
+                self.document_properties = {'base': {'id': doc_id, 'session_id': session_id},
+                                            'document_class': {'class_name': 'unknown_class'}}
+
+        session = Session('my_session')
+        docs = [Doc('a', session.id()), Doc('b', ''), Doc('c', 'other')]
+        self.assertEqual(session.validate_documents(docs[:2]), (True, ''))
+        self.assertEqual(session.validate_documents(docs), (False, '1 of 3 documents are not valid.'))
+        self.assertEqual(list(session.validation_failures(docs)), ['c'])
+        self.assertEqual(session.validate_documents([object()])[0], False)
+
+    def test_database_find_fuids(self):
+        """
+        Tests that a file UID also held by another session's document still
+        finds this session's document.
+        """
+        session = Session('my_session')
+
+        class Doc:
+            def __init__(self, doc_id, session_id):
+                self.document_properties = {'base': {'id': doc_id, 'session_id': session_id}}
+
+        class Source:
+            docs = {'a': Doc('a', 'other'), 'b': Doc('b', session.id())}
+            def find_fuids(self, fuids):
+                return {'u1': [('a', 'x.bin'), ('b', 'y.bin')], 'u2': [('a', 'z.bin')]}
+            def read(self, doc_id):
+                return self.docs[doc_id]
+
+        found = session.database_find_fuids(['u1', 'u2'], snapshot=Source())
+        self.assertEqual(found, {'u1': (Source.docs['b'], 'y.bin')})
+
     def test_create_mock_session(self):
         """
         Tests the creation of a MockSession object.
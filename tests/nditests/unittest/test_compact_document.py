@@ -0,0 +1,74 @@
+import unittest
+import json
+from ndi.compact_document import CompactDocument, compact_documents
+
+def make_properties(doc_id):
+    return {
+        'base': {'id': doc_id, 'session_id': 's1', 'name': f'name_{doc_id}', 'datestamp': '2024-01-01'},
+        'document_class': {'class_name': 'element', 'property_list_name': 'element',
+                           'superclasses': [{'definition': '$NDIDOCUMENTPATH/base.json'}]},
+        'element': {'name': 'e', 'reference': 1, 'type': 'n-trode'},
+        'depends_on': [{'name': 'subject_id', 'value': 'abc'}],
+    }
+
+class TestCompactDocument(unittest.TestCase):
+    def test_round_trip(self):
+        properties = make_properties('a')
+        doc = CompactDocument(properties)
+        self.assertEqual(doc.id(), 'a')
+        self.assertEqual(doc.session_id(), 's1')
+        self.assertEqual(doc.doc_class(), 'element')
+        self.assertTrue(doc.doc_isa('base'))
+        self.assertEqual(doc.document_properties, make_properties('a'))
+        self.assertEqual(CompactDocument.from_json(json.dumps(properties)).document_properties, properties)
+
+    def test_exact_round_trip(self):
+        properties = {'depends_on': [], 'base': {'name': 'n', 'id': 'a', 'session_id': None},
+                      'document_class': {'class_name': 'c'}, 'z': 1}
+        decoded = CompactDocument(properties).document_properties
+        self.assertEqual(decoded, properties)
+        self.assertEqual(list(decoded), list(properties))
+        self.assertEqual(list(decoded['base']), list(properties['base']))
+        self.assertEqual(CompactDocument({'x': {'y': 1}}).document_properties, {'x': {'y': 1}})
+        doc = CompactDocument({'x': 1})
+        self.assertIsNone(doc.id())
+        self.assertIsNone(doc.doc_class())
+
+    def test_shared_class_block(self):
+        a, b = compact_documents([make_properties('a'), make_properties('b')])
+        self.assertIs(a._document_class, b._document_class)
+        a.document_properties['document_class']['class_name'] = 'changed'
+        self.assertEqual(b.document_properties['document_class']['class_name'], 'element')
+
+    def test_changes_persist(self):
+        doc = CompactDocument(make_properties('a'))
+        doc.set_session_id('s2')
+        self.assertEqual(doc.document_properties['base']['session_id'], 's2')
+        doc.document_properties['element']['name'] = 'renamed'
+        doc.compact()
+        self.assertIsNone(doc._properties)
+        self.assertEqual(doc.document_properties['element']['name'], 'renamed')
+
+    def test_read_methods_stay_compact(self):
+        doc = CompactDocument(make_properties('a'))
+        h = doc.content_hash()
+        self.assertEqual(doc.dependency_value('subject_id'), 'abc')
+        self.assertIsNone(doc.dependency_value('missing', error_if_not_found=False))
+        with self.assertRaises(ValueError):
+            doc.dependency_value('missing')
+        self.assertEqual(doc.dependency()[0], ['subject_id'])
+        self.assertIsNone(doc._properties)
+        self.assertIs(doc._hashes[1][('base.session_id',)], h)
+        self.assertFalse(hasattr(doc, 'no_such_method'))
+
+        # The remembered hash carries over to the decoded properties until they change
+        doc.document_properties['element']['name'] = 'renamed'
+        self.assertEqual(doc.content_hash(), h)
+        self.assertNotEqual(doc.content_hash(refresh=True), h)
+        doc.set_dependency_value('subject_id', 'xyz')
+        doc.compact()
+        self.assertEqual(doc.dependency_value('subject_id'), 'xyz')
+        self.assertEqual(doc.content_hash(), CompactDocument(doc.document_properties).content_hash())
+
+if __name__ == '__main__':
+    unittest.main()
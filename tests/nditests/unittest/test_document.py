@@ -1,6 +1,7 @@
 import unittest
 from unittest.mock import patch
 from ndi.document import Document
+from ndi.compact_document import CompactDocument
 
 class TestDocument(unittest.TestCase):
 
@@ -41,5 +42,44 @@ class TestDocument(unittest.TestCase):
         doc.set_session_id('test_session')
         self.assertEqual(doc.document_properties['base']['session_id'], 'test_session')
 
+    @patch('ndi.document.Document.read_blank_definition')
+    def test_new_documents(self, mock_read_blank_definition):
+        mock_read_blank_definition.return_value = {
+            'base': {
+                'id': '',
+                'datestamp': '',
+                'session_id': ''
+            },
+            'document_class': {
+                'class_name': 'test_document',
+                'superclasses': []
+            }
+        }
+
+        docs = Document.new_documents('test_document', 3, **{'base.name': 'my_doc'})
+        self.assertEqual(len(docs), 3)
+        self.assertEqual(len({d.document_properties['base']['id'] for d in docs}), 3)
+        docs[0].set_session_id('test_session')
+        self.assertEqual(docs[1].document_properties['base']['session_id'], '')
+        self.assertEqual(docs[2].document_properties['base']['name'], 'my_doc')
+
+    def test_compact_document_delegation(self):
+        properties = {'base': {'id': 'a', 'session_id': 's', 'datestamp': 'd'},
+                      'document_class': {'class_name': 'x', 'superclasses': []}, 'x': {'v': 1}}
+        compact = CompactDocument(properties)
+        self.assertEqual(compact.content_hash(), Document(properties).content_hash())
+        # A compact document is not a Document; to_document makes one
+        self.assertNotIsInstance(compact, Document)
+        self.assertIsInstance(compact.to_document(), Document)
+        self.assertIsNone(compact._properties)
+
+    def test_diff_after_change_in_place(self):
+        from ndi.fun.doc import diff
+        a = Document({'base': {'id': 'a'}, 'element': {'name': 'e'}})
+        b = Document({'base': {'id': 'a'}, 'element': {'name': 'e'}})
+        self.assertTrue(diff(a, b)[0])
+        a.document_properties['element']['name'] = 'changed'
+        self.assertFalse(diff(a, b)[0])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from unittest.mock import patch
+import json
+import os
+import shutil
+import tempfile
+from ndi.common.path_constants import PathConstants
+from ndi.document_definition import DefinitionCache, ClassRegistry, definition_path
+
+def write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+class TestDefinitionCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, 'daq'))
+        write_json(os.path.join(self.temp_dir, 'base.json'), {
+            'document_class': {'class_name': 'base', 'superclasses': []},
+            'base': {'id': '', 'session_id': '', 'name': '', 'datestamp': ''}})
+        write_json(os.path.join(self.temp_dir, 'daq', 'daqsystem.json'), {
+            'document_class': {'class_name': 'daqsystem',
+                               'superclasses': [{'definition': '$NDIDOCUMENTPATH/base.json'}]},
+            'daqsystem': {'name': ''},
+            'depends_on': [{'name': 'filenavigator_id', 'value': ''}]})
+        self.patch = patch.object(PathConstants, 'document_folders', return_value=[self.temp_dir])
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def test_definition_path(self):
+        path = os.path.join(self.temp_dir, 'daq', 'daqsystem.json')
+        self.assertEqual(definition_path('daq/daqsystem'), path)
+        self.assertEqual(definition_path('daqsystem'), path)
+        self.assertIsNone(definition_path('missing'))
+
+    def test_blank_definition(self):
+        cache = DefinitionCache()
+        d = cache.blank_definition('daqsystem')
+        self.assertEqual(set(d), {'document_class', 'base', 'daqsystem', 'depends_on'})
+        d['base']['name'] = 'changed'
+        self.assertEqual(cache.blank_definition('daqsystem')['base']['name'], '')
+        self.assertIsNone(cache.blank_definition('missing'))
+
+    def test_invalidation(self):
+        cache = DefinitionCache()
+        self.assertEqual(cache.blank_definition('base')['base']['name'], '')
+        self.assertEqual(cache.blank_definition('daqsystem')['base']['name'], '')
+        path = os.path.join(self.temp_dir, 'base.json')
+        write_json(path, {'document_class': {'class_name': 'base'}, 'base': {'name': 'new'}})
+        os.utime(path, ns=(1, 1))
+        # Both cached entries depend on base.json
+        self.assertEqual(cache.blank_definition('base')['base']['name'], 'new')
+        self.assertEqual(cache.blank_definition('daqsystem')['base']['name'], 'new')
+
+    def test_missing_definitions_are_cached(self):
+        cache = DefinitionCache()
+        module = 'ndi.document_definition.definition_path'
+        with patch(module, wraps=definition_path) as find:
+            self.assertIsNone(cache.blank_definition('probe'))
+            self.assertIsNone(cache.blank_definition('probe'))
+        self.assertEqual(find.call_count, 1)
+        fallback = lambda document_type: {'base': {'name': document_type}}
+        self.assertEqual(cache.blank_definition('probe', fallback)['base']['name'], 'probe')
+
+        # A definition added to any folder of the search replaces the cached miss
+        write_json(os.path.join(self.temp_dir, 'daq', 'probe.json'), {
+            'document_class': {'class_name': 'probe'}, 'probe': {}})
+        os.utime(os.path.join(self.temp_dir, 'daq'), ns=(1, 1))
+        self.assertEqual(set(cache.blank_definition('probe')), {'document_class', 'probe'})
+        self.assertIn('probe', cache.blank_definition('probe', fallback))
+
+    def test_class_registry(self):
+        write_json(os.path.join(self.temp_dir, 'daq', 'daqsystem_mfdaq.json'), {
+            'document_class': {'class_name': 'daqsystem_mfdaq',
+                               'superclasses': [{'definition': '$NDIDOCUMENTPATH/daq/daqsystem.json'}]}})
+        registry = ClassRegistry()
+        self.assertEqual(registry.ancestors('daqsystem_mfdaq'), {'daqsystem', 'base'})
+        self.assertEqual(registry.ancestors('unknown'), set())
+        document_class = {'class_name': 'mine', 'superclasses': [{'definition': '$NDIDOCUMENTPATH/daq/daqsystem_mfdaq.json'}]}
+        self.assertEqual(registry.superclasses(document_class), {'daqsystem_mfdaq', 'daqsystem', 'base'})
+
+if __name__ == '__main__':
+    unittest.main()
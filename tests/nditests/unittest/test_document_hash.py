@@ -0,0 +1,52 @@
+import unittest
+import numpy as np
+from ndi.document_hash import content_hash
+
+def make_properties():
+    return {
+        'base': {'id': 'a', 'session_id': 's1', 'name': 'x'},
+        'element': {'reference': 1, 'values': [1.0, 2.5]},
+        'depends_on': [{'name': 'b_id', 'value': '2'}, {'name': 'a_id', 'value': '1'}],
+        'files': {'file_list': ['f2', 'f1'], 'file_info': [{'name': 'f1', 'locations': []}]},
+    }
+
+class TestDocumentHash(unittest.TestCase):
+    def test_canonical(self):
+        a = make_properties()
+        b = {
+            'files': {'file_list': ['f1', 'f2']},
+            'depends_on': [{'value': '1', 'name': 'a_id'}, {'name': 'b_id', 'value': '2'}],
+            'element': {'values': [1, 2.5], 'reference': 1.0},
+            'base': {'name': 'x', 'session_id': 's2', 'id': 'a'},
+        }
+        self.assertEqual(content_hash(a), content_hash(b))
+        self.assertEqual(len(content_hash(a)), 32)
+
+    def test_differences(self):
+        a = make_properties()
+        b = make_properties()
+        b['element']['reference'] = 2
+        self.assertNotEqual(content_hash(a), content_hash(b))
+        b = make_properties()
+        b['base']['session_id'] = 's2'
+        self.assertNotEqual(content_hash(a, ignore_fields=()), content_hash(b, ignore_fields=()))
+        b = make_properties()
+        b['files']['file_list'].append('f3')
+        self.assertNotEqual(content_hash(a), content_hash(b))
+        self.assertEqual(content_hash(a, ignore_fields=('files',)), content_hash(b, ignore_fields=('files',)))
+
+    def test_empty_lists(self):
+        a = {'base': {'id': 'a'}}
+        b = {'base': {'id': 'a'}, 'depends_on': [], 'files': {'file_list': []}}
+        self.assertEqual(content_hash(a), content_hash(b))
+
+    def test_numpy_values(self):
+        a = np.zeros(10000)
+        b = np.zeros(10000)
+        b[5000] = 1
+        self.assertNotEqual(content_hash({'x': a}), content_hash({'x': b}))
+        self.assertEqual(content_hash({'x': np.arange(3)}), content_hash({'x': [0, 1, 2]}))
+        self.assertEqual(content_hash({'x': np.float64(2.0)}), content_hash({'x': 2}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -13,5 +13,13 @@ class TestIdo(unittest.TestCase):
         ido2 = Ido()
         self.assertNotEqual(ido1.id(), ido2.id())
 
+    def test_time_ordered_ids(self):
+        ids = Ido.ids(5000, time_ordered=True)
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), 5000)
+        self.assertIsNotNone(Ido.id_time(ids[0]))
+        self.assertIsNone(Ido.id_time(Ido().id()))
+        self.assertLessEqual(Ido.id_time(ids[0]), Ido.id_time(Ido(time_ordered=True).id()))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+from unittest.mock import patch
+import json
+import os
+import shutil
+import tempfile
+from ndi.common.path_constants import PathConstants
+from ndi.validate import compile_schema, validate_documents, ValidatorCache
+
+def write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+def make_doc(doc_id, name, count):
+    return {
+        'base': {'id': doc_id, 'name': name},
+        'document_class': {
+            'class_name': 'thing',
+            'property_list_name': 'thing',
+            'validation': '$NDISCHEMAPATH/thing_schema.json',
+            'superclasses': [{'definition': '$NDIDOCUMENTPATH/base.json'}],
+        },
+        'thing': {'count': count},
+    }
+
+class TestValidate(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.docs_dir = os.path.join(self.temp_dir, 'database_documents')
+        self.schema_dir = os.path.join(self.temp_dir, 'schema_documents')
+        os.makedirs(self.docs_dir)
+        os.makedirs(self.schema_dir)
+        write_json(os.path.join(self.docs_dir, 'base.json'), {'document_class': {
+            'class_name': 'base', 'property_list_name': 'base',
+            'validation': '$NDISCHEMAPATH/base_schema.json'}})
+        write_json(os.path.join(self.schema_dir, 'base_schema.json'), {
+            'type': 'object', 'required': ['id'],
+            'properties': {'id': {'type': 'string', 'minLength': 1}, 'name': {'type': 'string'}}})
+        write_json(os.path.join(self.schema_dir, 'thing_schema.json'), {
+            'type': 'object', 'properties': {'count': {'$ref': '#/definitions/count'}},
+            'definitions': {'count': {'type': 'integer', 'minimum': 0}}})
+        self.patches = [
+            patch.object(PathConstants, 'document_folders', return_value=[self.docs_dir]),
+            patch.object(PathConstants, 'schema_folders', return_value=[self.schema_dir]),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def test_compile_schema(self):
+        check = compile_schema({'type': 'object', 'required': ['a'], 'additionalProperties': False,
+                                'properties': {'a': {'enum': [1, 2]}}})
+        errors = []
+        check({'a': 1}, 'x', errors)
+        self.assertEqual(errors, [])
+        check({'a': 3, 'b': 0}, 'x', errors)
+        self.assertEqual(len(errors), 2)
+
+    def test_validate_documents(self):
+        docs = [make_doc(f'd{i}', f'n{i}', i) for i in range(10)]
+        docs.append(make_doc('bad_count', 'x', -1))
+        docs.append(make_doc('', 'no_id', 1))
+        failures = validate_documents(docs)
+        self.assertEqual(sorted(failures, key=str), [11, 'bad_count'])
+        self.assertIn('thing.count', failures['bad_count'][0])
+
+    def test_missing_schema_and_block(self):
+        # A class without a schema has nothing to check
+        doc = make_doc('a', 'x', 1)
+        doc['document_class']['validation'] = '$NDISCHEMAPATH/missing_schema.json'
+        del doc['thing']
+        self.assertEqual(validate_documents([doc]), {})
+
+        doc = make_doc('a', 'x', 1)
+        del doc['thing']
+        failures = validate_documents([doc])
+        self.assertEqual(len(failures['a']), 1)
+        self.assertIn("Missing the 'thing' properties", failures['a'][0])
+
+    def test_schema_from_all_types(self):
+        # A class that does not name its schema is found among the defined types
+        write_json(os.path.join(self.docs_dir, 'thing.json'), {'document_class': make_doc('', '', 0)['document_class']})
+        doc = make_doc('a', 'x', -1)
+        del doc['document_class']['validation']
+        with patch('ndi.fun.doc.all_types', return_value=['base', 'thing']):
+            failures = ValidatorCache().validate(doc)
+        self.assertEqual(len(failures), 1)
+        self.assertIn('thing.count', failures[0])
+
+    def test_process_pool(self):
+        docs = [make_doc(f'd{i}', f'n{i}', i - 5) for i in range(20)]
+        self.assertEqual(sorted(validate_documents(docs, workers=2, chunk_size=4)),
+                         sorted(validate_documents(docs)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+from ndi.util.cow import get_field, with_fields, without_fields
+
+class TestCow(unittest.TestCase):
+    def setUp(self):
+        self.props = {
+            'base': {'id': 'a', 'session_id': 's1'},
+            'element': {'name': 'e', 'nested': {'x': 1}},
+            'files': {'file_list': ['f1']},
+        }
+
+    def test_without_fields(self):
+        view = without_fields(self.props, ['base.session_id', 'files', 'missing.field'])
+        self.assertEqual(view, {'base': {'id': 'a'}, 'element': {'name': 'e', 'nested': {'x': 1}}})
+        self.assertIs(view['element'], self.props['element'])
+        self.assertEqual(self.props['base']['session_id'], 's1')
+        self.assertIn('files', self.props)
+        self.assertIs(without_fields(self.props, ['missing']), self.props)
+
+    def test_with_fields(self):
+        view = with_fields(self.props, {'element.nested.x': 2, 'new.field': 3})
+        self.assertEqual(get_field(view, 'element.nested.x'), 2)
+        self.assertEqual(get_field(self.props, 'element.nested.x'), 1)
+        self.assertEqual(view['new'], {'field': 3})
+        self.assertIs(view['base'], self.props['base'])
+        self.assertIsNone(get_field(view, 'element.missing'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+import pandas as pd
+from ndi.util.vlt.data import flattenstruct2table
+
+class TestFlattenStruct2Table(unittest.TestCase):
+    def test_flatten(self):
+        rows = [
+            {'base': {'id': 'a', 'name': 'n1'}, 'element': {'reference': 1, 'type': 'n-trode'},
+             'epochs': [{'t0': 0, 't1': 1}, {'t0': 2}]},
+            {'base': {'id': 'b', 'name': 'n2'}, 'element': {'reference': 2, 'extra': True}},
+        ]
+        table = flattenstruct2table(rows)
+        self.assertEqual(list(table.columns),
+                         ['base.id', 'base.name', 'element.reference', 'element.type',
+                          'epochs.t0', 'epochs.t1', 'element.extra'])
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table['element.reference'].dtype.kind, 'i')
+        self.assertEqual(table.loc[0, 'epochs.t0'], [0, 2])
+        self.assertEqual(table.loc[0, 'epochs.t1'], [1, None])
+        self.assertTrue(pd.isna(table.loc[1, 'element.type']))
+
+    def test_options(self):
+        rows = [{'a': {'kind': 'x' if i % 2 else 'y', 'value': i}} for i in range(10)]
+        table = flattenstruct2table(rows, infer_dtypes=False)
+        self.assertEqual(table['a.value'].dtype, object)
+        table = flattenstruct2table(rows, categorical=True)
+        self.assertEqual(str(table['a.kind'].dtype), 'category')
+        self.assertEqual(len(flattenstruct2table({'a': 1})), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+import unittest
+from ndi.util.vlt.file import findfilegroups, findfilegroups_incremental, FileGroupMatcher
+
+class FileTreeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        for path in ['t00001.rhd', 't00001_epochprobemap.txt', 't00002.rhd', 'other.txt',
+                     os.path.join('sub', 't00003.rhd'), os.path.join('sub', 't00003_epochprobemap.txt'),
+                     os.path.join('sub', 'deeper', 't00004.rhd'),
+                     os.path.join('sub', 'deeper', 't00004_epochprobemap.txt')]:
+            full = os.path.join(self.dir, path)
+            os.makedirs(os.path.dirname(full), exist_ok=True)
+            open(full, 'w').close()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def path(self, *parts):
+        return os.path.join(self.dir, *parts)
+
+class TestFindFileGroups(FileTreeTestCase):
+    def test_groups(self):
+        groups = findfilegroups(self.dir, ['#.rhd', '#_epochprobemap.txt'])
+        self.assertEqual(groups, [
+            [self.path('t00001.rhd'), self.path('t00001_epochprobemap.txt')],
+            [self.path('sub', 't00003.rhd'), self.path('sub', 't00003_epochprobemap.txt')],
+            [self.path('sub', 'deeper', 't00004.rhd'), self.path('sub', 'deeper', 't00004_epochprobemap.txt')],
+        ])
+        self.assertEqual(findfilegroups(self.dir, ['#.rhd', '#_epochprobemap.txt'], workers=2), groups)
+
+    def test_options(self):
+        params = ['#.rhd', '#_epochprobemap.txt']
+        self.assertEqual(len(findfilegroups(self.dir, params, SearchDepth=0)), 1)
+        self.assertEqual(len(findfilegroups(self.dir, params, SearchDepth=1)), 2)
+        # SearchParent applies to the top directory only
+        self.assertEqual(len(findfilegroups(self.dir, params, SearchParent=False)), 2)
+        self.assertEqual(len(findfilegroups(self.dir, params, SearchParent=False, SearchDepth=1)), 1)
+        self.assertEqual(len(findfilegroups(self.dir, params, ExcludeDirs=['deeper'])), 2)
+        groups = findfilegroups(self.dir, params, SearchParentFirst=False)
+        self.assertEqual([g[0] for g in groups], [
+            self.path('sub', 'deeper', 't00004.rhd'), self.path('sub', 't00003.rhd'), self.path('t00001.rhd')])
+        self.assertEqual(findfilegroups(self.dir, params, SearchParentFirst=False, workers=2), groups)
+        self.assertEqual(len(findfilegroups(self.dir, params, SearchParentFirst=False, SearchDepth=1)), 2)
+        self.assertEqual(findfilegroups(os.path.join(self.dir, 'missing'), params), [])
+
+    def test_matcher(self):
+        names = ['a.rhd', 'ab.rhd', 'a.dat', 'ab.dat', 'x.ini', 'b_b.c', 'b.c']
+        matcher = FileGroupMatcher(['#.rhd', '#.dat'])
+        self.assertEqual(matcher.match('d', names), [[os.path.join('d', 'a.rhd'), os.path.join('d', 'a.dat')],
+                                                      [os.path.join('d', 'ab.rhd'), os.path.join('d', 'ab.dat')]])
+        # A later parameter without the symbol matches the same names for every group
+        self.assertEqual(len(FileGroupMatcher(['#.rhd', '.*\\.ini']).match('d', names)), 2)
+        # Repeated symbols and non-literal parts
+        self.assertEqual(FileGroupMatcher(['#.c', '#_#.c']).match('', names), [['b.c', 'b_b.c']])
+        self.assertEqual(FileGroupMatcher(['#.rhd', '.*#\\.dat']).match('', names),
+                         [['a.rhd', 'a.dat'], ['ab.rhd', 'ab.dat']])
+        # Without the symbol in the first parameter, the substitute string is empty
+        self.assertEqual(FileGroupMatcher(['.*b\\.rhd', '#.dat']).match('', names), [])
+        self.assertEqual(FileGroupMatcher(['#.rhd', '#.dat'], UseSubstituteString=False).match('', names), [])
+        # Inline flags apply to the whole parameter, so it is not matched as literal text
+        self.assertEqual(FileGroupMatcher(['(?i)t#\\.rhd', '(?i)t#\\.epm']).match('', ['t1.rhd', 'T1.EPM', 'x.EPM']),
+                         [['t1.rhd', 'T1.EPM']])
+        self.assertEqual(FileGroupMatcher(['t#\\.rhd', 't#\\.epm']).match('', ['t1.rhd', 'T1.EPM', 't12.epm', 't1.epm']),
+                         [['t1.rhd', 't1.epm']])
+
+class TestFindFileGroupsIncremental(FileTreeTestCase):
+    def age(self):
+        # Modification times older than the racy window, as after a real scan
+        for root, dirs, files in os.walk(self.dir):
+            os.utime(root, ns=(10**18, 10**18))
+
+    def test_incremental(self):
+        params = ['#.rhd', '#_epochprobemap.txt']
+        self.age()
+        groups, state = findfilegroups_incremental(self.dir, params)
+        self.assertEqual(groups, findfilegroups(self.dir, params))
+        self.assertEqual(sorted(state), ['.', 'sub', os.path.join('sub', 'deeper')])
+        self.assertEqual(state['sub']['groups'], [['t00003.rhd', 't00003_epochprobemap.txt']])
+
+        # Unchanged directories are not listed again
+        state['sub']['groups'] = [['cached.rhd']]
+        again, state2 = findfilegroups_incremental(self.dir, params, previous=state, workers=2)
+        self.assertEqual(again[1], [self.path('sub', 'cached.rhd')])
+        self.assertEqual(state2, state)
+
+        # A changed directory is rescanned
+        open(self.path('sub', 't00005.rhd'), 'w').close()
+        open(self.path('sub', 't00005_epochprobemap.txt'), 'w').close()
+        os.utime(self.path('sub'), ns=(10**18 + 1, 10**18 + 1))
+        again, state3 = findfilegroups_incremental(self.dir, params, previous=state)
+        self.assertEqual(len(again), 4)
+        self.assertEqual(len(state3['sub']['groups']), 2)
+        self.assertEqual(state3['sub']['fingerprint'], [10**18 + 1])
+
+        # Recently modified directories are not fingerprinted
+        shutil.rmtree(self.path('sub', 'deeper'))
+        os.utime(self.path('sub'), None)
+        again, state4 = findfilegroups_incremental(self.dir, params, previous=state3)
+        self.assertEqual(len(again), 3)
+        self.assertEqual(sorted(state4), ['.'])
+
+if __name__ == '__main__':
+    unittest.main()